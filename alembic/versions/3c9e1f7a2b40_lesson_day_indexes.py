@@ -0,0 +1,32 @@
+"""lesson day indexes
+
+Revision ID: 3c9e1f7a2b40
+Revises: aa620d19d425
+Create Date: 2026-10-19 10:12:41.305117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e1f7a2b40'
+down_revision: Union[str, None] = 'aa620d19d425'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_lessons_day', 'lessons', ['day'], unique=False)
+    op.create_index('ix_lessons_group_id_day', 'lessons', ['group_id', 'day'], unique=False)
+    op.create_index('ix_lessons_teacher_id_day', 'lessons', ['teacher_id', 'day'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_lessons_teacher_id_day', table_name='lessons')
+    op.drop_index('ix_lessons_group_id_day', table_name='lessons')
+    op.drop_index('ix_lessons_day', table_name='lessons')
@@ -0,0 +1,28 @@
+"""lesson classroom day index
+
+Revision ID: 5b7e0c3d9a21
+Revises: 8d2a4e6f1c93
+Create Date: 2026-10-19 14:03:17.529804
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e0c3d9a21'
+down_revision: Union[str, None] = '8d2a4e6f1c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_lessons_classroom_id_day', 'lessons', ['classroom_id', 'day'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_lessons_classroom_id_day', table_name='lessons')
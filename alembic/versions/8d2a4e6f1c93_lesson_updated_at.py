@@ -0,0 +1,30 @@
+"""lesson updated_at
+
+Revision ID: 8d2a4e6f1c93
+Revises: 3c9e1f7a2b40
+Create Date: 2026-10-19 13:40:07.512904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2a4e6f1c93'
+down_revision: Union[str, None] = '3c9e1f7a2b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('lessons', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False))
+    op.execute("UPDATE lessons SET updated_at = created_at WHERE created_at IS NOT NULL")
+    op.alter_column('lessons', 'updated_at', server_default=None)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('lessons', 'updated_at')
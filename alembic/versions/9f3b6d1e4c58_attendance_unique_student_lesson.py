@@ -0,0 +1,40 @@
+"""attendance unique student lesson
+
+Revision ID: 9f3b6d1e4c58
+Revises: 5b7e0c3d9a21
+Create Date: 2026-10-19 15:21:44.812306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f3b6d1e4c58'
+down_revision: Union[str, None] = '5b7e0c3d9a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # keep the latest row of every duplicated (student_id, lesson_id) pair
+    op.execute(
+        """
+        DELETE FROM attendances AS a
+        USING attendances AS b
+        WHERE a.student_id = b.student_id
+          AND a.lesson_id = b.lesson_id
+          AND a.id < b.id
+        """
+    )
+    op.create_unique_constraint(
+        'uq_attendances_student_id_lesson_id', 'attendances', ['student_id', 'lesson_id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_attendances_student_id_lesson_id', 'attendances', type_='unique')
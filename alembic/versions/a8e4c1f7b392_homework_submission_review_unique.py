@@ -0,0 +1,70 @@
+"""homework submission review unique
+
+Revision ID: a8e4c1f7b392
+Revises: f1c6a9d3e527
+Create Date: 2026-10-19 19:12:08.530417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8e4c1f7b392'
+down_revision: Union[str, None] = 'f1c6a9d3e527'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # keep the first submission of every duplicated (homework_id, student_id) pair,
+    # reviews of the removed ones go away with ON DELETE CASCADE
+    op.execute(
+        """
+        DELETE FROM homework_submissions AS a
+        USING homework_submissions AS b
+        WHERE a.homework_id = b.homework_id
+          AND a.student_id = b.student_id
+          AND a.id > b.id
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM homework_reviews AS a
+        USING homework_reviews AS b
+        WHERE a.submission_id = b.submission_id
+          AND a.id > b.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE homeworks AS h
+        SET submission_count = (
+                SELECT count(*) FROM homework_submissions AS s WHERE s.homework_id = h.id
+            ),
+            reviewed_count = (
+                SELECT count(*)
+                FROM homework_reviews AS r
+                JOIN homework_submissions AS s ON s.id = r.submission_id
+                WHERE s.homework_id = h.id
+            )
+        """
+    )
+    op.drop_index('ix_homework_submissions_homework_id_student_id', table_name='homework_submissions')
+    op.create_unique_constraint(
+        'uq_homework_submissions_homework_id_student_id', 'homework_submissions', ['homework_id', 'student_id']
+    )
+    op.drop_index('ix_homework_reviews_submission_id', table_name='homework_reviews')
+    op.create_unique_constraint('uq_homework_reviews_submission_id', 'homework_reviews', ['submission_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_homework_reviews_submission_id', 'homework_reviews', type_='unique')
+    op.create_index('ix_homework_reviews_submission_id', 'homework_reviews', ['submission_id'], unique=False)
+    op.drop_constraint('uq_homework_submissions_homework_id_student_id', 'homework_submissions', type_='unique')
+    op.create_index('ix_homework_submissions_homework_id_student_id', 'homework_submissions',
+                    ['homework_id', 'student_id'], unique=False)
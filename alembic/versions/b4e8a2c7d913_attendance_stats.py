@@ -0,0 +1,53 @@
+"""attendance stats
+
+Revision ID: b4e8a2c7d913
+Revises: 9f3b6d1e4c58
+Create Date: 2026-10-19 16:02:09.174532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8a2c7d913'
+down_revision: Union[str, None] = '9f3b6d1e4c58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('attendance_stats',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('attended', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('last_lesson_day', sa.Date(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['student_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('student_id', 'group_id')
+    )
+    op.execute(
+        """
+        INSERT INTO attendance_stats (student_id, group_id, attended, total, last_lesson_day, updated_at)
+        SELECT a.student_id,
+               l.group_id,
+               count(*) FILTER (WHERE a.status = 'ATTENTED'),
+               count(*),
+               max(l.day),
+               now()
+        FROM attendances AS a
+        JOIN lessons AS l ON l.id = a.lesson_id AND l.passed
+        WHERE a.student_id IS NOT NULL
+        GROUP BY a.student_id, l.group_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('attendance_stats')
@@ -0,0 +1,37 @@
+"""homework reminders
+
+Revision ID: b6d3f0a9c148
+Revises: a8e4c1f7b392
+Create Date: 2026-10-19 20:04:51.216730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d3f0a9c148'
+down_revision: Union[str, None] = 'a8e4c1f7b392'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('homework_reminders',
+    sa.Column('homework_id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['homework_id'], ['homeworks.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['student_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('homework_id', 'student_id')
+    )
+    op.create_index('ix_homeworks_deadline', 'homeworks', ['deadline'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_homeworks_deadline', table_name='homeworks')
+    op.drop_table('homework_reminders')
@@ -0,0 +1,33 @@
+"""homework feed indexes
+
+Revision ID: c2d5f8a1b367
+Revises: b4e8a2c7d913
+Create Date: 2026-10-19 16:48:35.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d5f8a1b367'
+down_revision: Union[str, None] = 'b4e8a2c7d913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_homeworks_lesson_id', 'homeworks', ['lesson_id'], unique=False)
+    op.create_index('ix_homework_submissions_homework_id_student_id', 'homework_submissions',
+                    ['homework_id', 'student_id'], unique=False)
+    op.create_index('ix_homework_reviews_submission_id', 'homework_reviews', ['submission_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_homework_reviews_submission_id', table_name='homework_reviews')
+    op.drop_index('ix_homework_submissions_homework_id_student_id', table_name='homework_submissions')
+    op.drop_index('ix_homeworks_lesson_id', table_name='homeworks')
@@ -0,0 +1,30 @@
+"""lesson not passed index
+
+Revision ID: c9a5e7b2d460
+Revises: b6d3f0a9c148
+Create Date: 2026-10-19 20:41:37.902618
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9a5e7b2d460'
+down_revision: Union[str, None] = 'b6d3f0a9c148'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_lessons_not_passed_day_end', 'lessons', ['day', 'lesson_end'], unique=False,
+                    postgresql_where=sa.text('passed IS NOT true'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_lessons_not_passed_day_end', table_name='lessons',
+                  postgresql_where=sa.text('passed IS NOT true'))
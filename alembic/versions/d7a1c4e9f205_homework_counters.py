@@ -0,0 +1,44 @@
+"""homework counters
+
+Revision ID: d7a1c4e9f205
+Revises: c2d5f8a1b367
+Create Date: 2026-10-19 17:24:51.630478
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a1c4e9f205'
+down_revision: Union[str, None] = 'c2d5f8a1b367'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('homeworks', sa.Column('submission_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('homeworks', sa.Column('reviewed_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        """
+        UPDATE homeworks AS h
+        SET submission_count = (
+                SELECT count(*) FROM homework_submissions AS s WHERE s.homework_id = h.id
+            ),
+            reviewed_count = (
+                SELECT count(DISTINCT r.submission_id)
+                FROM homework_reviews AS r
+                JOIN homework_submissions AS s ON s.id = r.submission_id
+                WHERE s.homework_id = h.id
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('homeworks', 'reviewed_count')
+    op.drop_column('homeworks', 'submission_count')
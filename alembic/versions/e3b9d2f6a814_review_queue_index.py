@@ -0,0 +1,29 @@
+"""review queue index
+
+Revision ID: e3b9d2f6a814
+Revises: d7a1c4e9f205
+Create Date: 2026-10-19 17:58:03.215947
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b9d2f6a814'
+down_revision: Union[str, None] = 'd7a1c4e9f205'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_homework_submissions_homework_id_submitted_at', 'homework_submissions',
+                    ['homework_id', 'submitted_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_homework_submissions_homework_id_submitted_at', table_name='homework_submissions')
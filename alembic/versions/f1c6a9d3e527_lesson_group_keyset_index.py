@@ -0,0 +1,32 @@
+"""lesson group keyset index
+
+Revision ID: f1c6a9d3e527
+Revises: e3b9d2f6a814
+Create Date: 2026-10-19 18:37:26.441093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c6a9d3e527'
+down_revision: Union[str, None] = 'e3b9d2f6a814'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # (group_id, day) is a prefix of the new index, so the old one is dropped
+    op.create_index('ix_lessons_group_id_day_start_id', 'lessons',
+                    ['group_id', 'day', 'lesson_start', 'id'], unique=False)
+    op.drop_index('ix_lessons_group_id_day', table_name='lessons')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_lessons_group_id_day', 'lessons', ['group_id', 'day'], unique=False)
+    op.drop_index('ix_lessons_group_id_day_start_id', table_name='lessons')
@@ -0,0 +1,89 @@
+from typing import Dict, Iterable, Set, Tuple
+
+from sqlalchemy import Integer, and_, column, func, literal, select, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.types import AttendanceStatus
+from models.lesson import Attendance, AttendanceStats, Lesson
+from utils.date_time_utils import get_current_time
+
+
+# (student_id, group_id)
+StatsKey = Tuple[int, int]
+
+
+async def get_lessons_stats_keys(session: AsyncSession, lesson_ids: Iterable[int]) -> Set[StatsKey]:
+    '''
+    Rollup rows affected by attendance of the lessons,
+    call it before the lessons are moved to another group or deleted
+    '''
+    lesson_ids = list(lesson_ids)
+    if not lesson_ids:
+        return set()
+    result = await session.execute(
+        select(Attendance.student_id, Lesson.group_id)
+        .join(Attendance.lesson)
+        .where(Lesson.id.in_(lesson_ids), Attendance.student_id.is_not(None))
+        .distinct()
+    )
+    return set(result.tuples().all())
+
+
+async def refresh_attendance_stats(session: AsyncSession, keys: Iterable[StatsKey]):
+    '''
+    Recounts rollup rows of the given (student_id, group_id) pairs with one
+    INSERT ... SELECT ... ON CONFLICT, only attendance of those students is read
+    '''
+    keys = sorted({key for key in keys if None not in key})
+    if not keys:
+        return
+    stats_keys = values(
+        column('student_id', Integer), column('group_id', Integer), name='stats_keys'
+    ).data(keys)
+    passed_attendance = Attendance.__table__.join(
+        Lesson.__table__, and_(Lesson.id == Attendance.lesson_id, Lesson.passed.is_(True))
+    )
+    counts = (
+        select(
+            stats_keys.c.student_id,
+            stats_keys.c.group_id,
+            func.count(Attendance.id).filter(Attendance.status == AttendanceStatus.ATTENTED),
+            func.count(Attendance.id),
+            func.max(Lesson.day),
+            literal(get_current_time(), AttendanceStats.updated_at.type),
+        )
+        .select_from(stats_keys.outerjoin(passed_attendance, and_(
+            Attendance.student_id == stats_keys.c.student_id,
+            Lesson.group_id == stats_keys.c.group_id,
+        )))
+        .group_by(stats_keys.c.student_id, stats_keys.c.group_id)
+    )
+    stmt = insert(AttendanceStats).from_select(
+        ['student_id', 'group_id', 'attended', 'total', 'last_lesson_day', 'updated_at'], counts
+    )
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=['student_id', 'group_id'],
+        set_={
+            'attended': stmt.excluded.attended,
+            'total': stmt.excluded.total,
+            'last_lesson_day': stmt.excluded.last_lesson_day,
+            'updated_at': stmt.excluded.updated_at,
+        }
+    ))
+
+
+async def refresh_lessons_attendance_stats(session: AsyncSession, lesson_ids: Iterable[int]):
+    await refresh_attendance_stats(session, await get_lessons_stats_keys(session, lesson_ids))
+
+
+async def get_attendance_stats(
+    session: AsyncSession, student_ids: Iterable[int], group_ids: Iterable[int]
+) -> Dict[StatsKey, AttendanceStats]:
+    result = await session.execute(
+        select(AttendanceStats).where(
+            AttendanceStats.student_id.in_(list(student_ids)),
+            AttendanceStats.group_id.in_(list(group_ids)),
+        )
+    )
+    return {(stats.student_id, stats.group_id): stats for stats in result.scalars().all()}
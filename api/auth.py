@@ -22,6 +22,8 @@ from utils.date_time_utils import get_current_time
 from utils.password_utils import generate_password
 from utils.security import generate_otp6, hash_code, verify_code_hash
 from utils.smtp_client import send_email
+from utils.shedule_cache import shedule_cache
+from utils.access_cache import group_access_cache
 from conf import DEBUG
 
 SECRET = config('SECRET')
@@ -82,6 +84,7 @@ class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
         print(f"Verification requested for user {user.id}. Verification token: {token}")
     
     async def on_after_update(self, user, update_dict, request = None):
+        shedule_cache.invalidate_users([user.id])
         if (update_dict.get('email', None) is not None) and (request is not None):
             logging.info(f"User {request['old_email']} email has changed into {update_dict['email']}")
             await send_email(
@@ -313,6 +316,7 @@ async def register_student_with_group(
         await create_initial_payment(new_user.id, group.id, db=session)
 
     await session.commit()
+    group_access_cache.invalidate_users([new_user.id])
     await session.refresh(new_user, attribute_names=['groups_joined'])
     response_groups = [
         GroupShort.model_validate(
@@ -3,13 +3,14 @@ from typing import List, Optional
 from fastapi import Depends, status, APIRouter, HTTPException, Query
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 
 from api.auth import current_admin_user
 from api.permissions import require_roles
-from api.utils import validate_related_fields
+from api.utils import not_found_first, validate_related_fields
 
 from db.database import get_async_session
+from db.persistence import insert_returning, update_returning
 from db.types import Role
 from models.course import Course, Language, Level
 from models.user import User
@@ -66,10 +67,8 @@ async def create_language(language_data: LanguageBase, db: AsyncSession = Depend
     '''
     await is_language_exists(name=language_data.name, db=db)
 
-    new_language = Language(**language_data.model_dump())
-    db.add(new_language)
+    new_language = await insert_returning(db, Language, language_data.model_dump())
     await db.commit()
-    await db.refresh(new_language)
     return new_language
 
 
@@ -80,15 +79,13 @@ async def update_language(id: int, language_data: LanguageUpdate, db: AsyncSessi
     Updates a language by language id from the submitted data\n
     ROLES -> admin
     '''
-    result = await db.execute(select(Language).where(Language.id == id))
-    language = result.scalar_one_or_none()
+    async with not_found_first(Language, id, db, detail="Language not found"):
+        if language_data.name is not None:
+            await is_language_exists(name=language_data.name, db=db)
+    language = await update_returning(db, Language, id, language_data.model_dump(exclude_none=True))
     if language is None:
         raise HTTPException(status_code=404, detail="Language not found")
-    if language_data.name is not None:
-        await is_language_exists(name=language_data.name, db=db)
-        language.name = language_data.name
     await db.commit()
-    await db.refresh(language)
     return language
 
 
@@ -154,10 +151,8 @@ async def create_level(level_data: LevelBase, db: AsyncSession = Depends(get_asy
     if level_data.code is not None:
         level_data.code = level_data.code.upper()
         await is_level_exists(code=level_data.code, db=db)
-    new_level = Level(**level_data.model_dump())
-    db.add(new_level)
+    new_level = await insert_returning(db, Level, level_data.model_dump())
     await db.commit()
-    await db.refresh(new_level)
     return new_level
 
 
@@ -168,20 +163,15 @@ async def update_level(id: int, level_data: LevelUpdate, db: AsyncSession = Depe
     Updates a level by level id from the submitted data\n
     ROLES -> admin
     '''
-    result = await db.execute(select(Level).where(Level.id == id))
-    level = result.scalar_one_or_none()
-    if level is None:
-        raise HTTPException(status_code=404, detail="Level not found")
-
     if level_data.code is not None:
         code = level_data.code.upper()
-        await is_level_exists(code=code, db=db, exclude_id=id)
+        async with not_found_first(Level, id, db, detail="Level not found"):
+            await is_level_exists(code=code, db=db, exclude_id=id)
         level_data.code = code
-    update_data = level_data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(level, key, value)
+    level = await update_returning(db, Level, id, level_data.model_dump(exclude_unset=True))
+    if level is None:
+        raise HTTPException(status_code=404, detail="Level not found")
     await db.commit()
-    await db.refresh(level)
     return level
 
 
@@ -260,25 +250,19 @@ async def create_course(course_data: CourseBase, db: AsyncSession = Depends(get_
     if not level_obj:
         raise HTTPException(status_code=404, detail="Level not found")
 
-    new_course = Course(
-        name=course_data.name,
-        price=course_data.price,
-        description=course_data.description,
-        language_id=language_obj.id,
-        level_id=level_obj.id
+    new_course = await insert_returning(
+        db, Course,
+        dict(
+            name=course_data.name,
+            price=course_data.price,
+            description=course_data.description,
+            language_id=language_obj.id,
+            level_id=level_obj.id
+        ),
+        options=[joinedload(Course.language), joinedload(Course.level)]
     )
-    db.add(new_course)
     await db.commit()
-    await db.refresh(new_course)
-    result = await db.execute(
-        select(Course)
-        .where(Course.id == new_course.id)
-        .options(
-            selectinload(Course.language),
-            selectinload(Course.level)
-        )
-    )
-    return result.scalar_one()
+    return new_course
 
 
 @course_router.patch("/{id}", response_model=CourseRead, status_code=status.HTTP_200_OK)
@@ -288,11 +272,6 @@ async def update_course(id: int, course_data: CourseUpdate, db: AsyncSession = D
     Updates a course by course id from the submitted data\n
     ROLES -> admin
     '''
-    result = await db.execute(select(Course).where(Course.id == id))
-    course = result.scalar_one_or_none()
-    if course is None:
-        raise HTTPException(status_code=404, detail="Course not found")
-
     update_data = course_data.model_dump(exclude_unset=True)
     related = {}
     if 'language_id' in update_data:
@@ -300,21 +279,14 @@ async def update_course(id: int, course_data: CourseUpdate, db: AsyncSession = D
     if 'level_id' in update_data:
         related[Level] = update_data['level_id']
     if related:
-        await validate_related_fields(related, db)
-    for key, value in update_data.items():
-        setattr(course, key, value)
-
+        async with not_found_first(Course, id, db, detail="Course not found"):
+            await validate_related_fields(related, db)
+    course = await update_returning(db, Course, id, update_data,
+                                    options=[joinedload(Course.language), joinedload(Course.level)])
+    if course is None:
+        raise HTTPException(status_code=404, detail="Course not found")
     await db.commit()
-    await db.refresh(course)
-    result = await db.execute(
-        select(Course)
-        .where(Course.id == course.id)
-        .options(
-            selectinload(Course.language),
-            selectinload(Course.level)
-        )
-    )
-    return result.scalar_one()
+    return course
 
 
 @course_router.delete("/{id}", status_code=status.HTTP_200_OK)
@@ -8,6 +8,7 @@ from sqlalchemy.orm import selectinload, joinedload, with_loader_criteria
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.database import get_async_session
+from db.persistence import insert_returning, update_returning
 from api.auth import (
     optional_current_user,
     current_user,
@@ -16,7 +17,8 @@ from api.auth import (
     current_admin_user
     )
 
-from api.utils import validate_related_fields
+from api.utils import not_found_first, validate_related_fields
+from api.attendance_stats import get_attendance_stats
 from api.payment import create_initial_payment, inactivate_payment
 from models.payment import PaymentDetail
 from db.types import AttendanceStatus, PaymentDetailStatus, Role
@@ -38,6 +40,8 @@ from schemas.group import (
     StudentDetailResponse
     )
 from schemas.pagination import Pagination
+from utils.shedule_cache import shedule_cache
+from utils.access_cache import group_access_cache
 from schemas.user import StudentResponse
 
 
@@ -81,11 +85,17 @@ async def get_group_students_detail_full_list(
 
     result = await session.execute(stmt)
     groups = result.scalars().all()
+    stats = await get_attendance_stats(
+        session,
+        {student.id for group in groups for student in group.students},
+        [group.id for group in groups]
+    )
     students = list()
     response = list()
     for group in groups:
         for student in group.students:
             student_payment_status = student.payment_details[0].status if student.payment_details else PaymentDetailStatus.UNPAID
+            student_stats = stats.get((student.id, group.id))
             students.append(
                 StudentDetailResponse(
                     id=student.id,
@@ -94,7 +104,8 @@ async def get_group_students_detail_full_list(
                     email=student.email,
                     is_active=student.is_active,
                     role=student.role,
-                    payment_status=student_payment_status
+                    payment_status=student_payment_status,
+                    attendance_percent=student_stats.attendance_percent if student_stats else 0.0
                 )
             )
         response.append(
@@ -139,7 +150,6 @@ async def get_group_students_detail_full(
         .where(Group.id == group_id)
         .options(
             selectinload(User.payment_details),
-            selectinload(User.attendance),
             with_loader_criteria(
                 PaymentDetail, 
                 lambda p: (
@@ -151,13 +161,11 @@ async def get_group_students_detail_full(
         )
     result = await session.execute(stmt)
     students = result.scalars().all()
+    stats = await get_attendance_stats(session, [student.id for student in students], [group_id])
     response = []
     for student in students:
-        # attendances = [a for a in user.attendance if a.group_id == group_id]
-        # total = len(attendances)
-        # present = sum(1 for a in attendances if a.status == AttendanceStatus.ATTENTED)
-        # percent = round(present / total * 100, 2) if total > 0 else 0.0
         student_payment_status = student.payment_details[0].status if student.payment_details else PaymentDetailStatus.UNPAID
+        student_stats = stats.get((student.id, group_id))
         response.append(
             StudentDetailResponse(
                     id=student.id,
@@ -166,7 +174,8 @@ async def get_group_students_detail_full(
                     phone_number=student.phone_number,
                     email=student.email,
                     role=student.role,
-                    payment_status = student_payment_status
+                    payment_status = student_payment_status,
+                    attendance_percent=student_stats.attendance_percent if student_stats else 0.0
                 )
             )
     return response
@@ -286,7 +295,13 @@ async def group_students_update(
     for student_id in deleted_student_ids:
         await inactivate_payment(student_id, group_id, db=session)
 
+    changed_fields = group_update.model_dump(exclude_unset=True).keys() - {'students'}
+
     await session.commit()
+    shedule_cache.invalidate_students(new_student_ids | deleted_student_ids)
+    group_access_cache.invalidate_groups([group_id])
+    if changed_fields:
+        shedule_cache.invalidate_groups([group_id])
     await session.refresh(
         group,
         # attribute_names=['students', 'teacher']
@@ -358,8 +373,14 @@ async def group_students_partial_update(
     for student_id in deleted_student_ids:
         await inactivate_payment(student_id, group_id, db=session)
 
+    changed_fields = group_update.model_dump(exclude_unset=True).keys() - {'students'}
+
 
     await session.commit()
+    shedule_cache.invalidate_students(new_student_ids | deleted_student_ids)
+    group_access_cache.invalidate_groups([group_id])
+    if changed_fields:
+        shedule_cache.invalidate_groups([group_id])
     await session.refresh(
         group,
         # attribute_names=['students', 'teacher']
@@ -512,10 +533,9 @@ async def group_create(
 
     await group_relates(group_data, session)
 
-    new_group = Group(**group_data.model_dump())
-    session.add(new_group)
+    new_group = await insert_returning(session, Group, group_data.model_dump(),
+                                       options=[joinedload(Group.teacher)])
     await session.commit()
-    await session.refresh(new_group, attribute_names=['teacher'])
     return new_group
 
 
@@ -534,17 +554,16 @@ async def group_update(
     Updates a group by group id from the submitted data\n
     ROLES -> admin
     '''
-    groups = await session.execute(select(Group).where(Group.id == group_id))
-    group = groups.scalar_one_or_none()
+    async with not_found_first(Group, group_id, session, detail={"detail" : "group doesn't exist"}):
+        await group_relates(group_data, session)
+    group = await update_returning(session, Group, group_id, group_data.model_dump(),
+                                   options=[joinedload(Group.teacher)])
     if not group:
         raise HTTPException(detail={"detail" : "group doesn't exist"},
-                             status_code=status.HTTP_404_NOT_FOUND)
-    await group_relates(group_data, session)
-
-    for key, value in group_data.model_dump().items():
-        setattr(group, key, value)
+                            status_code=status.HTTP_404_NOT_FOUND)
     await session.commit()
-    await session.refresh(group, attribute_names=['teacher'])
+    shedule_cache.invalidate_groups([group_id])
+    group_access_cache.invalidate_groups([group_id])
     return group
     
 
@@ -563,17 +582,16 @@ async def group_partial_update(
     Partial Updates a group by group id from the submitted data\n
     ROLES -> admin
     '''
-    groups = await session.execute(select(Group).where(Group.id == group_id))
-    group = groups.scalar_one_or_none()
+    async with not_found_first(Group, group_id, session, detail={"detail" : "group doesn't exist"}):
+        await group_relates(group_data, session)
+    group = await update_returning(session, Group, group_id, group_data.model_dump(exclude_unset=True),
+                                   options=[joinedload(Group.teacher)])
     if not group:
         raise HTTPException(detail={"detail" : "group doesn't exist"},
                             status_code=status.HTTP_404_NOT_FOUND)
-    await group_relates(group_data, session)
-
-    for key, value in group_data.model_dump(exclude_unset=True).items():
-        setattr(group, key, value)
     await session.commit()
-    await session.refresh(group, attribute_names=['teacher'])
+    shedule_cache.invalidate_groups([group_id])
+    group_access_cache.invalidate_groups([group_id])
     return group
 
 
@@ -593,6 +611,8 @@ async def group_delete(
     group = await session.get(Group, group_id)
     await session.delete(group)
     await session.commit()
+    shedule_cache.invalidate_groups([group_id])
+    group_access_cache.invalidate_groups([group_id])
     return
 
     
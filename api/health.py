@@ -0,0 +1,49 @@
+import logging
+
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.database import get_async_session
+from utils.smtp_client import smtp_client
+from utils.storage import storage
+
+
+health_router = APIRouter()
+
+
+@health_router.get('/live')
+async def liveness():
+    '''
+    Process is up, doesn't touch external services\n
+    ROLES -> all
+    '''
+    return {"status": "ok"}
+
+
+@health_router.get('/ready')
+async def readiness(session: AsyncSession = Depends(get_async_session)):
+    '''
+    Checks database and storage, returns 503 if one of them is unavailable.
+    SMTP connects on demand, so its state is informational only\n
+    ROLES -> all
+    '''
+    try:
+        await session.execute(text('SELECT 1'))
+        database = True
+    except Exception as e:
+        logging.warning(f"Database readiness check failed: {e}")
+        database = False
+    storage_ready = await storage.is_ready()
+
+    ready = database and storage_ready
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "status": "ok" if ready else "unavailable",
+            "database": "ok" if database else "unavailable",
+            "storage": "ok" if storage_ready else "unavailable",
+            "smtp": "connected" if smtp_client.is_connected else "idle",
+        }
+    )
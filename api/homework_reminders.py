@@ -0,0 +1,127 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Dict, List, Tuple
+
+from decouple import config
+from sqlalchemy import and_, delete, exists, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from conf import DEBUG
+from db.database import get_async_session_context
+from models.group import Group
+from models.lesson import Homework, HomeworkReminder, HomeworkSubmission, Lesson
+from models.user import User, student_group_association_table
+from utils.date_time_utils import get_current_time
+from utils.smtp_client import APP_EMAIL, smtp_client
+
+
+HOMEWORK_REMINDER_WINDOW_HOURS = config('HOMEWORK_REMINDER_WINDOW_HOURS', default=24, cast=int)
+HOMEWORK_REMINDER_INTERVAL_MINUTES = config('HOMEWORK_REMINDER_INTERVAL_MINUTES', default=30, cast=int)
+
+
+async def claim_homework_reminders(session: AsyncSession, now: datetime, window: timedelta):
+    '''
+    Finds students of active groups who haven't submitted a homework due within the window
+    and records the reminders in one INSERT ... SELECT ... ON CONFLICT DO NOTHING.\n
+    Only rows inserted by this call are returned, so concurrent runs never
+    remind a student twice about the same homework
+    '''
+    pending = (
+        select(Homework.id, User.id, literal(now, type_=HomeworkReminder.sent_at.type))
+        .join(Lesson, Lesson.id == Homework.lesson_id)
+        .join(Group, and_(Group.id == Lesson.group_id, Group.is_active.is_(True)))
+        .join(student_group_association_table, student_group_association_table.c.group_id == Group.id)
+        .join(User, and_(User.id == student_group_association_table.c.user_id, User.is_active.is_(True)))
+        .where(
+            Homework.deadline > now,
+            Homework.deadline <= now + window,
+            ~exists().where(HomeworkSubmission.homework_id == Homework.id,
+                            HomeworkSubmission.student_id == User.id),
+        )
+    )
+    claimed = (
+        insert(HomeworkReminder)
+        .from_select(['homework_id', 'student_id', 'sent_at'], pending)
+        .on_conflict_do_nothing()
+        .returning(HomeworkReminder.homework_id, HomeworkReminder.student_id)
+        .cte('claimed')
+    )
+    result = await session.execute(
+        select(
+            claimed.c.student_id,
+            User.email,
+            User.first_name,
+            Homework.id.label('homework_id'),
+            Homework.deadline,
+            Lesson.name.label('lesson_name'),
+            Group.name.label('group_name'),
+        )
+        .select_from(claimed)
+        .join(User, User.id == claimed.c.student_id)
+        .join(Homework, Homework.id == claimed.c.homework_id)
+        .join(Lesson, Lesson.id == Homework.lesson_id)
+        .join(Group, Group.id == Lesson.group_id)
+        .order_by(claimed.c.student_id, Homework.deadline)
+    )
+    return result.all()
+
+
+def build_reminder_digest(email: str, first_name: str, rows) -> EmailMessage:
+    lines = [f"Hello, {first_name}! These homeworks are due soon and are not submitted yet:", ""]
+    for row in rows:
+        lines.append(f"- {row.group_name}, {row.lesson_name}: deadline {row.deadline:%Y-%m-%d %H:%M} UTC")
+    message = EmailMessage()
+    message["From"] = APP_EMAIL
+    message["To"] = email
+    message["Subject"] = 'Homework deadline reminder'
+    message.set_content("\n".join(lines))
+    return message
+
+
+async def send_homework_reminders():
+    '''
+    Scheduled job, sends one digest per student listing every homework
+    due within HOMEWORK_REMINDER_WINDOW_HOURS that the student hasn't submitted.\n
+    Digests go through the shared rate-limited SMTP connection,
+    reminders of digests that failed are released for the next run
+    '''
+    # claimed reminders count as sent, so nothing is claimed when mail is off
+    if DEBUG:
+        logging.info("DEBUG: homework reminders are not sent")
+        return
+
+    now = get_current_time()
+    async with get_async_session_context() as session:
+        rows = await claim_homework_reminders(session, now, timedelta(hours=HOMEWORK_REMINDER_WINDOW_HOURS))
+        await session.commit()
+    if not rows:
+        return
+
+    per_student: Dict[int, list] = defaultdict(list)
+    for row in rows:
+        per_student[row.student_id].append(row)
+
+    digests: Dict[str, Tuple[int, List[int]]] = {}
+    messages = []
+    for student_id, student_rows in per_student.items():
+        email = student_rows[0].email
+        digests[email] = (student_id, [row.homework_id for row in student_rows])
+        messages.append(build_reminder_digest(email, student_rows[0].first_name, student_rows))
+
+    failed = await smtp_client.send_messages(messages)
+    logging.info(f"Homework reminders sent: {len(messages) - len(failed)}, failed: {len(failed)}")
+    if failed:
+        keys = [
+            (homework_id, digests[message['To']][0])
+            for message in failed
+            for homework_id in digests[message['To']][1]
+        ]
+        async with get_async_session_context() as session:
+            await session.execute(
+                delete(HomeworkReminder)
+                .where(tuple_(HomeworkReminder.homework_id, HomeworkReminder.student_id).in_(keys))
+            )
+            await session.commit()
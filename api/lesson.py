@@ -1,36 +1,50 @@
 import logging
 from math import ceil
 import os
-from datetime import datetime, timezone
-from typing import List, Optional
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Literal, Optional
 from fastapi import Depends, APIRouter, HTTPException, status, Query, Form, UploadFile, File, Request
 from fastapi.responses import StreamingResponse
-from sqlalchemy import select, and_, func
+from sqlalchemy import exists, insert, literal, or_, select, and_, func, true, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
 
 from api.auth import current_student_user, current_teacher_user, current_admin_user
 from api.utils import validate_related_fields
+from api.permissions import check_group_access
+from api.attendance_stats import (
+    get_lessons_stats_keys, refresh_attendance_stats, refresh_lessons_attendance_stats
+)
+from api.lesson_conflicts import ensure_no_lesson_conflicts, check_timetable_conflicts
 from db.types import AttendanceStatus, Role
 
 from models.group import Group
 from models.lesson import Attendance, Lesson, Classroom, Homework, HomeworkSubmission, HomeworkReview
-from models.user import User
+from models.user import User, student_group_association_table
 
-from schemas.pagination import PaginatedResponse, Pagination
+from schemas.pagination import CursorPagination, PaginatedResponse, Pagination
 
 from schemas.lesson import (
     LessonRead, LessonCreate, LessonUpdate, LessonBase, ClassroomRead, ClassroomCreate, ClassroomUpdate, HomeworkRead,
     HomeworkSubmissionRead, HomeworkReviewCreate, HomeworkReviewRead, HomeworkReviewBase,HomeworkBase,
 
-    HomeworkReviewUpdate, HomeworkSubmissionShort
+    HomeworkReviewUpdate, HomeworkSubmissionShort, LessonConflictCheck, LessonConflict, LessonRecurrenceCreate,
+    StudentHomeworkItem, StudentHomeworkResponse, ReviewQueueItem, ReviewQueueResponse,
+    LessonListItem, LessonListResponse
 )
 
-from utils.minio_client import minio_client
-from utils.ext_and_size_validation_file import validate_file
+from utils.storage import storage
+from utils.ext_and_size_validation_file import validate_file, TEACHER_MAX_FILE_SIZE_MB
+from utils.zip_stream import stream_zip
+from utils.shedule_cache import shedule_cache
+from utils.date_time_utils import get_current_time, get_iso_week
+from utils.cursor import decode_cursor, encode_cursor
 
 from db.database import get_async_session
+from db.persistence import insert_returning, update_returning
 
 
 lesson_router = APIRouter()
@@ -56,11 +70,6 @@ async def get_classroom_or_404(classroom_id: int, db: AsyncSession):
     return classroom
 
 
-def get_group_students(group):
-    students_ids = [student.id for student in group.students]
-    return students_ids
-
-
 async def is_classroom_exists(name, db):
     existing_room = await db.scalar(select(Classroom).where(Classroom.name.ilike(name)))
     if existing_room:
@@ -99,11 +108,8 @@ async def create_classroom(data: ClassroomCreate, db: AsyncSession = Depends(get
     ROLES -> admin
     '''
     await is_classroom_exists(name=data.name, db=db)
-    data = data.model_dump()
-    new_classroom = Classroom(**data)
-    db.add(new_classroom)
+    new_classroom = await insert_returning(db, Classroom, data.model_dump())
     await db.commit()
-    await db.refresh(new_classroom)
     return new_classroom
 
 
@@ -115,13 +121,11 @@ async def update_classroom(classroom_id: int, data: ClassroomUpdate,
     Updates a classroom by classroom id from the submitted data\n
     ROLES -> admin
     '''
-    classroom = await get_classroom_or_404(classroom_id, db)
-    data = data.model_dump(exclude_unset=True)
-    for key, value in data.items():
-        setattr(classroom, key, value)
-
+    classroom = await update_returning(db, Classroom, classroom_id, data.model_dump(exclude_unset=True))
+    if not classroom:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Classroom doesn't exist")
     await db.commit()
-    await db.refresh(classroom)
+    shedule_cache.invalidate_classrooms([classroom_id])
     return classroom
 
 
@@ -135,43 +139,124 @@ async def destroy_classroom(classroom_id: int, db: AsyncSession = Depends(get_as
     classroom = await get_classroom_or_404(classroom_id, db)
     await db.delete(classroom)
     await db.commit()
+    shedule_cache.invalidate_classrooms([classroom_id])
     return {"detail": f"Classroom with id {classroom_id} has been deleted"}
 
 
 # crud for lessons
 async def get_group_or_404(group_id: int, db: AsyncSession):
-    query = select(Group).where(Group.id == group_id).options(
-        selectinload(Group.students),
-        selectinload(Group.teacher)
-    )
-    result = await db.execute(query)
-    group = result.scalar_one_or_none()
+    group = await db.get(Group, group_id)
     if not group:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group doesn't exist")
     return group
 
 
-@lesson_router.get('/group/{group_id}/lessons', response_model=List[LessonRead], status_code=status.HTTP_200_OK)
+async def create_lessons_attendance(group_id: int, lesson_ids: List[int], db: AsyncSession):
+    '''
+    Adds absent attendance of every group student for the lessons
+    with a single INSERT ... SELECT
+    '''
+    now = get_current_time()
+    students = student_group_association_table
+    attendance = (
+        select(
+            literal(AttendanceStatus.ABSENT, Attendance.status.type),
+            students.c.user_id,
+            Lesson.id,
+            literal(now, Attendance.created_at.type),
+            literal(now, Attendance.updated_at.type),
+        )
+        .select_from(students)
+        .join(Lesson, Lesson.group_id == students.c.group_id)
+        .where(students.c.group_id == group_id, Lesson.id.in_(lesson_ids))
+    )
+    await db.execute(
+        insert(Attendance).from_select(
+            ['status', 'student_id', 'lesson_id', 'created_at', 'updated_at'], attendance
+        )
+    )
+
+
+LessonDirection = Literal['upcoming', 'past']
+
+
+@lesson_router.get('/group/{group_id}/lessons', response_model=LessonListResponse, status_code=status.HTTP_200_OK)
 async def get_lessons_by_groups(group_id: int,
                                 limit: int = Query(10, ge=1, le=30, description="Limit number of lessons returned"),
-                                offset: int = Query(0, ge=0, description="Offset for pagination"),
+                                cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+                                direction: Optional[LessonDirection] = Query(
+                                    None, description="upcoming - from today on, past - before today, latest first"
+                                ),
                                 db: AsyncSession = Depends(get_async_session),
                                 user: User = Depends(current_student_user)):
     '''
-    Returns list of lessons by group id\n
+    Returns list of lessons by group id ordered by day, lesson_start\n
     ROLES -> student, teacher, admin
     '''
-    group = await get_group_or_404(group_id, db)
-    students_ids = [student.id for student in group.students]
-    if user.id != group.teacher_id and user.id not in students_ids and user.role != 'admin':
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not allowed")
-    result = await db.execute(select(Lesson)
-                              .where(Lesson.group_id == group_id)
-                              .options(selectinload(Lesson.classroom),
-                                       selectinload(Lesson.group),
-                                       selectinload(Lesson.homework)).limit(limit).offset(offset))
-    lessons = result.scalars().all()
-    return lessons
+    await get_group_or_404(group_id, db)
+    await check_group_access(user, group_id, db)
+
+    homework = (
+        select(Homework.id, Homework.deadline)
+        .where(Homework.lesson_id == Lesson.id)
+        .order_by(Homework.id)
+        .limit(1)
+        .lateral('homework')
+    )
+    stmt = (
+        select(
+            Lesson.id,
+            Lesson.name,
+            Lesson.link,
+            Lesson.day,
+            Lesson.lesson_start,
+            Lesson.lesson_end,
+            Lesson.passed,
+            Lesson.teacher_id,
+            Lesson.classroom_id,
+            Classroom.name.label('classroom_name'),
+            homework.c.id.label('homework_id'),
+            homework.c.deadline.label('homework_deadline'),
+        )
+        .join(Classroom, Classroom.id == Lesson.classroom_id)
+        .outerjoin(homework, true())
+        .where(Lesson.group_id == group_id)
+    )
+    today = get_current_time().date()
+    if direction == 'upcoming':
+        stmt = stmt.where(Lesson.day >= today)
+    elif direction == 'past':
+        stmt = stmt.where(Lesson.day < today)
+
+    sort_key = tuple_(Lesson.day, Lesson.lesson_start, Lesson.id)
+    descending = direction == 'past'
+    if cursor is not None:
+        cursor_key = tuple_(*decode_cursor(cursor, date.fromisoformat, time.fromisoformat, int))
+        stmt = stmt.where(sort_key < cursor_key if descending else sort_key > cursor_key)
+    if descending:
+        stmt = stmt.order_by(Lesson.day.desc(), Lesson.lesson_start.desc(), Lesson.id.desc())
+    else:
+        stmt = stmt.order_by(Lesson.day, Lesson.lesson_start, Lesson.id)
+
+    rows = (await db.execute(stmt.limit(limit + 1))).all()
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    return LessonListResponse(
+        items=[LessonListItem.model_validate(row, from_attributes=True) for row in rows],
+        next_cursor=encode_cursor(rows[-1].day, rows[-1].lesson_start, rows[-1].id) if has_next else None
+    )
+
+
+@lesson_router.post('/check-conflicts', response_model=List[LessonConflict], status_code=status.HTTP_200_OK)
+async def check_lesson_conflicts(lessons: List[LessonConflictCheck], db: AsyncSession = Depends(get_async_session),
+                                 user: User = Depends(current_teacher_user)):
+    '''
+    Checks a proposed timetable without saving it\n
+    Returns overlaps with existing lessons (lesson_id) and inside the
+    timetable itself (other_index), index points to the proposed lesson\n
+    ROLES -> teacher, admin
+    '''
+    return await check_timetable_conflicts(db, lessons)
 
 
 @lesson_router.get('/{lesson_id}', response_model=LessonRead, status_code=status.HTTP_200_OK)
@@ -182,17 +267,13 @@ async def get_lesson_by_lesson_id(lesson_id: int, db: AsyncSession = Depends(get
     Returns detailed lesson data by classroom id\n
     ROLES -> student, teacher, admin
     '''
-    lesson = await db.get(Lesson, lesson_id, options=[selectinload(Lesson.classroom), selectinload(Lesson.group)
-                                                      .selectinload(Group.students),
+    lesson = await db.get(Lesson, lesson_id, options=[selectinload(Lesson.classroom), selectinload(Lesson.group),
                                                       selectinload(Lesson.homework)])
 
     if not lesson:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson doesn't exist")
 
-    students_ids = [student.id for student in lesson.group.students]
-
-    if user.id != lesson.group.teacher_id and user.id not in students_ids and user.role != 'admin':
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not allowed")
+    await check_group_access(user, lesson.group_id, db)
 
     return lesson
 
@@ -204,7 +285,7 @@ async def create_lesson(lesson_data: LessonCreate, group_id: int, db: AsyncSessi
     Creates a lesson from the submitted data\n
     ROLES -> teacher, admin
     '''
-    group = await get_group_or_404(group_id, db)
+    await get_group_or_404(group_id, db)
 
     if user.role not in (Role.TEACHER, Role.ADMIN):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not allowed")
@@ -212,41 +293,95 @@ async def create_lesson(lesson_data: LessonCreate, group_id: int, db: AsyncSessi
     relates = {User: lesson_data.teacher_id, Classroom: lesson_data.classroom_id}
 
     await validate_related_fields(relates, session=db)
+    await ensure_no_lesson_conflicts(
+        db, [lesson_data.day], lesson_data.lesson_start, lesson_data.lesson_end,
+        lesson_data.teacher_id, lesson_data.classroom_id
+    )
 
     new_lesson_data = lesson_data.model_dump()
     new_lesson_data['group_id'] = group_id
     # new_lesson_data['teacher_id'] = user.id
-    new_lesson = Lesson(**new_lesson_data)
-
-    db.add(new_lesson)
-    await db.flush()
-    await db.refresh(
-        new_lesson
-        )
-    
-    students = await new_lesson.group.awaitable_attrs.students
-    for student in students:
-        db.add(Attendance(
-                status=AttendanceStatus.ABSENT,
-                student_id=student.id,
-                lesson_id=new_lesson.id
-                )
-            )
+    new_lesson = await db.scalar(insert(Lesson).values(**new_lesson_data).returning(Lesson))
+    await create_lessons_attendance(group_id, [new_lesson.id], db)
+    if new_lesson.passed:
+        await refresh_lessons_attendance_stats(db, [new_lesson.id])
     await db.commit()
-    # new_lesson = await db.execute(select(Lesson).options(selectinload(Lesson.group),
-    #                                                      selectinload(Lesson.classroom),
-    #                                                      selectinload(Lesson.homework))
-    #                               .where(Lesson.id == new_lesson.id))
-    # return new_lesson.scalar_one()
-    await db.refresh(
-        new_lesson,
-        attribute_names=[
-            'group',
-            'classroom',
-            'homework'
+    shedule_cache.invalidate_lessons([get_iso_week(new_lesson.day)], [group_id], [new_lesson.teacher_id])
+    return new_lesson
+
+
+LESSON_RECURRENCE_MAX_DAYS = 366
+
+
+@lesson_router.post('/group/{group_id}/recurrence', response_model=List[LessonBase],
+                    status_code=status.HTTP_201_CREATED)
+async def create_recurring_lessons(recurrence: LessonRecurrenceCreate, group_id: int,
+                                   db: AsyncSession = Depends(get_async_session),
+                                   user: User = Depends(current_teacher_user)):
+    '''
+    Creates every lesson of the term on the given weekdays\n
+    Group's start_date, end_date, approximate_lesson_start and teacher
+    are used for the omitted fields. Fails with 409 if any lesson overlaps
+    an existing one, nothing is created in that case\n
+    ROLES -> teacher, admin
+    '''
+    group = await get_group_or_404(group_id, db)
+
+    teacher_id = recurrence.teacher_id or group.teacher_id
+    if teacher_id is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Group has no teacher, teacher_id is required")
+    await validate_related_fields({User: teacher_id, Classroom: recurrence.classroom_id}, session=db)
+
+    lesson_start = recurrence.lesson_start or group.approximate_lesson_start
+    lesson_end = datetime.combine(date.min, lesson_start) + timedelta(minutes=recurrence.duration)
+    if lesson_end.date() != date.min:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Lesson must end on the same day")
+    lesson_end = lesson_end.timetz()
+
+    start_date = recurrence.start_date or group.start_date
+    end_date = recurrence.end_date or group.end_date
+    if start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="start_date must be before end_date")
+    if (end_date - start_date).days > LESSON_RECURRENCE_MAX_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Period can't be longer than {LESSON_RECURRENCE_MAX_DAYS} days")
+
+    weekdays = set(recurrence.weekdays)
+    days = [
+        day for day in (start_date + timedelta(days=n) for n in range((end_date - start_date).days + 1))
+        if day.weekday() in weekdays
+    ]
+    if not days:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="There are no lesson days in the given period")
+
+    await ensure_no_lesson_conflicts(db, days, lesson_start, lesson_end, teacher_id, recurrence.classroom_id)
+
+    lesson_data = recurrence.model_dump(include={'name', 'description', 'link'})
+    result = await db.scalars(
+        insert(Lesson).returning(Lesson),
+        [
+            {
+                **lesson_data,
+                'day': day,
+                'lesson_start': lesson_start,
+                'lesson_end': lesson_end,
+                'teacher_id': teacher_id,
+                'group_id': group_id,
+                'classroom_id': recurrence.classroom_id,
+                'passed': False,
+            }
+            for day in days
         ]
     )
-    return new_lesson
+    lessons = result.all()
+    await create_lessons_attendance(group_id, [lesson.id for lesson in lessons], db)
+    await db.commit()
+    shedule_cache.invalidate_lessons({get_iso_week(day) for day in days}, [group_id], [teacher_id])
+    return lessons
 
 
 @lesson_router.patch('/{lesson_id}', response_model=LessonBase, status_code=status.HTTP_200_OK)
@@ -256,7 +391,7 @@ async def update_lesson(lesson_data: LessonUpdate, lesson_id: int,
     Updates a lesson by lesson id from the submitted data\n
     ROLES -> teacher, admin
     '''
-    lesson = await db.get(Lesson, lesson_id, options=[selectinload(Lesson.classroom)])
+    lesson = await db.get(Lesson, lesson_id)
     if not lesson:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson doesn't exist")
 
@@ -274,16 +409,36 @@ async def update_lesson(lesson_data: LessonUpdate, lesson_id: int,
     if relates:
         await validate_related_fields(relates, db)
 
+    old_week, old_group_id, old_teacher_id = get_iso_week(lesson.day), lesson.group_id, lesson.teacher_id
     new_data = lesson_data.model_dump(exclude_unset=True)
-    for key, value in new_data.items():
-        setattr(lesson, key, value)
+    slot_fields = {'day', 'lesson_start', 'lesson_end', 'teacher_id', 'classroom_id'}
+    if slot_fields & new_data.keys():
+        slot = {field: new_data.get(field, getattr(lesson, field)) for field in slot_fields}
+        # stored times are naive, the request ones may carry an offset
+        for field in ('lesson_start', 'lesson_end'):
+            slot[field] = slot[field].replace(tzinfo=None)
+        if slot['lesson_start'] >= slot['lesson_end']:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail="lesson_start must be before lesson_end")
+        await ensure_no_lesson_conflicts(
+            db, [slot['day']], slot['lesson_start'], slot['lesson_end'],
+            slot['teacher_id'], slot['classroom_id'], exclude_lesson_id=lesson.id
+        )
+    stats_changed = bool({'passed', 'group_id'} & new_data.keys())
+    if stats_changed:
+        stats_keys = await get_lessons_stats_keys(db, [lesson.id])
+    lesson = await update_returning(db, Lesson, lesson_id, new_data)
+    if stats_changed:
+        stats_keys |= await get_lessons_stats_keys(db, [lesson.id])
+        await refresh_attendance_stats(db, stats_keys)
 
     await db.commit()
-    await db.refresh(lesson)
-    lesson = await db.execute(select(Lesson).where(Lesson.id == lesson_id).
-                              options(selectinload(Lesson.group),
-                                      selectinload(Lesson.classroom)))
-    return lesson.scalar_one()
+    shedule_cache.invalidate_lessons(
+        [old_week, get_iso_week(lesson.day)],
+        [old_group_id, lesson.group_id],
+        [old_teacher_id, lesson.teacher_id]
+    )
+    return lesson
 
 
 @lesson_router.delete('/{lesson_id}', status_code=status.HTTP_200_OK)
@@ -299,35 +454,84 @@ async def destroy_lesson(lesson_id: int, db: AsyncSession = Depends(get_async_se
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson doesn't exist")
     if lesson.teacher_id != user.id and user.role != Role.ADMIN:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='You are not allowed')
+    week, group_id, teacher_id = get_iso_week(lesson.day), lesson.group_id, lesson.teacher_id
+    stats_keys = await get_lessons_stats_keys(db, [lesson.id]) if lesson.passed else set()
     await db.delete(lesson)
+    await db.flush()
+    await refresh_attendance_stats(db, stats_keys)
     await db.commit()
+    shedule_cache.invalidate_lessons([week], [group_id], [teacher_id])
     return {"detail": f"Lesson with id {lesson_id} has been deleted"}
 
 
-async def get_homeworks_for_user(user_id, db: AsyncSession):
-    result = await db.execute(select(User).where(User.id == user_id).
-                              options(selectinload(User.groups_joined)
-                                      .selectinload(Group.lessons)
-                                      .selectinload(Lesson.homework)
-                                      )
-                              )
-    user = result.scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    homeworks = []
-    for group in user.groups_joined:
-        for lesson in group.lessons:
-            homeworks.extend(lesson.homeworks)
-    return homeworks
-
-
-
-# @homework_router.get("/my-homeworks", response_model=List[HomeworkRead], status_code=status.HTTP_200_OK)
-# async def my_homeworks(db: AsyncSession = Depends(get_async_session),
-#                                     user: User = Depends(current_student_user)):
-#
-#     homeworks = await get_homeworks_for_user(user.id, db)
-#     return homeworks
+@homework_router.get("/my-homeworks", response_model=StudentHomeworkResponse, status_code=status.HTTP_200_OK)
+async def my_homeworks(deadline_from: Optional[datetime] = None, deadline_to: Optional[datetime] = None,
+                       submitted: Optional[bool] = None, reviewed: Optional[bool] = None,
+                       cursor: Optional[str] = None, size: int = Query(20, ge=1, le=100),
+                       db: AsyncSession = Depends(get_async_session),
+                       user: User = Depends(current_student_user)):
+    '''
+    Returns homeworks of the current student's groups ordered by deadline\n
+    submitted/reviewed filter by the student's own submission,
+    pass pagination.next_cursor as cursor to get the next page\n
+    ROLES -> student
+    '''
+    students = student_group_association_table
+    own_submission = and_(HomeworkSubmission.homework_id == Homework.id, HomeworkSubmission.student_id == user.id)
+    is_submitted = select(HomeworkSubmission.id).where(own_submission).exists()
+    is_reviewed = (
+        select(HomeworkReview.id)
+        .join(HomeworkSubmission, HomeworkSubmission.id == HomeworkReview.submission_id)
+        .where(own_submission)
+        .exists()
+    )
+    homeworks = (
+        select(
+            Homework.id,
+            Homework.deadline,
+            Homework.file_path,
+            Homework.description,
+            Homework.lesson_id,
+            Lesson.name.label('lesson_name'),
+            Lesson.day.label('lesson_day'),
+            Lesson.group_id,
+            is_submitted.label('submitted'),
+            is_reviewed.label('reviewed'),
+        )
+        .join(Lesson, Lesson.id == Homework.lesson_id)
+        .join(students, and_(students.c.group_id == Lesson.group_id, students.c.user_id == user.id))
+    )
+    if deadline_from is not None:
+        homeworks = homeworks.where(Homework.deadline >= deadline_from)
+    if deadline_to is not None:
+        homeworks = homeworks.where(Homework.deadline <= deadline_to)
+    if submitted is not None:
+        homeworks = homeworks.where(is_submitted if submitted else ~is_submitted)
+    if reviewed is not None:
+        homeworks = homeworks.where(is_reviewed if reviewed else ~is_reviewed)
+    # total is counted without the cursor, so it is the same on every page
+    total_items = await db.scalar(select(func.count()).select_from(homeworks.subquery()))
+
+    if cursor is not None:
+        cursor_deadline, cursor_id = decode_cursor(cursor, datetime.fromisoformat, int)
+        homeworks = homeworks.where(or_(
+            Homework.deadline > cursor_deadline,
+            and_(Homework.deadline == cursor_deadline, Homework.id > cursor_id)
+        ))
+    homeworks = homeworks.order_by(Homework.deadline, Homework.id).limit(size + 1)
+
+    rows = (await db.execute(homeworks)).all()
+    has_next = len(rows) > size
+    rows = rows[:size]
+    return StudentHomeworkResponse(
+        items=[StudentHomeworkItem.model_validate(row, from_attributes=True) for row in rows],
+        pagination=CursorPagination(
+            current_page_size=len(rows),
+            total_items=total_items,
+            total_pages=ceil(total_items / size) if total_items else 1,
+            next_cursor=encode_cursor(rows[-1].deadline, rows[-1].id) if has_next else None
+        )
+    )
 
 
 @homework_router.get("/{homework_id}", response_model=HomeworkRead, status_code=status.HTTP_200_OK)
@@ -370,28 +574,42 @@ async def create_homework(lesson_id: int, deadline: datetime = Form(),
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='You are not allowed')
     file_path = None
     if file:
-        await validate_file(file)
+        await validate_file(file, TEACHER_MAX_FILE_SIZE_MB)
         file.file.seek(0)
-        file_path = await minio_client.upload_file(file)
+        file_path = await storage.upload_file(file)
 
     new_homework = Homework(
         lesson_id=lesson_id,
         created_at=datetime.now(timezone.utc),
         file_path=file_path,
         description=description,
-        deadline=deadline
+        deadline=deadline,
+        submissions=[]
     )
     db.add(new_homework)
     await db.commit()
-    await db.refresh(new_homework)
     return new_homework
 
 
+async def update_homework_counters(homework_id: int, db: AsyncSession, submissions: int = 0, reviewed: int = 0):
+    '''
+    Shifts stored submission counters of the homework,
+    done in SQL so concurrent submissions don't lose increments
+    '''
+    await db.execute(
+        update(Homework).where(Homework.id == homework_id).values(
+            submission_count=Homework.submission_count + submissions,
+            reviewed_count=Homework.reviewed_count + reviewed
+        )
+    )
+
+
+async def is_submission_reviewed(submission_id: int, db: AsyncSession) -> bool:
+    return await db.scalar(select(exists().where(HomeworkReview.submission_id == submission_id)))
+
+
 async def get_homework_or_none(homework_id, db, user):
-    result = await db.execute(select(Homework).where(Homework.id == homework_id).options(selectinload(Homework.lesson)
-                                                                                         .selectinload(Lesson.group)
-                                                                                         .selectinload(Group.students)
-                                                                                         ))
+    result = await db.execute(select(Homework).where(Homework.id == homework_id).options(selectinload(Homework.lesson)))
     homework = result.scalar_one_or_none()
     return homework
 
@@ -404,20 +622,17 @@ async def download_homework(homework_id: int, db: AsyncSession = Depends(get_asy
     ROLES -> teacher, admin
     '''
     homework = await get_homework_or_none(homework_id, db, user)
-    if user.role not in (Role.ADMIN, Role.TEACHER) and user.id not in get_group_students(homework.lesson.group):
-        raise HTTPException(status_code=403, detail="You are not allowed")
     if not homework:
-        raise HTTPException(status_code=404, detail="Submission not found")
+        raise HTTPException(status_code=404, detail="Homework not found")
+    if user.role not in (Role.ADMIN, Role.TEACHER):
+        await check_group_access(user, homework.lesson.group_id, db)
     if not homework.file_path:
         raise HTTPException(status_code=404, detail="No file attached")
 
     try:
-        file_stream = minio_client.download_file(homework.file_path)
-        return StreamingResponse(
-            file_stream,
-            media_type="application/octet-stream",
-            headers={"Content-Disposition": f"attachment; filename={os.path.basename(homework.file_path)}"},
-        )
+        return storage.download_response(homework.file_path)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Cannot generate download url: {e}")
 
@@ -444,14 +659,14 @@ async def update_homework(homework_id: int, deadline: datetime = Form(),
     if description:
         homework.description = description
     if file:
-        await validate_file(file)
+        await validate_file(file, TEACHER_MAX_FILE_SIZE_MB)
         file.file.seek(0)
         if homework.file_path:
             try:
-                minio_client.client.remove_object(minio_client.bucket_name, homework.file_path)
+                await storage.remove_file(homework.file_path)
             except:
                 pass
-        file_path = await minio_client.upload_file(file)
+        file_path = await storage.upload_file(file)
         homework.file_path = file_path
 
     await db.commit()
@@ -476,7 +691,7 @@ async def remove_file_from_homework(homework_id: int, db: AsyncSession = Depends
         raise HTTPException(status_code=403, detail="Not authorized")
     if homework.file_path:
         try:
-            minio_client.client.remove_object(minio_client.bucket_name, homework.file_path)
+            await storage.remove_file(homework.file_path)
         except:
             pass
     homework.file_path = None
@@ -502,7 +717,7 @@ async def destroy_homework(homework_id: int, db: AsyncSession = Depends(get_asyn
         raise HTTPException(status_code=403, detail="Not authorized")
     if homework.file_path:
         try:
-            minio_client.client.remove_object(minio_client.bucket_name, homework.file_path)
+            await storage.remove_file(homework.file_path)
         except Exception as e:
             logging.error(f"Failed to remove file {homework.file_path}: {e}")
 
@@ -524,43 +739,41 @@ async def submit_homework(homework_id: int, content: Optional[str] = Form(None),
     if not homework:
         raise HTTPException(status_code=404, detail=f'Homework with id {homework_id} not found')
 
-    students_ids = get_group_students(homework.lesson.group)
-    if user.role != Role.ADMIN and user.role != Role.TEACHER and user.id not in students_ids:
-        raise HTTPException(status_code=403, detail="You are not allowed")
+    if user.role not in (Role.ADMIN, Role.TEACHER):
+        await check_group_access(user, homework.lesson.group_id, db)
 
     if not file and not content:
         raise HTTPException(status_code=400, detail="Either file or content must be provided")
 
-    existing_submission_result = await db.execute(select(HomeworkSubmission).where(
-        (HomeworkSubmission.homework_id == homework_id) & (HomeworkSubmission.student_id == user.id)))
-    existing_submission = existing_submission_result.scalar_one_or_none()
-    if existing_submission:
-        raise HTTPException(status_code=400, detail="You have already submitted this homework")
-
     file_path = None
     if file:
         await validate_file(file)
         file.file.seek(0)
         try:
-            file_path = await minio_client.upload_file(file)
+            file_path = await storage.upload_file(file)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to upload file: {e}")
 
-    submission = HomeworkSubmission(
-        homework_id=homework_id,
-        student_id=user.id,
-        file_path=file_path,
-        content=content,
-        submitted_at=datetime.now(timezone.utc)
-
+    # the unique constraint settles concurrent submits, the loser gets no row back
+    submission = await db.scalar(
+        pg_insert(HomeworkSubmission).values(
+            homework_id=homework_id,
+            student_id=user.id,
+            file_path=file_path,
+            content=content,
+            submitted_at=datetime.now(timezone.utc)
+        ).on_conflict_do_nothing(constraint='uq_homework_submissions_homework_id_student_id')
+        .returning(HomeworkSubmission)
     )
+    if submission is None:
+        if file_path:
+            await storage.remove_file(file_path)
+        raise HTTPException(status_code=400, detail="You have already submitted this homework")
 
-    db.add(submission)
+    await update_homework_counters(homework_id, db, submissions=1)
     await db.commit()
-    await db.refresh(submission)
-    stmt = select(HomeworkSubmission).options(selectinload(HomeworkSubmission.review)).where(
-        HomeworkSubmission.id == submission.id)
-    submission_with_review = (await db.execute(stmt)).scalar_one()
+    # just created, so there is no review to load
+    set_committed_value(submission, 'review', None)
     return submission
 
 
@@ -584,6 +797,43 @@ async def get_homework_submissions(homework_id: int, db: AsyncSession = Depends(
     return submissions.scalars().all()
 
 
+def get_submission_archive_name(submission_id: int, first_name: str, last_name: str, file_path: str) -> str:
+    ext = os.path.splitext(file_path)[1]
+    student = f"{last_name}_{first_name}".replace('/', '_').replace('\\', '_')
+    return f"{student}_{submission_id}{ext}"
+
+
+@homework_submission_router.get('/homework/{homework_id}/download', name='download_homework_submissions')
+async def download_homework_submissions(homework_id: int, db: AsyncSession = Depends(get_async_session),
+                                        user: User = Depends(current_teacher_user)):
+    '''
+    Download all files of homework submissions as one zip archive\n
+    ROLES -> teacher, admin
+    '''
+    homework = await db.scalar(select(Homework.id).where(Homework.id == homework_id))
+    if homework is None:
+        raise HTTPException(status_code=404, detail="Homework not found")
+
+    result = await db.execute(
+        select(HomeworkSubmission.id, HomeworkSubmission.file_path, User.first_name, User.last_name)
+        .join(HomeworkSubmission.student)
+        .where(HomeworkSubmission.homework_id == homework_id, HomeworkSubmission.file_path.is_not(None))
+        .order_by(User.last_name, User.first_name, HomeworkSubmission.id)
+    )
+    entries = [
+        (get_submission_archive_name(row.id, row.first_name, row.last_name, row.file_path), row.file_path)
+        for row in result.all()
+    ]
+    if not entries:
+        raise HTTPException(status_code=404, detail="No files attached")
+
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=homework_{homework_id}_submissions.zip"},
+    )
+
+
 @homework_submission_router.get('/homework/{homework_id}/my_submission', response_model=HomeworkSubmissionRead,
                                 status_code=status.HTTP_200_OK)
 async def get_my_homework_submission(homework_id: int, db: AsyncSession = Depends(get_async_session),
@@ -595,8 +845,7 @@ async def get_my_homework_submission(homework_id: int, db: AsyncSession = Depend
     homework = await get_homework_or_none(homework_id, db, user)
     if not homework:
         raise HTTPException(status_code=404, detail="Submission not found")
-    if user.id not in get_group_students(homework.lesson.group) and user.role != Role.ADMIN:
-        raise HTTPException(status_code=403, detail="You are not allowed")
+    await check_group_access(user, homework.lesson.group_id, db)
     result = await db.execute(
         select(HomeworkSubmission)
         .where(
@@ -636,12 +885,9 @@ async def download_submission(submission_id: int, db: AsyncSession = Depends(get
         raise HTTPException(status_code=404, detail="No file attached")
 
     try:
-        file_stream = minio_client.download_file(submission.file_path)
-        return StreamingResponse(
-            file_stream,
-            media_type="application/octet-stream",
-            headers={"Content-Disposition": f"attachment; filename={os.path.basename(submission.file_path)}"},
-        )
+        return storage.download_response(submission.file_path)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Could not generate download URL: {e}")
 
@@ -753,10 +999,10 @@ async def update_homework_submission(submission_id: int, content: Optional[str]
         file.file.seek(0)
         if submission.file_path:
             try:
-                minio_client.client.remove_object(minio_client.bucket_name, submission.file_path)
+                await storage.remove_file(submission.file_path)
             except Exception:
                 pass
-        file_path = await minio_client.upload_file(file)
+        file_path = await storage.upload_file(file)
         submission.file_path = file_path
 
     await db.commit()
@@ -780,7 +1026,7 @@ async def remove_file_from_submission(submission_id: int, db: AsyncSession = Dep
         raise HTTPException(status_code=403, detail="You don't have enough permissions")
     if submission.file_path:
         try:
-            minio_client.client.remove_object(minio_client.bucket_name, submission.file_path)
+            await storage.remove_file(submission.file_path)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to remove file: {e}")
     submission.file_path = None
@@ -805,15 +1051,67 @@ async def destroy_homework_submission(submission_id: int,
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='You are not allowed')
     if submission.file_path:
         try:
-            minio_client.client.remove_object(minio_client.bucket_name, submission.file_path)
+            await storage.remove_file(submission.file_path)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to remove file: {e}")
 
+    reviewed = await is_submission_reviewed(submission_id, db)
     await db.delete(submission)
+    await update_homework_counters(submission.homework_id, db, submissions=-1, reviewed=-1 if reviewed else 0)
     await db.commit()
     return {"detail": f"Submission with id {submission_id} has been deleted"}
 
 
+@homework_review_router.get('/queue', response_model=ReviewQueueResponse, status_code=status.HTTP_200_OK)
+async def get_review_queue(cursor: Optional[str] = None, size: int = Query(20, ge=1, le=100),
+                           db: AsyncSession = Depends(get_async_session),
+                           user: User = Depends(current_teacher_user)):
+    '''
+    Returns submissions without any review, oldest first\n
+    Teachers get submissions for lessons they teach, admins get all of them,
+    pass next_cursor as cursor to get the next page\n
+    ROLES -> teacher, admin
+    '''
+    stmt = (
+        select(
+            HomeworkSubmission.id,
+            HomeworkSubmission.homework_id,
+            HomeworkSubmission.student_id,
+            func.concat(User.first_name, ' ', User.last_name).label('student_full_name'),
+            HomeworkSubmission.file_path,
+            HomeworkSubmission.content,
+            HomeworkSubmission.submitted_at,
+            Homework.deadline,
+            Lesson.id.label('lesson_id'),
+            Lesson.name.label('lesson_name'),
+            Group.id.label('group_id'),
+            Group.name.label('group_name'),
+        )
+        .join(Homework, Homework.id == HomeworkSubmission.homework_id)
+        .join(Lesson, Lesson.id == Homework.lesson_id)
+        .join(Group, Group.id == Lesson.group_id)
+        .join(User, User.id == HomeworkSubmission.student_id)
+        .where(~exists().where(HomeworkReview.submission_id == HomeworkSubmission.id))
+    )
+    if user.role != Role.ADMIN:
+        stmt = stmt.where(Lesson.teacher_id == user.id)
+    if cursor is not None:
+        cursor_submitted_at, cursor_id = decode_cursor(cursor, datetime.fromisoformat, int)
+        stmt = stmt.where(or_(
+            HomeworkSubmission.submitted_at > cursor_submitted_at,
+            and_(HomeworkSubmission.submitted_at == cursor_submitted_at, HomeworkSubmission.id > cursor_id)
+        ))
+    stmt = stmt.order_by(HomeworkSubmission.submitted_at, HomeworkSubmission.id).limit(size + 1)
+
+    rows = (await db.execute(stmt)).all()
+    has_next = len(rows) > size
+    rows = rows[:size]
+    return ReviewQueueResponse(
+        items=[ReviewQueueItem.model_validate(row, from_attributes=True) for row in rows],
+        next_cursor=encode_cursor(rows[-1].submitted_at, rows[-1].id) if has_next else None
+    )
+
+
 @homework_review_router.post('/submission/{submission_id}', response_model=HomeworkReviewRead,
                              status_code=status.HTTP_201_CREATED)
 async def create_homework_review(submission_id: int, data: HomeworkReviewCreate,
@@ -823,26 +1121,28 @@ async def create_homework_review(submission_id: int, data: HomeworkReviewCreate,
     Creates a homework review from the submitted data\n
     ROLES -> teacher, admin
     '''
-    result = await db.execute(select(HomeworkSubmission).where(HomeworkSubmission.id == submission_id)
-                              .options(selectinload(HomeworkSubmission.homework)
-                                       .selectinload(Homework.lesson)))
-    submission = result.scalar_one_or_none()
+    submission = (await db.execute(
+        select(HomeworkSubmission.homework_id, Lesson.teacher_id)
+        .join(Homework, Homework.id == HomeworkSubmission.homework_id)
+        .join(Lesson, Lesson.id == Homework.lesson_id)
+        .where(HomeworkSubmission.id == submission_id)
+    )).first()
     if submission is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Submission not found")
-    if user.role == Role.TEACHER and user.id != submission.homework.lesson.teacher_id:
+    if user.role == Role.TEACHER and user.id != submission.teacher_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='You are not allowed')
-    existing_review = (await db.execute(select(HomeworkReview)
-                                       .where((HomeworkReview.submission_id == submission_id) &
-                                              (HomeworkReview.teacher_id == user.id)))).scalar_one_or_none()
-    if existing_review:
-        raise HTTPException(status_code=400, detail='You have already review this submission')
     new_data = data.model_dump(exclude_unset=True)
     new_data['teacher_id'] = user.id
     new_data['submission_id'] = submission_id
-    review = HomeworkReview(**new_data)
-    db.add(review)
+    review = await db.scalar(
+        pg_insert(HomeworkReview).values(**new_data)
+        .on_conflict_do_nothing(constraint='uq_homework_reviews_submission_id')
+        .returning(HomeworkReview)
+    )
+    if review is None:
+        raise HTTPException(status_code=400, detail='This submission has already been reviewed')
+    await update_homework_counters(submission.homework_id, db, reviewed=1)
     await db.commit()
-    await db.refresh(review)
     return review
 
 
@@ -883,12 +1183,9 @@ async def update_homework_review(review_id: int, data: HomeworkReviewUpdate,
     Partial update homework review by review id\n
     ROLES -> teacher, admin
     '''
-    review = await get_review_or_none(review_id, db, user)
-    new_data = data.model_dump(exclude_unset=True)
-    for key, value in new_data.items():
-        setattr(review, key, value)
+    await get_review_or_none(review_id, db, user)
+    review = await update_returning(db, HomeworkReview, review_id, data.model_dump(exclude_unset=True))
     await db.commit()
-    await db.refresh(review)
     return review
 
 
@@ -901,5 +1198,6 @@ async def destroy_homework_review(review_id: int, db: AsyncSession = Depends(get
     '''
     review = await get_review_or_none(review_id, db, user)
     await db.delete(review)
+    await update_homework_counters(review.submission.homework_id, db, reviewed=-1)
     await db.commit()
     return {'detail': f"Review with id {review_id} has been deleted"}
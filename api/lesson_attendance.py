@@ -1,10 +1,11 @@
-from collections import defaultdict
+from datetime import date
 from math import ceil
 from typing import Annotated, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from pydantic import BaseModel, Field
-from sqlalchemy import func, select
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload, joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -12,12 +13,15 @@ from fastapi_filter.base.filter import FilterDepends
 from fastapi_filter.contrib.sqlalchemy import Filter
 
 from db.database import get_async_session
+from db.persistence import insert_returning, update_returning
 from api.auth import current_teacher_user
 from db.types import AttendanceStatus, Role
-from models.user import User
+from models.user import User, student_group_association_table
+from models.group import Group
 from models.lesson import Attendance, Lesson
 from schemas.group import GroupBase
 from schemas.lesson import (
+    AttendanceBulkMark,
     AttendanceCreate, 
     AttendanceGroup, 
     AttendanceItem, 
@@ -31,7 +35,10 @@ from schemas.lesson import (
     )
 
 from api.utils import validate_related_fields
-from schemas.pagination import Pagination
+from api.attendance_stats import get_attendance_stats, refresh_attendance_stats, refresh_lessons_attendance_stats
+from schemas.pagination import CursorPagination
+from utils.cursor import decode_cursor, encode_cursor
+from utils.date_time_utils import get_current_time
 
 attendance_router = APIRouter()
 
@@ -76,6 +83,11 @@ async def attendance_relates(attendance_data, session):
         await validate_related_fields(relates, session)
 
 
+async def attendance_stats_key(attendance: Attendance, session: AsyncSession):
+    lesson = await session.get(Lesson, attendance.lesson_id)
+    return (attendance.student_id, lesson.group_id if lesson else None)
+
+
 class AttendanceFilter(Filter):
     status__in: Optional[list[AttendanceStatus]] = None
 
@@ -113,14 +125,16 @@ class AttendanceFilter(Filter):
 )
 async def attendance_by_student(
     user_id: int,
-    page: Annotated[int, Query(ge=1)] = 1,
+    cursor: Optional[str] = None,
     size: Annotated[int, Query(ge=1, le=100)] = 20,
     attendance_filter: AttendanceFilter = FilterDepends(AttendanceFilter),
     user: User = Depends(current_teacher_user),
     session: AsyncSession = Depends(get_async_session)
 ):
     '''
-    RETURNS student attendance by user_id 
+    RETURNS student attendance by user_id, latest lessons first
+
+    pass pagination.next_cursor as cursor to get the next page
 
     ROLES: teacher or admin
 
@@ -128,7 +142,6 @@ async def attendance_by_student(
 
     ADMIN -> has no restrictions
     '''
-    offset = (page-1)*size
     user_item = await session.get(User, user_id)
     if user_item is None:
         raise HTTPException(
@@ -136,66 +149,82 @@ async def attendance_by_student(
             detail='user not found'
             )
 
-    stmt = (
-        select(Attendance)
-        .join(Attendance.lesson)
-        .join(Lesson.group)
-        .options(
-            joinedload(Attendance.lesson).joinedload(Lesson.group)
-            )
+    filtered = attendance_filter.filter(
+        select(
+            Attendance.id,
+            Attendance.status,
+            Attendance.created_at,
+            Attendance.student_id,
+            Lesson.id.label('lesson_id'),
+            Lesson.name.label('lesson_name'),
+            Lesson.day,
+            Lesson.lesson_start,
+            Lesson.lesson_end,
+            Group.id.label('group_id'),
+            Group.name.label('group_name')
+        )
+        .select_from(Attendance)
+        .join(Lesson, Lesson.id == Attendance.lesson_id)
+        .join(Group, Group.id == Lesson.group_id)
         .where(
             Lesson.passed.is_(True),
             Attendance.student_id == user_id
             )
-        .offset(offset=offset)
-        .limit(limit=size)
-    )
-    total_stmt = (
-        select(func.count()).select_from(Attendance)
-        .join(Attendance.lesson)
-        .join(Lesson.group)
-        .where(
-        Lesson.passed.is_(True),
-        Attendance.student_id == user_id
-        )
     )
-    total_items = (await session.execute(total_stmt)).scalar_one()
-
-    total_pages = ceil(total_items / size) if total_items else 1
-
-    if page > total_pages:
-        page = total_pages
-
-    attendance_dict = defaultdict(list)
-
-    filter_stmt = attendance_filter.filter(stmt)
-    result = await session.execute(filter_stmt)
-    attendance_items = result.scalars().all()
-
-    for item in attendance_items:
-        attendance_dict[item.lesson.group].append(
+    # total is counted without the cursor, so it is the same on every page
+    total_items = await session.scalar(select(func.count()).select_from(filtered.subquery()))
+
+    # the cursor filters the page query itself, not a windowed subquery
+    stmt = filtered
+    if cursor is not None:
+        cursor_day, cursor_id = decode_cursor(cursor, date.fromisoformat, int)
+        stmt = stmt.where(or_(
+            Lesson.day < cursor_day,
+            and_(Lesson.day == cursor_day, Attendance.id > cursor_id)
+        ))
+    stmt = stmt.order_by(Lesson.day.desc(), Attendance.id).limit(size + 1)
+
+    rows = (await session.execute(stmt)).all()
+    has_next = len(rows) > size
+    rows = rows[:size]
+
+    attendance_groups = {}
+    for row in rows:
+        if row.group_id not in attendance_groups:
+            attendance_groups[row.group_id] = AttendanceWithGroup(
+                group=AttendanceGroup(id=row.group_id, name=row.group_name),
+                attendance=[]
+            )
+        attendance_groups[row.group_id].attendance.append(
             AttendanceItem(
-                id=item.id,
-                status=item.status,
-                created_at=item.created_at,
-                student_id=item.student_id,
-                lesson=AttendanceLesson.model_validate(item.lesson)
+                id=row.id,
+                status=row.status,
+                created_at=row.created_at,
+                student_id=row.student_id,
+                lesson=AttendanceLesson(
+                    id=row.lesson_id,
+                    name=row.lesson_name,
+                    day=row.day,
+                    lesson_start=row.lesson_start,
+                    lesson_end=row.lesson_end
+                )
             )
         )
-    attendance = UserAttendanceResponse(
-            attendance_groups = [
-                AttendanceWithGroup(
-                    group=AttendanceGroup.model_validate(group),
-                    attendance=attendance_list
-                ) for group, attendance_list in attendance_dict.items()
-            ],
-            pagination = Pagination(
-                current_page_size=size,
-                current_page=page,
-                total_pages=total_pages
-                )
+
+    stats = await get_attendance_stats(session, [user_id], attendance_groups)
+    for group_id, attendance_group in attendance_groups.items():
+        if (user_id, group_id) in stats:
+            attendance_group.attendance_percent = stats[(user_id, group_id)].attendance_percent
+
+    return UserAttendanceResponse(
+        attendance_groups=list(attendance_groups.values()),
+        pagination=CursorPagination(
+            current_page_size=len(rows),
+            total_items=total_items,
+            total_pages=ceil(total_items / size) if total_items else 1,
+            next_cursor=encode_cursor(rows[-1].day, rows[-1].id) if has_next else None
+        )
     )
-    return attendance
 
 
 @attendance_router.get(
@@ -253,7 +282,7 @@ async def attendance_create(
     ADMIN -> has no restrictions
     '''
 
-    await validate_related_fields(attendance_data, session)
+    await attendance_relates(attendance_data, session)
     smtm = select(Attendance).where(
             Attendance.student_id == attendance_data.student_id,
             Attendance.lesson_id == attendance_data.lesson_id
@@ -264,10 +293,10 @@ async def attendance_create(
             status_code=status.HTTP_409_CONFLICT,
             detail='attendance exists'
         )
-    attendance = Attendance(**attendance_data.model_dump())
-    session.add(attendance)
+    attendance = await insert_returning(session, Attendance, attendance_data.model_dump(),
+                                        options=[joinedload(Attendance.student)])
+    await refresh_attendance_stats(session, [await attendance_stats_key(attendance, session)])
     await session.commit()
-    await session.refresh(attendance, attribute_names=['student'])
     return attendance
 
 
@@ -302,11 +331,13 @@ async def attendance_update(
 
     await attendance_relates(attendance_data, session)
 
-    for key, value in attendance_data.model_dump().items():
-        setattr(attendance,key,value)
-    
+    stats_keys = {await attendance_stats_key(attendance, session)}
+    attendance = await update_returning(session, Attendance, attendance_id, attendance_data.model_dump(),
+                                        options=[joinedload(Attendance.student)])
+    stats_keys.add(await attendance_stats_key(attendance, session))
+    await refresh_attendance_stats(session, stats_keys)
+
     await session.commit()
-    await session.refresh(attendance, attribute_names=['student'])
     return attendance
 
 
@@ -342,11 +373,13 @@ async def attendance_partial_update(
 
     await attendance_relates(attendance_data, session)
 
-    for key, value in attendance_data.model_dump(exclude_unset=True).items():
-        setattr(attendance,key,value)
-    
+    stats_keys = {await attendance_stats_key(attendance, session)}
+    attendance = await update_returning(session, Attendance, attendance_id, attendance_data.model_dump(exclude_unset=True),
+                                        options=[joinedload(Attendance.student)])
+    stats_keys.add(await attendance_stats_key(attendance, session))
+    await refresh_attendance_stats(session, stats_keys)
+
     await session.commit()
-    await session.refresh(attendance, attribute_names=['student'])
     return attendance
 
 
@@ -376,7 +409,10 @@ async def attendance_delete(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='attendance not found'
             )
+    stats_key = await attendance_stats_key(attendance, session)
     await session.delete(attendance)
+    await session.flush()
+    await refresh_attendance_stats(session, [stats_key])
     await session.commit()
     return
 
@@ -431,3 +467,87 @@ async def user_attendance_by_lesson(
     result = await session.execute(stmt)
     attendance = result.scalars().all()
     return attendance
+
+
+@attendance_router.put(
+    '/lesson/{lesson_id}',
+    response_model=List[AttendanceResponse],
+    status_code=status.HTTP_200_OK
+)
+async def lesson_attendance_mark(
+    lesson_id: int,
+    attendance_data: AttendanceBulkMark,
+    user: User = Depends(current_teacher_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    '''
+    MARKS attendance of the whole lesson and sets the lesson passed
+
+    attendance is a map of student_id -> status, missing rows are created
+
+    ROLES: teacher or admin
+
+    TEACHER -> can mark the attendance of only those lessons where he is the teacher
+
+    ADMIN -> has no restrictions
+    '''
+    lesson = await session.get(Lesson, lesson_id)
+    if lesson is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='lesson not found'
+            )
+    if user.role == Role.TEACHER and lesson.teacher_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="you haven't permission"
+            )
+
+    student_ids = set(attendance_data.attendance)
+    result = await session.execute(
+        select(student_group_association_table.c.user_id).where(
+            student_group_association_table.c.group_id == lesson.group_id,
+            student_group_association_table.c.user_id.in_(student_ids)
+        )
+    )
+    unknown_ids = student_ids - set(result.scalars().all())
+    if unknown_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'students {sorted(unknown_ids)} are not in the lesson group'
+            )
+
+    now = get_current_time()
+    stmt = insert(Attendance).values([
+        {
+            'status': attendance_status,
+            'student_id': student_id,
+            'lesson_id': lesson_id,
+            'created_at': now,
+            'updated_at': now
+        } for student_id, attendance_status in attendance_data.attendance.items()
+    ])
+    await session.execute(
+        stmt.on_conflict_do_update(
+            constraint='uq_attendances_student_id_lesson_id',
+            set_={'status': stmt.excluded.status, 'updated_at': now}
+        )
+    )
+    await session.execute(
+        update(Lesson).where(Lesson.id == lesson_id).values(passed=True)
+    )
+    # the lesson just became passed, so every student with a row in it is recounted,
+    # including the ones create_lesson marked absent and the request didn't mention
+    await refresh_lessons_attendance_stats(session, [lesson_id])
+    await session.commit()
+
+    result = await session.execute(
+        select(Attendance)
+        .options(joinedload(Attendance.student))
+        .where(
+            Attendance.lesson_id == lesson_id,
+            Attendance.student_id.in_(student_ids)
+        )
+        .order_by(Attendance.student_id)
+    )
+    return result.scalars().all()
@@ -0,0 +1,91 @@
+import logging
+from datetime import datetime
+from typing import List
+
+from decouple import config
+from sqlalchemy import Row, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.attendance_stats import refresh_lessons_attendance_stats
+from api.lesson_conflicts import LESSON_COMPLETION_LOCK
+from db.database import async_session_maker, engine
+from models.lesson import Lesson
+from utils.date_time_utils import get_current_time, get_iso_week
+from utils.shedule_cache import shedule_cache
+
+
+LESSON_COMPLETION_BATCH_SIZE = config('LESSON_COMPLETION_BATCH_SIZE', default=500, cast=int)
+LESSON_COMPLETION_INTERVAL_MINUTES = config('LESSON_COMPLETION_INTERVAL_MINUTES', default=15, cast=int)
+
+
+LESSON_COMPLETION_LOCK_KEY = LESSON_COMPLETION_LOCK << 60
+
+
+async def complete_lessons_batch(session: AsyncSession, now: datetime, limit: int) -> List[Row]:
+    '''
+    Marks up to limit lessons that ended before now as passed and recounts attendance stats
+    of their students\n
+    Rows are picked with FOR UPDATE SKIP LOCKED from the partial index of un-passed lessons,
+    so lessons being edited at the moment are left for the next batch
+    '''
+    batch = (
+        select(Lesson.id)
+        .where(
+            Lesson.passed.is_not(True),
+            Lesson.day <= now.date(),
+            Lesson.day + Lesson.lesson_end < now,
+        )
+        .order_by(Lesson.day)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .cte('batch')
+    )
+    result = await session.execute(
+        update(Lesson)
+        .where(Lesson.id.in_(select(batch.c.id)))
+        .values(passed=True)
+        .returning(Lesson.id, Lesson.day, Lesson.group_id, Lesson.teacher_id)
+        .execution_options(synchronize_session=False)
+    )
+    rows = result.all()
+    if rows:
+        await refresh_lessons_attendance_stats(session, [row.id for row in rows])
+    return rows
+
+
+async def complete_past_lessons():
+    '''
+    Scheduled job, marks every finished lesson as passed in batches of
+    LESSON_COMPLETION_BATCH_SIZE, each batch is committed separately.\n
+    The whole run holds a session-level advisory lock, so with several workers
+    only one of them completes lessons and the others skip the run.
+    Lesson day and time are compared with the current UTC time, like the rest of the api
+    '''
+    now = get_current_time().replace(tzinfo=None)
+    completed = 0
+    # a session-level lock belongs to the connection, so every batch runs on this one
+    async with engine.connect() as connection:
+        locked = await connection.scalar(select(func.pg_try_advisory_lock(LESSON_COMPLETION_LOCK_KEY)))
+        await connection.commit()
+        if not locked:
+            logging.info("Lesson completion is already running in another worker")
+            return
+        try:
+            async with async_session_maker(bind=connection) as session:
+                while True:
+                    rows = await complete_lessons_batch(session, now, LESSON_COMPLETION_BATCH_SIZE)
+                    await session.commit()
+                    if rows:
+                        completed += len(rows)
+                        shedule_cache.invalidate_lessons(
+                            [get_iso_week(row.day) for row in rows],
+                            [row.group_id for row in rows],
+                            [row.teacher_id for row in rows]
+                        )
+                    if len(rows) < LESSON_COMPLETION_BATCH_SIZE:
+                        break
+        finally:
+            await connection.scalar(select(func.pg_advisory_unlock(LESSON_COMPLETION_LOCK_KEY)))
+            await connection.commit()
+    if completed:
+        logging.info(f"Lessons marked as passed: {completed}")
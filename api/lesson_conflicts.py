@@ -0,0 +1,171 @@
+import datetime
+from collections import defaultdict
+from typing import Iterable, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import BigInteger, Date, Integer, Time, and_, bindparam, column, func, or_, select, values
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.lesson import Lesson
+from schemas.lesson import LessonConflict, LessonConflictCheck
+
+
+# advisory lock namespaces, one lock per (resource, day)
+CLASSROOM_LOCK = 1
+TEACHER_LOCK = 2
+# single lock of the lesson completion job
+LESSON_COMPLETION_LOCK = 3
+
+
+def get_lock_key(namespace: int, resource_id: int, day: datetime.date) -> int:
+    return (namespace << 60) | (resource_id << 24) | day.toordinal()
+
+
+async def lock_lesson_slots(
+    session: AsyncSession, days: Iterable[datetime.date], teacher_id: int, classroom_id: int
+):
+    '''
+    Serializes concurrent writes for the same classroom/teacher and day until
+    transaction end, so two overlapping lessons can't both pass the check.
+    All locks are taken in one statement, in sorted order to avoid deadlocks
+    '''
+    keys = sorted({
+        get_lock_key(namespace, resource_id, day)
+        for day in days
+        for namespace, resource_id in ((CLASSROOM_LOCK, classroom_id), (TEACHER_LOCK, teacher_id))
+    })
+    locks = func.unnest(bindparam('keys', keys, type_=ARRAY(BigInteger))).table_valued(
+        'key', with_ordinality='ord'
+    ).render_derived(name='locks')
+    await session.execute(
+        select(func.pg_advisory_xact_lock(locks.c.key)).select_from(locks).order_by(locks.c.ord)
+    )
+
+
+async def find_lesson_conflicts(
+    session: AsyncSession,
+    days: List[datetime.date],
+    lesson_start: datetime.time,
+    lesson_end: datetime.time,
+    teacher_id: int,
+    classroom_id: int,
+    exclude_lesson_id: Optional[int] = None,
+) -> List[Lesson]:
+    '''
+    Lessons overlapping the slot on any of the days in the same classroom or with
+    the same teacher, resolved by (classroom_id, day) and (teacher_id, day) index lookups
+    '''
+    stmt = (
+        select(Lesson)
+        .where(
+            Lesson.day.in_(days),
+            Lesson.lesson_start < lesson_end,
+            Lesson.lesson_end > lesson_start,
+            or_(Lesson.teacher_id == teacher_id, Lesson.classroom_id == classroom_id),
+        )
+        .order_by(Lesson.day, Lesson.lesson_start)
+    )
+    if exclude_lesson_id is not None:
+        stmt = stmt.where(Lesson.id != exclude_lesson_id)
+    result = await session.execute(stmt)
+    return result.scalars().all()
+
+
+async def ensure_no_lesson_conflicts(
+    session: AsyncSession,
+    days: List[datetime.date],
+    lesson_start: datetime.time,
+    lesson_end: datetime.time,
+    teacher_id: int,
+    classroom_id: int,
+    exclude_lesson_id: Optional[int] = None,
+):
+    '''
+    Locks the slot on every day and raises 409 if any of them is already taken
+    '''
+    await lock_lesson_slots(session, days, teacher_id, classroom_id)
+    conflicts = await find_lesson_conflicts(
+        session, days, lesson_start, lesson_end, teacher_id, classroom_id, exclude_lesson_id
+    )
+    if conflicts:
+        reasons = []
+        for lesson in conflicts:
+            reason = 'classroom' if lesson.classroom_id == classroom_id else 'teacher'
+            reasons.append(
+                f"lesson {lesson.id} ({lesson.day} {lesson.lesson_start:%H:%M}-{lesson.lesson_end:%H:%M}, same {reason})"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Lesson overlaps with {', '.join(reasons)}"
+        )
+
+
+def find_batch_conflicts(lessons: List[LessonConflictCheck]) -> List[LessonConflict]:
+    '''
+    Overlaps inside the proposed timetable, sweep over lessons sorted by start
+    for every classroom/teacher and day
+    '''
+    slots = defaultdict(list)
+    for index, lesson in enumerate(lessons):
+        slots[('classroom', lesson.classroom_id, lesson.day)].append(index)
+        slots[('teacher', lesson.teacher_id, lesson.day)].append(index)
+
+    conflicts = []
+    for (reason, _, _), indexes in slots.items():
+        if len(indexes) < 2:
+            continue
+        indexes.sort(key=lambda index: lessons[index].lesson_start)
+        active = []
+        for index in indexes:
+            start = lessons[index].lesson_start
+            active = [other for other in active if lessons[other].lesson_end > start]
+            for other in active:
+                conflicts.append(LessonConflict(index=index, reason=reason, other_index=other))
+            active.append(index)
+    return conflicts
+
+
+async def check_timetable_conflicts(
+    session: AsyncSession, lessons: List[LessonConflictCheck]
+) -> List[LessonConflict]:
+    '''
+    Conflicts of proposed lessons with stored lessons (one query joined
+    on a VALUES list) and with each other
+    '''
+    if not lessons:
+        return []
+    proposed = values(
+        column('idx', Integer),
+        column('lesson_id', Integer),
+        column('day', Date),
+        column('lesson_start', Time),
+        column('lesson_end', Time),
+        column('teacher_id', Integer),
+        column('classroom_id', Integer),
+        name='proposed',
+    ).data([
+        (index, lesson.lesson_id, lesson.day, lesson.lesson_start, lesson.lesson_end,
+         lesson.teacher_id, lesson.classroom_id)
+        for index, lesson in enumerate(lessons)
+    ])
+    same_classroom = Lesson.classroom_id == proposed.c.classroom_id
+    stmt = (
+        select(proposed.c.idx, Lesson.id, same_classroom)
+        .select_from(proposed)
+        .join(Lesson, and_(
+            Lesson.day == proposed.c.day,
+            Lesson.lesson_start < proposed.c.lesson_end,
+            Lesson.lesson_end > proposed.c.lesson_start,
+            or_(Lesson.teacher_id == proposed.c.teacher_id, same_classroom),
+            Lesson.id.is_distinct_from(proposed.c.lesson_id),
+        ))
+        .order_by(proposed.c.idx, Lesson.lesson_start)
+    )
+    result = await session.execute(stmt)
+    conflicts = [
+        LessonConflict(index=index, reason='classroom' if is_same_classroom else 'teacher', lesson_id=lesson_id)
+        for index, lesson_id, is_same_classroom in result.all()
+    ]
+    conflicts.extend(find_batch_conflicts(lessons))
+    return conflicts
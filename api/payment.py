@@ -1,16 +1,14 @@
 import logging
 import uuid
-import os
 from datetime import date, datetime, timedelta
 from math import ceil
-from typing import Dict, List, Optional, Annotated
+from typing import List, Optional, Annotated
 
 from dateutil.relativedelta import relativedelta
 from fastapi import Depends, HTTPException, routing, status, Query, UploadFile, File, Form
-from fastapi.responses import StreamingResponse
 from sqlalchemy import select, and_, desc, or_, func, distinct
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 
 from fastapi_filter.contrib.sqlalchemy import Filter
 from fastapi_filter.base.filter import FilterDepends
@@ -18,7 +16,7 @@ from fastapi_filter.base.filter import FilterDepends
 from api.auth import current_admin_user, current_user, current_student_user
 from api.utils import validate_related_fields
 from db.database import get_async_session
-from db.dbbase import Base
+from db.persistence import insert_returning, update_returning
 
 from db.types import (Currency, PaymentDetailStatus, PaymentMethod,
                       PaymentStatus, SubscriptionStatus, Role)
@@ -36,7 +34,7 @@ from schemas.payment import (
 from schemas.pagination import PaginatedResponse, Pagination
 
 from utils.ext_and_size_validation_file import validate_file
-from utils.minio_client import minio_client
+from utils.storage import storage
 from utils.checks_filters import CheckParams, build_checks_query, build_finance_query
 
 import stripe
@@ -71,15 +69,16 @@ class PaymentFilter(Filter):
     class Constants(Filter.Constants):
         model = Payment
 
-async def validate_related_fields(models_ids: Dict[Base, int], session: AsyncSession):
-    for model, m_id in models_ids.items():
-        if not await session.get(model, m_id):
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail={'detail':f'{model.__name__} not found'}
-                )
-    return
 
+async def validate_payment_related_fields(models_ids, session: AsyncSession):
+    '''
+    Shared batched check, the 404 keeps the nested detail
+    {'detail': '... not found'} that payment routes have always answered with
+    '''
+    try:
+        await validate_related_fields(models_ids, session)
+    except HTTPException as e:
+        raise HTTPException(status_code=e.status_code, detail={'detail': e.detail}) from None
 
 
 # @subscription_router.get(
@@ -334,7 +333,7 @@ async def payment_create(
     ROLES -> admin
     '''
 
-    await validate_related_fields(
+    await validate_payment_related_fields(
         {
             User: payment_create.owner_id,
             # Subscription: payment_create.subscription_id
@@ -342,19 +341,9 @@ async def payment_create(
         session=session
     )
 
-    payment = Payment(**payment_create.model_dump())
-
-    session.add(payment)
+    payment = await insert_returning(session, Payment, payment_create.model_dump(),
+                                     options=[joinedload(Payment.owner), joinedload(Payment.group)])
     await session.commit()
-    await session.refresh(payment, attribute_names=[
-        'owner',
-        'group'
-        # 'subscription'
-        ]
-    )
-
-
-
     return payment
 
 @payment_router.put(
@@ -374,29 +363,15 @@ async def payment_update(
     ROLES -> admin
     '''
 
-    payment = await session.get(
-        Payment,
-        payment_id,
-        options=[
-            selectinload(Payment.owner),
-            # selectinload(Payment.subscription)
-            ]
-        )
-
+    payment = await update_returning(session, Payment, payment_id, payment_update.model_dump(),
+                                     options=[joinedload(Payment.owner), joinedload(Payment.group)])
     if not payment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={'detail': 'Payment not found'}
 
             )
-
-    for key, value in payment_update.model_dump().items():
-        setattr(payment, key, value)
     await session.commit()
-    await session.refresh(payment, attribute_names=[
-        'owner',
-        'group'
-    ])
     return payment
 
 
@@ -418,30 +393,15 @@ async def payment_partial_update(
     ROLES -> admin
     '''
 
-    payment = await session.get(
-        Payment,
-        payment_id,
-        options=[
-            selectinload(Payment.owner),
-            # selectinload(Payment.subscription)
-            ]
-        )
-
+    payment = await update_returning(session, Payment, payment_id, payment_update.model_dump(exclude_unset=True),
+                                     options=[joinedload(Payment.owner), joinedload(Payment.group)])
     if not payment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={'detail': 'Payment not found'}
 
             )
-    for key, value in payment_update.model_dump(exclude_unset=True).items():
-        setattr(payment, key, value)
-
-
     await session.commit()
-    await session.refresh(payment, attribute_names=[
-        'owner',
-        'group'
-    ])
     return payment
 
 @payment_router.delete(
@@ -683,7 +643,7 @@ async def create_payment_requisite(bank_name: str = Form(None), account: str = F
     if not qr.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="QR file must be an image")
     try:
-        file_path = await minio_client.upload_file(qr)
+        file_path = await storage.upload_file(qr, public=True)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload file: {e}")
 
@@ -723,10 +683,10 @@ async def update_payment_requisites(requisite_id: int, bank_name: Optional[str]
             raise HTTPException(status_code=400, detail="QR file must be an image")
         if requisites.qr:
             try:
-                minio_client.client.remove_object(minio_client.bucket_name, requisites.qr)
+                await storage.remove_file(requisites.qr)
             except Exception as e:
                 logging.warning(f"Failed to delete previous QR: {e}")
-        qr_path = await minio_client.upload_file(qr)
+        qr_path = await storage.upload_file(qr, public=True)
         requisites.qr = qr_path
     await db.commit()
     await db.refresh(requisites)
@@ -738,7 +698,7 @@ async def get_requisite_by_id(requisite_id: int, db: AsyncSession = Depends(get_
     requisites = await get_requisite_or_none(requisite_id, db)
     url = None
     if requisites.qr is not None:
-        url = minio_client.get_file_url(requisites.qr)
+        url = storage.get_file_url(requisites.qr)
     return {"bank_name": requisites.bank_name, "account": requisites.account, "qr_url": url}
 
 
@@ -751,7 +711,7 @@ async def get_requisites_list(db: AsyncSession = Depends(get_async_session)):
             id=i.id,
             bank_name=i.bank_name,
             account=i.account,
-            qr=minio_client.get_file_url(i.qr) if i.qr else None,
+            qr=storage.get_file_url(i.qr) if i.qr else None,
         )
         for i in items
     ]
@@ -765,7 +725,7 @@ async def destroy_requisite_by_id(requisite_id: int, db: AsyncSession = Depends(
     requisites = await get_requisite_or_none(requisite_id, db)
     if requisites.qr:
         try:
-            minio_client.client.remove_object(minio_client.bucket_name, requisites.qr)
+            await storage.remove_file(requisites.qr)
         except Exception as e:
             logging.warning(f"Failed to delete QR from MinIO: {e}")
     await db.delete(requisites)
@@ -795,7 +755,7 @@ async def create_payment_check(group_id: int, check: UploadFile = File(...),
     await validate_file(check)
     check.file.seek(0)
     try:
-        file_path = await minio_client.upload_file(check)
+        file_path = await storage.upload_file(check)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload file: {e}")
     new_check = PaymentCheck(
@@ -836,12 +796,9 @@ async def download_check(check_id: int, db: AsyncSession = Depends(get_async_ses
     if not check.check:
         raise HTTPException(status_code=404, detail="No file attached")
     try:
-        file_stream = minio_client.download_file(check.check)
-        return StreamingResponse(
-            file_stream,
-            media_type="application/octet-stream",
-            headers={"Content-Disposition": f"attachment; filename={os.path.basename(check.check)}"},
-        )
+        return storage.download_response(check.check)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Could not generate download URL: {e}")
 
@@ -868,10 +825,10 @@ async def update_payment_check(check_id: int, group_id: Optional[int] = None,
         file.file.seek(0)
         if check.check:
             try:
-                minio_client.client.remove_object(minio_client.bucket_name, check.check)
+                await storage.remove_file(check.check)
             except Exception as e:
                 logging.warning(f"Failed to delete previous QR: {e}")
-        check_path = await minio_client.upload_file(file)
+        check_path = await storage.upload_file(file)
         check.check = check_path
     await db.commit()
     await db.refresh(check)
@@ -939,7 +896,7 @@ async def destroy_check_by_id(check_id: int, db: AsyncSession = Depends(get_asyn
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not allowed")
     if check.check:
         try:
-            minio_client.client.remove_object(minio_client.bucket_name, check.check)
+            await storage.remove_file(check.check)
         except Exception as e:
             logging.warning(f"Failed to delete previous Check: {e}")
 
@@ -1,7 +1,7 @@
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 
-from sqlalchemy import Select, select
+from sqlalchemy import Select, exists, or_, select
 from sqlalchemy.orm import class_mapper, selectinload, joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -9,7 +9,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from db.dbbase import Base
 from db.database import get_async_session
 from models.group import Group
-from models.user import User
+from db.types import Role
+from models.user import User, student_group_association_table
+from utils.access_cache import group_access_cache
 
 from functools import reduce
 
@@ -26,6 +28,40 @@ def require_roles(*roles : str):
     return check_roles
 
 
+async def is_group_member(user_id: int, group_id: int, session: AsyncSession) -> bool:
+    """
+    Checks if the user is a student or the teacher of the group with one EXISTS
+    query on primary key indexes.
+    The answer is memoised in session.info for the rest of the request
+    and in group_access_cache for a few seconds
+    """
+    key = (user_id, group_id)
+    memo = session.info.setdefault('group_access', {})
+    if key in memo:
+        return memo[key]
+
+    allowed = group_access_cache.get(key)
+    if allowed is None:
+        generation = group_access_cache.generation
+        students = student_group_association_table
+        allowed = await session.scalar(select(or_(
+            exists().where(students.c.user_id == user_id, students.c.group_id == group_id),
+            exists().where(Group.id == group_id, Group.teacher_id == user_id)
+        )))
+        group_access_cache.set(key, allowed, generation)
+    memo[key] = allowed
+    return allowed
+
+
+async def check_group_access(user: User, group_id: int, session: AsyncSession):
+    """
+    Raises 403 unless the user is an admin, a student or the teacher of the group
+    """
+    if user.role == Role.ADMIN or await is_group_member(user.id, group_id, session):
+        return
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not allowed")
+
+
 
 # def find_user_field(model: Base) -> str | None:
 #     '''
@@ -1,12 +1,13 @@
-from collections import defaultdict
-from typing import Dict, List
-from fastapi import APIRouter, Depends, status, HTTPException
+from typing import Awaitable, Callable, Dict, List, Literal, Optional, Tuple
+from fastapi import APIRouter, Depends, Query, Request, Response, status, HTTPException
 
 import calendar
 import datetime
+import hashlib
+import hmac
+from email.utils import format_datetime, parsedate_to_datetime
 
-from sqlalchemy import Sequence, select
-from sqlalchemy.orm import selectinload, with_loader_criteria, joinedload
+from sqlalchemy import Row, String, func, select, type_coerce
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.auth import (
@@ -17,204 +18,282 @@ from api.auth import (
     current_student_user
     )
 
+from decouple import config
 from fastapi_filter import FilterDepends
 from fastapi_filter.contrib.sqlalchemy import Filter
 
 from db.database import get_async_session
 from db.types import Role
 from models.group import Group
-from models.lesson import Lesson
-from models.user import User
-from models.course import Course
+from models.lesson import Classroom, Lesson
+from models.user import User, student_group_association_table
 from schemas.lesson import LessonBase
-from schemas.shedule import SheduleGroup, SheduleLesson, SheduleResponse
-from utils.date_time_utils import get_current_time, get_week_start_end
+from schemas.shedule import SHEDULE_ADAPTER, SheduleResponse
+from utils.date_time_utils import get_current_time, get_week_start_end, get_iso_week, get_iso_week_start_end
+from utils.shedule_cache import CacheKey, shedule_cache
+from utils.icalendar import IcsEvent, build_calendar
 
 shedule_router = APIRouter()
 
+SHEDULE_MAX_RANGE_DAYS = 62
 
-# current_calendar = calendar.Calendar()
+Period = Tuple[datetime.date, datetime.date]
 
+IcsVariant = Literal['student', 'teacher', 'group']
+ICS_SECRET = config('SECRET')
+ICS_PAST_DAYS = 30
+ICS_FUTURE_DAYS = 180
 
 
-def format_shedule(groups_lessons: Sequence[Group]) -> Dict:
+WEEK_DAYS = [day_abbr.upper() for day_abbr in calendar.day_abbr]
+
+SHEDULE_COLUMNS = (
+    Group.id.label('group_id'),
+    Group.name.label('group_name'),
+    Lesson.id,
+    Lesson.name,
+    Lesson.description,
+    # plain string, skips HttpUrl parsing for every row
+    type_coerce(Lesson.link, String).label('link'),
+    Lesson.day,
+    Lesson.lesson_start,
+    Lesson.lesson_end,
+    User.id.label('teacher_id'),
+    User.first_name,
+    User.last_name,
+    User.email,
+    User.phone_number,
+    User.role,
+    User.description.label('teacher_description'),
+    Classroom.id.label('classroom_id'),
+    Classroom.name.label('classroom_name'),
+)
+
+
+def format_shedule(rows: List[Row]) -> Dict:
     '''
-    format orm result into response
+    format rows ordered by (day, lesson_start) into response in one pass
     '''
-    buff_dict = defaultdict(list)
-    result_dict = defaultdict(list)
-    group_lessons: Group
-    lesson: Lesson
-    if groups_lessons is None:
-        return SheduleResponse().model_dump()
-    for group_lessons in groups_lessons:
-        for lesson in group_lessons.lessons:
-            week_day = calendar.day_abbr[lesson.day.weekday()].upper()
-            buff_dict[week_day].append(SheduleLesson.model_validate(lesson))
-    
-        for week_day, lessons in buff_dict.items():
-            result_dict[week_day].append(
-                {
-                'group' : SheduleGroup.model_validate(group_lessons),
-                'lessons' : lessons
-                }
-            )
-        buff_dict.clear()
+    result = dict.fromkeys(WEEK_DAYS)
+    items = {}
+    teachers = {}
+    classrooms = {}
+    for (group_id, group_name, lesson_id, name, description, link, day, lesson_start, lesson_end,
+         teacher_id, first_name, last_name, email, phone_number, role, teacher_description,
+         classroom_id, classroom_name) in rows:
+        week_day = WEEK_DAYS[day.weekday()]
+        item = items.get((week_day, group_id))
+        if item is None:
+            item = items[(week_day, group_id)] = {
+                'group': {'id': group_id, 'name': group_name},
+                'lessons': []
+            }
+            if result[week_day] is None:
+                result[week_day] = []
+            result[week_day].append(item)
+
+        teacher = teachers.get(teacher_id)
+        if teacher is None:
+            teacher = teachers[teacher_id] = {
+                'id': teacher_id,
+                'first_name': first_name,
+                'last_name': last_name,
+                'email': email,
+                'phone_number': phone_number,
+                'role': role,
+                'description': teacher_description,
+            }
+        classroom = classrooms.get(classroom_id)
+        if classroom is None:
+            classroom = classrooms[classroom_id] = {'id': classroom_id, 'name': classroom_name}
 
-    return result_dict
+        item['lessons'].append({
+            'id': lesson_id,
+            'name': name,
+            'description': description,
+            'link': link,
+            'day': day,
+            'lesson_start': lesson_start,
+            'lesson_end': lesson_end,
+            'teacher': teacher,
+            'classroom': classroom,
+        })
 
+    return result
 
 
-async def get_global_shedule(session: AsyncSession):
+def get_shedule_tags(rows: List[Row]) -> Dict[str, set]:
     '''
-    get global shedule for current week
+    ids of objects the shedule was built from, used for cache invalidation
     '''
-    week_start, week_end = get_week_start_end()
-    stmt = (
-    select(Group)
-    .options(
-        joinedload(Group.teacher),
-        joinedload(Group.course).options(
-            joinedload(Course.language),
-            joinedload(Course.level)
-        ),
-        joinedload(Group.lessons).options(
-            joinedload(Lesson.teacher),
-            joinedload(Lesson.classroom)
-        ),
-    )
-    .options(
-        with_loader_criteria(
-            Lesson,
-            lambda cls:
-                (cls.day.between(week_start, week_end)),
-            include_aliases=True
-        )
-    )
-    .join(Group.lessons)
-    .where(
-        Group.is_archived.is_(False),
-        Lesson.day.between(week_start, week_end)
-        )
+    return {
+        'groups': {row.group_id for row in rows},
+        'teachers': {row.teacher_id for row in rows},
+        'classrooms': {row.classroom_id for row in rows},
+    }
+
+
+async def get_student_group_ids(student_id: int, session: AsyncSession) -> List[int]:
+    result = await session.execute(
+        select(student_group_association_table.c.group_id)
+        .where(student_group_association_table.c.user_id == student_id)
     )
-    result = await session.execute(stmt)
-    groups_lessons = result.scalars().unique().all()
+    return result.scalars().all()
+
+
+async def shedule_response(
+        key: CacheKey | None,
+        loader: Callable[[], Awaitable[Tuple[List[Row], Dict[str, set]]]]
+) -> Response:
+    '''
+    Returns serialized shedule from cache,
+    on miss loads it with loader and stores the bytes
+    '''
+    body = shedule_cache.get(key) if key is not None else None
+    if body is None:
+        generation = shedule_cache.generation
+        rows, tags = await loader()
+        body = SHEDULE_ADAPTER.dump_json(format_shedule(rows))
+        if key is not None:
+            shedule_cache.set(key, body, generation, **tags)
+    return Response(content=body, media_type='application/json')
+
 
-    return groups_lessons
+def get_shedule_period(
+    week: Optional[str] = Query(None, pattern=r'^\d{4}-W\d{2}$', description='ISO week, for example 2025-W07'),
+    date_from: Optional[datetime.date] = Query(None, alias='from'),
+    date_to: Optional[datetime.date] = Query(None, alias='to'),
+) -> Period:
+    '''
+    Shedule period from query params, current week by default.
+    A single from or to bound means one week from or up to that day
+    '''
+    if week is not None:
+        if date_from is not None or date_to is not None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='use either week or from/to'
+                )
+        try:
+            week_start, week_end = get_iso_week_start_end(week)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='invalid week'
+                )
+        return week_start, week_end
+    if date_from is None and date_to is None:
+        week_start, week_end = get_week_start_end()
+        return week_start, week_end
+    if date_from is None:
+        date_from = date_to - datetime.timedelta(days=6)
+    if date_to is None:
+        date_to = date_from + datetime.timedelta(days=6)
+    if date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must not be after 'to'"
+            )
+    if (date_to - date_from).days >= SHEDULE_MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'period must not be longer than {SHEDULE_MAX_RANGE_DAYS} days'
+            )
+    return date_from, date_to
 
 
-async def get_student_shedule(student_id, session: AsyncSession):
+def period_key(variant: str, subject_id: int | None, period: Period) -> CacheKey | None:
     '''
-    get student shedule for current week
+    Only whole ISO weeks are cached, other periods are always queried
     '''
-    week_start, week_end = get_week_start_end()
-    stmt = (
-    select(Group)
-    .options(
-        joinedload(Group.teacher),
-        joinedload(Group.course).options(
-            joinedload(Course.language),
-            joinedload(Course.level)
-        ),
-        joinedload(Group.lessons).options(
-            joinedload(Lesson.teacher),
-            joinedload(Lesson.classroom)
-        ),
-    )
-    .options(
-        with_loader_criteria(
-            Lesson,
-            lambda cls:
-                (cls.day.between(week_start, week_end)),
-            include_aliases=True
-        )
-    )
-    .join(Group.lessons)
-    .where(
-        Group.is_archived.is_(False),
-        Group.students.any(User.id == student_id),
-        Lesson.day.between(week_start, week_end)
-        )
-    )
-    result = await session.execute(stmt)
-    groups_lessons = result.scalars().unique().all()
-    return groups_lessons
-
-
-async def get_group_shedule(group_id: int,session: AsyncSession):
-    '''
-    get group shedule for current week
-    '''
-    week_start, week_end = get_week_start_end()
-    stmt = (
-    select(Group)
-    .options(
-        joinedload(Group.teacher),
-        joinedload(Group.course).options(
-            joinedload(Course.language),
-            joinedload(Course.level)
-        ),
-        joinedload(Group.lessons).options(
-            joinedload(Lesson.teacher),
-            joinedload(Lesson.classroom)
-        ),
-    )
-    .options(
-        with_loader_criteria(
-            Lesson,
-            lambda cls:
-                (cls.day.between(week_start, week_end)),
-            include_aliases=True
+    date_from, date_to = period
+    if date_from.weekday() != 0 or (date_to - date_from).days != 6:
+        return None
+    return (variant, subject_id, get_iso_week(date_from))
+
+
+async def load_shedule(shedule: Awaitable[List[Row]]):
+    rows = await shedule
+    return rows, get_shedule_tags(rows)
+
+
+async def load_student_shedule(student_id: int, session: AsyncSession, period: Period):
+    rows = await get_student_shedule(student_id, session, period)
+    tags = get_shedule_tags(rows)
+    # membership changes must reach the student entry even without lessons in week
+    tags['groups'].update(await get_student_group_ids(student_id, session))
+    return rows, tags
+
+
+def get_shedule_statement(period: Period):
+    '''
+    flat shedule rows of not archived groups for period
+    '''
+    date_from, date_to = period
+    return (
+        select(*SHEDULE_COLUMNS)
+        .select_from(Lesson)
+        .join(Lesson.group)
+        .join(Lesson.teacher)
+        .join(Lesson.classroom)
+        .where(
+            Group.is_archived.is_(False),
+            Lesson.day.between(date_from, date_to)
         )
+        .order_by(Lesson.day, Lesson.lesson_start, Lesson.id)
     )
-    .join(Group.lessons)
-    .where(
-        Group.is_archived.is_(False),
-        Group.id == group_id,
-        Lesson.day.between(week_start, week_end)
+
+
+async def get_global_shedule(session: AsyncSession, period: Period) -> List[Row]:
+    '''
+    get global shedule for period
+    '''
+    result = await session.execute(get_shedule_statement(period))
+    return result.all()
+
+
+def get_subject_condition(variant: IcsVariant, subject_id: int):
+    '''
+    lessons of student groups, of teacher or of group
+    '''
+    if variant == 'student':
+        return Lesson.group_id.in_(
+            select(student_group_association_table.c.group_id)
+            .where(student_group_association_table.c.user_id == subject_id)
         )
+    if variant == 'teacher':
+        return Lesson.teacher_id == subject_id
+    return Lesson.group_id == subject_id
+
+
+async def get_student_shedule(student_id, session: AsyncSession, period: Period) -> List[Row]:
+    '''
+    get student shedule for period
+    '''
+    result = await session.execute(
+        get_shedule_statement(period).where(get_subject_condition('student', student_id))
     )
-    result = await session.execute(stmt)
-    groups_lessons = result.scalars().unique().all()
-    return groups_lessons
-
-
-async def get_teacher_shedule(teacher_id: int, session: AsyncSession):
-    '''
-    get teacher shedule for current week
-    '''
-    week_start, week_end = get_week_start_end()
-    stmt = (
-    select(Group)
-    .options(
-        joinedload(Group.teacher),
-        joinedload(Group.course).options(
-            joinedload(Course.language),
-            joinedload(Course.level)
-        ),
-        joinedload(Group.lessons).options(
-            joinedload(Lesson.teacher),
-            joinedload(Lesson.classroom)
-        ),
-    )
-    .options(
-        with_loader_criteria(
-            Lesson,
-            lambda cls: (cls.teacher_id == teacher_id) &
-                        (cls.day.between(week_start, week_end)),
-            include_aliases=True
-        )
+    return result.all()
+
+
+async def get_group_shedule(group_id: int,session: AsyncSession, period: Period) -> List[Row]:
+    '''
+    get group shedule for period
+    '''
+    result = await session.execute(
+        get_shedule_statement(period).where(get_subject_condition('group', group_id))
     )
-    .join(Group.lessons)
-    .where(
-        Group.is_archived.is_(False),
-        Lesson.teacher_id == teacher_id,
-        Lesson.day.between(week_start, week_end)
-        )
+    return result.all()
+
+
+async def get_teacher_shedule(teacher_id: int, session: AsyncSession, period: Period) -> List[Row]:
+    '''
+    get teacher shedule for period
+    '''
+    result = await session.execute(
+        get_shedule_statement(period).where(get_subject_condition('teacher', teacher_id))
     )
-    result = await session.execute(stmt)
-    groups_lessons = result.unique().scalars().all()
-    return groups_lessons
+    return result.all()
 
 @shedule_router.get(
     '/',
@@ -222,16 +301,18 @@ async def get_teacher_shedule(teacher_id: int, session: AsyncSession):
     status_code=status.HTTP_200_OK
 )
 async def get_shedule_global(
+    period: Period = Depends(get_shedule_period),
     session: AsyncSession = Depends(get_async_session),
     user: User|None = Depends(optional_current_user)
 ):
     '''
-    Returns global shedule of all groups for current_week\n
+    Returns global shedule of all groups for requested period\n
     ROLES -> non-register and all
     '''
-    result = await get_global_shedule(session=session)
-    shedule = format_shedule(result)
-    return shedule
+    return await shedule_response(
+        period_key('global', None, period),
+        lambda: load_shedule(get_global_shedule(session=session, period=period))
+    )
 
 
 @shedule_router.get(
@@ -240,26 +321,26 @@ async def get_shedule_global(
     status_code=status.HTTP_200_OK
 )
 async def get_current_user_shedule(
+    period: Period = Depends(get_shedule_period),
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(current_student_user)
 ):
     '''
-    Returns current user shedule for current week\n
+    Returns current user shedule for requested period\n
     for student return student shedule\n
     for teacher return teacher shedule\n
     ROLES -> student, teacher, admin
     '''
-    result=None
-    
     if user.role == Role.STUDENT:
-        result = await get_student_shedule(user.id, session)
-    elif user.role == Role.TEACHER:
-        result = await get_teacher_shedule(user.id, session)
-    elif user.role == Role.ADMIN:
-        #Временно
-        result = await get_teacher_shedule(user.id, session)
-    shedule = format_shedule(result)
-    return shedule
+        return await shedule_response(
+            period_key('student', user.id, period),
+            lambda: load_student_shedule(user.id, session, period)
+        )
+    #Временно для админа
+    return await shedule_response(
+        period_key('teacher', user.id, period),
+        lambda: load_shedule(get_teacher_shedule(user.id, session, period))
+    )
 
 
 @shedule_router.get(
@@ -269,11 +350,12 @@ async def get_current_user_shedule(
         )
 async def get_shedule_by_student(
     user_id: int,
+    period: Period = Depends(get_shedule_period),
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(current_teacher_user),
 ):
     '''
-    Returns student shedule by user id for current week\n
+    Returns student shedule by user id for requested period\n
     ROLES -> teacher, admin
     '''
     request_user = await session.get(User, user_id)
@@ -282,9 +364,10 @@ async def get_shedule_by_student(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='user not found'
             )
-    result = await get_student_shedule(user_id, session)
-    shedule = format_shedule(result)
-    return shedule
+    return await shedule_response(
+        period_key('student', user_id, period),
+        lambda: load_student_shedule(user_id, session, period)
+    )
 
 @shedule_router.get(
         '/teacher/{user_id}',
@@ -293,11 +376,12 @@ async def get_shedule_by_student(
         )
 async def get_shedule_by_teacher(
     user_id: int,
+    period: Period = Depends(get_shedule_period),
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(current_admin_user),
 ):
     '''
-    Returns teacher shedule by user id for current week\n
+    Returns teacher shedule by user id for requested period\n
     ROLES -> admin
     '''
     request_user = await session.get(User, user_id)
@@ -306,9 +390,10 @@ async def get_shedule_by_teacher(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='user not found'
             )
-    result = await get_teacher_shedule(user_id, session)
-    shedule = format_shedule(result)
-    return shedule
+    return await shedule_response(
+        period_key('teacher', user_id, period),
+        lambda: load_shedule(get_teacher_shedule(user_id, session, period))
+    )
 
 @shedule_router.get(
     '/group/{group_id}',
@@ -317,11 +402,12 @@ async def get_shedule_by_teacher(
     )
 async def get_shedule_by_group(
     group_id: int,
+    period: Period = Depends(get_shedule_period),
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(current_teacher_user)
     ):
     '''
-    get group shedule by group id for current week\n
+    get group shedule by group id for requested period\n
     ROLES -> teacher, admin
     '''
     group = await session.get(Group, group_id)
@@ -330,6 +416,172 @@ async def get_shedule_by_group(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='group not found'
             )
-    result = await get_group_shedule(group_id, session)
-    shedule = format_shedule(result)
-    return shedule
+    return await shedule_response(
+        period_key('group', group_id, period),
+        lambda: load_shedule(get_group_shedule(group_id, session, period))
+    )
+
+
+def get_ics_token(variant: IcsVariant, subject_id: int) -> str:
+    return hmac.new(
+        ICS_SECRET.encode(), f"shedule-ics:{variant}:{subject_id}".encode(), hashlib.sha256
+    ).hexdigest()
+
+
+def get_ics_url(request: Request, variant: IcsVariant, subject_id: int) -> Dict[str, str]:
+    url = request.url_for('get_shedule_ics', variant=variant, subject_id=subject_id)
+    return {'url': str(url.include_query_params(token=get_ics_token(variant, subject_id)))}
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime.datetime | None) -> bool:
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return etag in tags or '*' in tags
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        return last_modified.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+@shedule_router.get('/ics-url/my', status_code=status.HTTP_200_OK)
+async def get_my_shedule_ics_url(
+    request: Request,
+    user: User = Depends(current_student_user)
+):
+    '''
+    Returns subscription url of current user calendar feed\n
+    ROLES -> student, teacher, admin
+    '''
+    variant = 'student' if user.role == Role.STUDENT else 'teacher'
+    return get_ics_url(request, variant, user.id)
+
+
+@shedule_router.get('/ics-url/group/{group_id}', status_code=status.HTTP_200_OK)
+async def get_group_shedule_ics_url(
+    group_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_teacher_user)
+):
+    '''
+    Returns subscription url of group calendar feed\n
+    ROLES -> teacher, admin
+    '''
+    if await session.get(Group, group_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='group not found'
+            )
+    return get_ics_url(request, 'group', group_id)
+
+
+@shedule_router.get('/ics-url/teacher/{user_id}', status_code=status.HTTP_200_OK)
+async def get_teacher_shedule_ics_url(
+    user_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_admin_user)
+):
+    '''
+    Returns subscription url of teacher calendar feed\n
+    ROLES -> admin
+    '''
+    if await session.get(User, user_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='user not found'
+            )
+    return get_ics_url(request, 'teacher', user_id)
+
+
+@shedule_router.get(
+    '/ics/{variant}/{subject_id}.ics',
+    response_class=Response,
+    responses={200: {'content': {'text/calendar': {}}}, 304: {'description': 'Not modified'}}
+)
+async def get_shedule_ics(
+    variant: IcsVariant,
+    subject_id: int,
+    request: Request,
+    token: str = Query(...),
+    session: AsyncSession = Depends(get_async_session),
+):
+    '''
+    iCalendar feed for calendar apps, lessons from 30 days ago to 180 days ahead.
+    ETag is derived from the latest lesson change, unchanged feeds return 304\n
+    ROLES -> anyone with the feed url
+    '''
+    if not hmac.compare_digest(token, get_ics_token(variant, subject_id)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='feed not found'
+            )
+    today = get_current_time().date()
+    date_from = today - datetime.timedelta(days=ICS_PAST_DAYS)
+    date_to = today + datetime.timedelta(days=ICS_FUTURE_DAYS)
+    conditions = (
+        Group.is_archived.is_(False),
+        Lesson.day.between(date_from, date_to),
+        get_subject_condition(variant, subject_id),
+    )
+
+    # count and id sum catch deleted lessons, max(updated_at) catches the rest
+    state = await session.execute(
+        select(func.max(Lesson.updated_at), func.count(Lesson.id), func.coalesce(func.sum(Lesson.id), 0))
+        .select_from(Lesson)
+        .join(Lesson.group)
+        .where(*conditions)
+    )
+    last_modified, count, id_sum = state.one()
+    etag = '"' + hashlib.sha256(
+        f"{variant}:{subject_id}:{date_from}:{last_modified}:{count}:{id_sum}".encode()
+    ).hexdigest()[:32] + '"'
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if last_modified is not None:
+        headers['Last-Modified'] = format_datetime(last_modified.astimezone(datetime.timezone.utc), usegmt=True)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    result = await session.execute(
+        select(
+            Lesson.id,
+            Lesson.name,
+            Lesson.description,
+            type_coerce(Lesson.link, String),
+            Lesson.day,
+            Lesson.lesson_start,
+            Lesson.lesson_end,
+            Lesson.updated_at,
+            Group.name,
+            Classroom.name,
+        )
+        .select_from(Lesson)
+        .join(Lesson.group)
+        .join(Lesson.classroom)
+        .where(*conditions)
+        .order_by(Lesson.day, Lesson.lesson_start, Lesson.id)
+    )
+    events: List[IcsEvent] = [
+        {
+            'uid': f'lesson-{lesson_id}@eureka',
+            'day': day,
+            'start': lesson_start,
+            'end': lesson_end,
+            'summary': f'{name} ({group_name})',
+            'description': '\n'.join(filter(None, (description, link))),
+            'location': classroom_name,
+            'url': link,
+            'updated_at': updated_at,
+        }
+        for (lesson_id, name, description, link, day, lesson_start, lesson_end,
+             updated_at, group_name, classroom_name) in result.all()
+    ]
+    return Response(
+        content=build_calendar('Eureka shedule', events),
+        media_type='text/calendar; charset=utf-8',
+        headers=headers
+    )
@@ -1,14 +1,77 @@
-from typing import Dict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Iterable, List, Type, Union
 from fastapi import HTTPException, status
+from sqlalchemy import BigInteger, bindparam, exists, func, literal, select, union_all
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.dbbase import Base
 
-async def validate_related_fields(models_ids: Dict[Base, int], session: AsyncSession):
-    for model, m_id in models_ids.items():
-        if not await session.get(model, m_id):
+async def find_missing_related(models_ids: Dict[Type[Base], Union[int, Iterable[int]]],
+                               session: AsyncSession) -> Dict[Type[Base], List[int]]:
+    '''
+    Checks every referenced id in one UNION ALL query,
+    each model contributes unnest(ids) anti-joined with its table\n
+    Returns ids that don't exist grouped by model
+    '''
+    models = {}
+    queries = []
+    for model, ids in models_ids.items():
+        if ids is None:
+            continue
+        ids = [ids] if isinstance(ids, int) else list(dict.fromkeys(ids))
+        if not ids:
+            continue
+        name = model.__tablename__
+        models[name] = model
+        refs = func.unnest(bindparam(f'{name}_ids', ids, type_=ARRAY(BigInteger))).table_valued(
+            'id'
+        ).render_derived(name=f'{name}_refs')
+        queries.append(
+            select(literal(name).label('model'), refs.c.id)
+            .where(~exists().where(model.id == refs.c.id))
+        )
+    if not queries:
+        return {}
+    result = await session.execute(union_all(*queries) if len(queries) > 1 else queries[0])
+    missing = {}
+    for name, m_id in result.all():
+        missing.setdefault(models[name], []).append(m_id)
+    return missing
+
+
+async def validate_related_fields(models_ids: Dict[Type[Base], Union[int, Iterable[int]]], session: AsyncSession):
+    '''
+    Raises 404 listing every missing reference,
+    ids are shown only for models validated with a list of ids
+    '''
+    missing = await find_missing_related(models_ids, session)
+    if missing:
+        errors = []
+        for model, ids in missing.items():
+            error = f'{model.__name__} not found'
+            if not isinstance(models_ids[model], int):
+                error += f" (ids: {', '.join(map(str, sorted(ids)))})"
+            errors.append(error)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='; '.join(errors)
+            )
+
+
+@asynccontextmanager
+async def not_found_first(model: Type[Base], obj_id: int, session: AsyncSession, detail: Any):
+    '''
+    Wraps the checks that run before update_returning, which doubles as the 404 check.
+    When one of them fails, the updated row is looked up once and
+    a missing row is reported as 404 with detail instead of the check's error
+    '''
+    try:
+        yield
+    except HTTPException:
+        if await session.scalar(select(model.id).where(model.id == obj_id)) is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail= f'{model.__name__} not found'
+                detail=detail
                 )
-    return
\ No newline at end of file
+        raise
@@ -0,0 +1,126 @@
+'''
+CPU cost of building the shedule response, old ORM path against the column projection.
+
+    python -m benchmarks.shedule_format [groups] [lessons_per_group]
+
+Old path: ORM objects (as hydrated by joinedload) -> model_validate per lesson/group ->
+SheduleResponse validation -> json, which is what FastAPI did with response_model.
+New path: selected rows -> api.shedule.format_shedule -> SHEDULE_ADAPTER.dump_json.
+Database time is not included, only the python side of one request.
+'''
+import calendar
+import datetime
+import json
+import sys
+import timeit
+from collections import defaultdict
+
+from api.shedule import format_shedule
+from db.types import Role
+from models.group import Group
+from models.lesson import Classroom, Lesson
+from models.user import User
+from schemas.shedule import SHEDULE_ADAPTER, SheduleGroup, SheduleLesson, SheduleResponse
+
+
+def legacy_format_shedule(groups_lessons):
+    buff_dict = defaultdict(list)
+    result_dict = defaultdict(list)
+    for group_lessons in groups_lessons:
+        for lesson in group_lessons.lessons:
+            week_day = calendar.day_abbr[lesson.day.weekday()].upper()
+            buff_dict[week_day].append(SheduleLesson.model_validate(lesson))
+        for week_day, lessons in buff_dict.items():
+            result_dict[week_day].append({
+                'group': SheduleGroup.model_validate(group_lessons),
+                'lessons': lessons
+            })
+        buff_dict.clear()
+    return result_dict
+
+
+def make_rows(groups: int, lessons_per_group: int):
+    week_start = datetime.date(2025, 3, 3)
+    rows = []
+    for group_id in range(1, groups + 1):
+        for n in range(lessons_per_group):
+            teacher_id = group_id % 7 + 1
+            classroom_id = group_id % 5 + 1
+            rows.append((
+                group_id, f'group {group_id}',
+                group_id * 1000 + n, f'lesson {n}', 'How to use verb to be',
+                f'https://example.com/lesson/{n}',
+                week_start + datetime.timedelta(days=n % 7),
+                datetime.time(9 + n % 8), datetime.time(10 + n % 8),
+                teacher_id, 'big', 'chungus', f'teacher{teacher_id}@example.com', None,
+                Role.TEACHER, None,
+                classroom_id, f'room {classroom_id}',
+            ))
+    rows.sort(key=lambda row: (row[6], row[7], row[2]))
+    return rows
+
+
+def hydrate(rows):
+    '''
+    ORM graph equivalent to the old joinedload query result
+    '''
+    groups, teachers, classrooms = {}, {}, {}
+    for (group_id, group_name, lesson_id, name, description, link, day, lesson_start, lesson_end,
+         teacher_id, first_name, last_name, email, phone_number, role, teacher_description,
+         classroom_id, classroom_name) in rows:
+        group = groups.get(group_id)
+        if group is None:
+            group = groups[group_id] = Group(id=group_id, name=group_name)
+        teacher = teachers.get(teacher_id)
+        if teacher is None:
+            teacher = teachers[teacher_id] = User(
+                id=teacher_id, first_name=first_name, last_name=last_name, email=email,
+                phone_number=phone_number, role=role, description=teacher_description
+            )
+        classroom = classrooms.get(classroom_id)
+        if classroom is None:
+            classroom = classrooms[classroom_id] = Classroom(id=classroom_id, name=classroom_name)
+        group.lessons.append(Lesson(
+            id=lesson_id, name=name, description=description, link=link, day=day,
+            lesson_start=lesson_start, lesson_end=lesson_end, teacher=teacher, classroom=classroom
+        ))
+    return list(groups.values())
+
+
+def old_path(rows):
+    shedule = legacy_format_shedule(hydrate(rows))
+    return json.dumps(SheduleResponse.model_validate(shedule).model_dump(mode='json')).encode()
+
+
+def new_path(rows):
+    return SHEDULE_ADAPTER.dump_json(format_shedule(rows))
+
+
+def normalize(body: bytes):
+    data = json.loads(body)
+    return {
+        day: sorted(
+            ((item['group'], sorted(item['lessons'], key=lambda lesson: lesson['id'])) for item in items),
+            key=lambda item: item[0]['id']
+        ) if items else None
+        for day, items in data.items()
+    }
+
+
+def main():
+    groups = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    lessons_per_group = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    rows = make_rows(groups, lessons_per_group)
+    assert normalize(old_path(rows)) == normalize(new_path(rows)), 'responses differ'
+
+    number = 20
+    old = min(timeit.repeat(lambda: old_path(rows), number=number, repeat=5)) / number
+    new = min(timeit.repeat(lambda: new_path(rows), number=number, repeat=5)) / number
+    print(f'{groups} groups, {len(rows)} lessons')
+    print(f'old ORM path:      {old * 1000:8.2f} ms')
+    print(f'column projection: {new * 1000:8.2f} ms')
+    print(f'speedup:           {old / new:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
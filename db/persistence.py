@@ -0,0 +1,61 @@
+from typing import Any, Dict, Optional, Sequence, Type, TypeVar
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.interfaces import ORMOption
+
+from db.dbbase import Base
+
+
+ModelType = TypeVar('ModelType', bound=Base)
+
+
+async def fetch_by_id(session: AsyncSession, model: Type[ModelType], obj_id: int,
+                      options: Sequence[ORMOption] = ()) -> Optional[ModelType]:
+    '''
+    Loads one row with its relations in a single select,
+    the copy already held by the session is overwritten
+    '''
+    stmt = (
+        select(model)
+        .where(model.id == obj_id)
+        .options(*options)
+        .execution_options(populate_existing=True)
+    )
+    return (await session.execute(stmt)).unique().scalar_one_or_none()
+
+
+async def insert_returning(session: AsyncSession, model: Type[ModelType], values: Dict[str, Any],
+                           options: Sequence[ORMOption] = ()) -> ModelType:
+    '''
+    INSERT ... RETURNING instead of add/commit/refresh\n
+    Without options the returned row is the result, otherwise it is
+    fetched once with the loader options (use joinedload for many-to-one)
+    '''
+    stmt = insert(model).values(**values)
+    if not options:
+        return await session.scalar(stmt.returning(model))
+    obj_id = await session.scalar(stmt.returning(model.id))
+    return await fetch_by_id(session, model, obj_id, options)
+
+
+async def update_returning(session: AsyncSession, model: Type[ModelType], obj_id: int, values: Dict[str, Any],
+                           options: Sequence[ORMOption] = ()) -> Optional[ModelType]:
+    '''
+    UPDATE ... WHERE id = obj_id RETURNING, None when there is no such row\n
+    Doubles as the existence check, so callers don't need to select the row first
+    '''
+    if not values:
+        return await fetch_by_id(session, model, obj_id, options)
+    stmt = (
+        update(model)
+        .where(model.id == obj_id)
+        .values(**values)
+        .execution_options(synchronize_session='fetch', populate_existing=True)
+    )
+    if not options:
+        return await session.scalar(stmt.returning(model))
+    updated_id = await session.scalar(stmt.returning(model.id))
+    if updated_id is None:
+        return None
+    return await fetch_by_id(session, model, updated_id, options)
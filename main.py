@@ -1,10 +1,11 @@
+import asyncio
 import uvicorn
 import logging
 from fastapi import FastAPI, Depends
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from sqladmin import Admin
 from contextlib import asynccontextmanager
 
@@ -25,10 +26,15 @@ from api.payment import payment_router, subscription_router, payment_details, up
 
 from api.shedule import shedule_router
 from api.lesson_attendance import attendance_router
+from api.homework_reminders import send_homework_reminders, HOMEWORK_REMINDER_INTERVAL_MINUTES
+from api.lesson_completion import complete_past_lessons, LESSON_COMPLETION_INTERVAL_MINUTES
 from admin.auth import admin_authentication_backend
 from api.finance import finance_router
 from api.export import export_router
-from utils.smtp_client import init_smtp, send_email
+from api.health import health_router
+from utils.storage import storage, MEDIA_ROOT
+from utils.media_files import MediaStaticFiles
+from utils.smtp_client import smtp_client
 
 scheduler = AsyncIOScheduler()
 logging.basicConfig(level=logging.INFO)
@@ -43,23 +49,25 @@ logging.info(f"STRIPE_SECRET_KEY: {config('STRIPE_SECRET_KEY', default='Not foun
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logging.info("Lifespan started")
+    # external services are not awaited here, storage is prepared in background
+    storage_bootstrap = asyncio.create_task(storage.bootstrap())
     try:
         trigger = CronTrigger(hour=0, minute=0)
         scheduler.add_job(update_and_check_payments, trigger)
+        scheduler.add_job(send_homework_reminders, IntervalTrigger(minutes=HOMEWORK_REMINDER_INTERVAL_MINUTES),
+                          max_instances=1, coalesce=True)
+        scheduler.add_job(complete_past_lessons, IntervalTrigger(minutes=LESSON_COMPLETION_INTERVAL_MINUTES),
+                          max_instances=1, coalesce=True)
         scheduler.start()
         logging.info("Scheduler started")
-        # app.state.smtp_client = await init_smtp()
-        # logging.info("SMTP started")
         yield
     finally:
-        scheduler.shutdown()
+        storage_bootstrap.cancel()
+        if scheduler.running:
+            scheduler.shutdown()
         logging.info("Scheduler stopped")
-        # if getattr(app.state, "smtp_client", None) is not None:
-        #     try:
-        #         await app.state.smtp_client.quit()
-        #         logging.info("SMTP stopped")
-        #     except Exception as e:
-        #         logging.warning(f"Error closing SMTP client: {e}")
+        await smtp_client.close()
+        logging.info("SMTP stopped")
 
 app = FastAPI(lifespan=lifespan)
 
@@ -84,9 +92,10 @@ app.add_middleware(
 )
 
 
-app.mount("/media", StaticFiles(directory="media"), name="media")
+app.mount("/media", MediaStaticFiles(directory=MEDIA_ROOT, check_dir=False), name="media")
 
 
+app.include_router(health_router, prefix='/health', tags=['Health'])
 app.include_router(shedule_router, prefix='/shedule', tags=['Schedule'])
 app.include_router(authRouter, prefix="/auth", tags=["Auth"])
 app.include_router(attendance_router, prefix="/attendance", tags=["Attendance"])
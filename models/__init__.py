@@ -1,11 +1,11 @@
 from .user import User
 from .group import Group
 from .course import Course, Level, Language
-from .lesson import Lesson, Homework, Classroom, Attendance
+from .lesson import Lesson, Homework, HomeworkReminder, Classroom, Attendance, AttendanceStats
 # from .enrollment import Enrollment
 from .payment import PaymentDetail, Payment
 
 
 __all__ = ["User", "Group", "Course", "Level", "Language", "Lesson", "Homework", "Classroom", "Enrollment", "Payment",
-           "Attendance", "PaymentDetail"]
+           "Attendance", "AttendanceStats", "HomeworkReminder", "PaymentDetail"]
 
@@ -4,7 +4,7 @@ from typing import List, TYPE_CHECKING, Optional
 from pydantic import HttpUrl
 from db.dbbase import Base
 from db.types import AttendanceStatus, HttpUrlType
-from sqlalchemy import Enum, String, DateTime, ForeignKey, Text, Date, Time, Boolean
+from sqlalchemy import Enum, Index, Integer, String, UniqueConstraint, DateTime, ForeignKey, Text, Date, Time, Boolean, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from models.user import User
@@ -40,6 +40,8 @@ class Lesson(Base):
     link: Mapped[HttpUrl] = mapped_column(HttpUrlType, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=get_current_time)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=get_current_time,
+                                                 onupdate=get_current_time)
 
     day: Mapped[date] = mapped_column(Date, nullable=False)
 
@@ -66,6 +68,15 @@ class Lesson(Base):
         cascade="all, delete-orphan"
         )
 
+    __table_args__ = (
+        Index("ix_lessons_day", "day"),
+        Index("ix_lessons_group_id_day_start_id", "group_id", "day", "lesson_start", "id"),
+        Index("ix_lessons_teacher_id_day", "teacher_id", "day"),
+        Index("ix_lessons_classroom_id_day", "classroom_id", "day"),
+        # only lessons the completion job still has to look at
+        Index("ix_lessons_not_passed_day_end", "day", "lesson_end", postgresql_where=text("passed IS NOT true")),
+    )
+
     @property
     def group_name(self) -> str | None:
         return self.group.name if self.group else None
@@ -93,9 +104,19 @@ class Homework(Base):
     lesson_id: Mapped[int] = mapped_column(ForeignKey('lessons.id', ondelete='CASCADE'))
     lesson: Mapped["Lesson"] = relationship(back_populates='homework')
 
+    # loaded only when requested with selectinload, counters below are enough for listings
     submissions: Mapped[List["HomeworkSubmission"]] = relationship('HomeworkSubmission', back_populates='homework',
-                                                                   lazy="selectin",
-                                                                   cascade='all, delete-orphan')
+                                                                   lazy="raise",
+                                                                   cascade='all, delete-orphan',
+                                                                   passive_deletes=True)
+    # maintained by submission and review endpoints
+    submission_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    reviewed_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        Index("ix_homeworks_lesson_id", "lesson_id"),
+        Index("ix_homeworks_deadline", "deadline"),
+    )
 
     def __str__(self):
         return f"({self.id}) {self.__name__}"
@@ -115,6 +136,11 @@ class HomeworkSubmission(Base):
     review: Mapped['HomeworkReview'] = relationship('HomeworkReview', back_populates='submission',
                                                     cascade='all, delete-orphan')
     student = relationship('User')
+
+    __table_args__ = (
+        UniqueConstraint("homework_id", "student_id", name="uq_homework_submissions_homework_id_student_id"),
+        Index("ix_homework_submissions_homework_id_submitted_at", "homework_id", "submitted_at"),
+    )
     
     def __str__(self):
         return f"({self.id}) {self.code}"
@@ -132,6 +158,10 @@ class HomeworkReview(Base):
     submission = relationship('HomeworkSubmission', back_populates='review', passive_deletes=True)
     teacher = relationship('User')
 
+    __table_args__ = (
+        UniqueConstraint("submission_id", name="uq_homework_reviews_submission_id"),
+    )
+
     def __str__(self):
         return f"({self.id}) {self.__name__}"
 
@@ -157,6 +187,42 @@ class Attendance(Base):
         "Lesson", 
         back_populates="attendance"
         )
+
+    __table_args__ = (
+        UniqueConstraint("student_id", "lesson_id", name="uq_attendances_student_id_lesson_id"),
+    )
     
     def __str__(self):
-        return f"({self.id}) {self.__name__} {self.status}"
\ No newline at end of file
+        return f"({self.id}) {self.__name__} {self.status}"
+
+
+class AttendanceStats(Base):
+    '''
+    Attendance rollup of a student in a group over passed lessons,
+    kept up to date by api.attendance_stats on every attendance write
+    '''
+    __tablename__ = 'attendance_stats'
+
+    student_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete='CASCADE'), primary_key=True)
+    group_id: Mapped[int] = mapped_column(ForeignKey("groups.id", ondelete='CASCADE'), primary_key=True)
+    attended: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_lesson_day: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=get_current_time,
+                                                 onupdate=get_current_time)
+
+    @property
+    def attendance_percent(self) -> float:
+        return round(self.attended / self.total * 100, 2) if self.total else 0.0
+
+
+class HomeworkReminder(Base):
+    '''
+    Deadline reminders already sent, one per homework and student,
+    the reminder job claims rows here before sending so a reminder goes out once
+    '''
+    __tablename__ = 'homework_reminders'
+
+    homework_id: Mapped[int] = mapped_column(ForeignKey("homeworks.id", ondelete='CASCADE'), primary_key=True)
+    student_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete='CASCADE'), primary_key=True)
+    sent_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=get_current_time)
@@ -103,6 +103,8 @@ class StudentWithGroupAndPagination(BaseModel):
 
 class StudentDetailResponse(UserFullnameResponse):
     payment_status: PaymentDetailStatus
+    # percent of attended passed lessons in the group
+    attendance_percent: float = 0.0
 
     model_config = ConfigDict(from_attributes=True)
 
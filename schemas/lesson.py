@@ -1,11 +1,11 @@
 from datetime import datetime, time, date
-from typing import Optional, List
-from pydantic import BaseModel, model_validator, ConfigDict, HttpUrl
+from typing import Dict, Literal, Optional, List
+from pydantic import BaseModel, Field, model_validator, ConfigDict, HttpUrl
 from fastapi import UploadFile, File
 
 from db.types import AttendanceStatus
 from schemas.group import GroupBase
-from schemas.pagination import Pagination
+from schemas.pagination import CursorPagination
 from schemas.user import UserBase
 
 
@@ -50,6 +50,27 @@ class LessonRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class LessonListItem(BaseModel):
+    id: int
+    name: str
+    link: Optional[HttpUrl] = None
+    day: date
+    lesson_start: time
+    lesson_end: time
+    passed: bool
+    teacher_id: int
+    classroom_id: int
+    classroom_name: str
+    homework_id: Optional[int] = None
+    homework_deadline: Optional[datetime] = None
+
+
+class LessonListResponse(BaseModel):
+    items: List[LessonListItem]
+    # pass as cursor to get the next page, None on the last page
+    next_cursor: Optional[str] = None
+
+
 class LessonShort(BaseModel):
     name: str
     day: date
@@ -112,6 +133,53 @@ class LessonUpdate(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class LessonRecurrenceCreate(BaseModel):
+    name: str
+    description: str
+    link: Optional[HttpUrl] = None
+    # 0 - monday ... 6 - sunday
+    weekdays: List[int] = Field(..., min_length=1, max_length=7)
+    # defaults to group's approximate_lesson_start
+    lesson_start: Optional[time] = None
+    duration: int = Field(..., gt=0, description="Lesson duration in minutes")
+    # defaults to group's teacher
+    teacher_id: Optional[int] = None
+    classroom_id: int
+    # default to group's start_date and end_date
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+    @model_validator(mode='after')
+    def validate_recurrence(self) -> 'LessonRecurrenceCreate':
+        if any(weekday < 0 or weekday > 6 for weekday in self.weekdays):
+            raise ValueError('weekdays must be between 0 (monday) and 6 (sunday)')
+        if self.start_date and self.end_date and self.start_date > self.end_date:
+            raise ValueError('start_date must be before end_date')
+        return self
+
+
+class LessonConflictCheck(BaseModel):
+    lesson_id: Optional[int] = None
+    day: date
+    lesson_start: time
+    lesson_end: time
+    teacher_id: int
+    classroom_id: int
+
+    @model_validator(mode='after')
+    def validate_time(self) -> 'LessonConflictCheck':
+        if self.lesson_start >= self.lesson_end:
+            raise ValueError('lesson_start must be before lesson_end')
+        return self
+
+
+class LessonConflict(BaseModel):
+    index: int
+    reason: Literal['teacher', 'classroom']
+    lesson_id: Optional[int] = None
+    other_index: Optional[int] = None
+
+
 class HomeworkRead(BaseModel):
     id: int
     created_at: datetime
@@ -119,6 +187,8 @@ class HomeworkRead(BaseModel):
     file_path: Optional[str] = None
     description: Optional[str] = None
     lesson_id: int
+    submission_count: int = 0
+    reviewed_count: int = 0
 
     submissions: List["HomeworkSubmissionShort"] = []
 
@@ -144,10 +214,30 @@ class HomeworkBase(BaseModel):
     file_path: Optional[str] = None
     description: Optional[str] = None
     lesson_id: int
+    submission_count: int = 0
+    reviewed_count: int = 0
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class StudentHomeworkItem(BaseModel):
+    id: int
+    deadline: datetime
+    file_path: Optional[str] = None
+    description: Optional[str] = None
+    lesson_id: int
+    lesson_name: str
+    lesson_day: date
+    group_id: int
+    submitted: bool
+    reviewed: bool
+
+
+class StudentHomeworkResponse(BaseModel):
+    items: List[StudentHomeworkItem]
+    pagination: CursorPagination
+
+
 class HomeworkCreate(BaseModel):
     deadline: datetime
     description: Optional[str] = None
@@ -190,6 +280,27 @@ class HomeworkReviewRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ReviewQueueItem(BaseModel):
+    id: int
+    homework_id: int
+    student_id: int
+    student_full_name: str
+    file_path: Optional[str] = None
+    content: Optional[str] = None
+    submitted_at: datetime
+    deadline: datetime
+    lesson_id: int
+    lesson_name: str
+    group_id: int
+    group_name: str
+
+
+class ReviewQueueResponse(BaseModel):
+    items: List[ReviewQueueItem]
+    # pass as cursor to get the next page, None on the last page
+    next_cursor: Optional[str] = None
+
+
 class HomeworkReviewBase(BaseModel):
     comment: str
 
@@ -242,10 +353,12 @@ class AttendanceItem(BaseModel):
 class AttendanceWithGroup(BaseModel):
     group: AttendanceGroup
     attendance: list[AttendanceItem]
+    # percent of attended passed lessons in the group
+    attendance_percent: float = 0.0
 
 class UserAttendanceResponse(BaseModel):
     attendance_groups: list[AttendanceWithGroup]
-    pagination: Pagination
+    pagination: CursorPagination
 
 class AttendanceCreate(BaseModel):
     status: AttendanceStatus = AttendanceStatus.ABSENT
@@ -255,6 +368,10 @@ class AttendanceCreate(BaseModel):
 class AttendanceUpdate(AttendanceCreate):
     pass
 
+class AttendanceBulkMark(BaseModel):
+    # student_id -> status
+    attendance: Dict[int, AttendanceStatus] = Field(..., min_length=1)
+
 class AttendancePartialUpdate(BaseModel):
     status: Optional[AttendanceStatus] = None
     student_id: Optional[int] = None
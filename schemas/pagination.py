@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Generic, TypeVar
+from typing import List, Generic, Optional, TypeVar
 
 
 T = TypeVar("T")
@@ -14,3 +14,11 @@ class Pagination(BaseModel):
 class PaginatedResponse(BaseModel, Generic[T]):
     items: List[T]
     pagination: Pagination
+
+
+class CursorPagination(BaseModel):
+    current_page_size: int
+    total_items: int
+    total_pages: int
+    # pass as cursor to get the next page, None on the last page
+    next_cursor: Optional[str] = None
@@ -1,6 +1,7 @@
 from datetime import date, time
-from typing import Optional
-from pydantic import BaseModel, ConfigDict, HttpUrl
+from typing import Dict, List, Optional, TypedDict
+from pydantic import BaseModel, ConfigDict, HttpUrl, TypeAdapter
+from db.types import Role
 from schemas.lesson import ClassroomBase, LessonBase
 from schemas.user import UserBase
 
@@ -41,3 +42,46 @@ class SheduleResponse(BaseModel):
     FRI: Optional[list[SheduleItem]] = None
     SAT: Optional[list[SheduleItem]] = None
     SUN: Optional[list[SheduleItem]] = None
+
+
+# Plain dict shapes of the models above, the read path builds them
+# straight from selected columns and serializes with SHEDULE_ADAPTER
+
+class SheduleTeacherDict(TypedDict):
+    id: int
+    first_name: str
+    last_name: str
+    email: str
+    phone_number: Optional[str]
+    role: Role
+    description: Optional[str]
+
+
+class SheduleClassroomDict(TypedDict):
+    id: int
+    name: str
+
+
+class SheduleLessonDict(TypedDict):
+    id: int
+    name: str
+    description: str
+    link: Optional[str]
+    day: date
+    lesson_start: time
+    lesson_end: time
+    teacher: SheduleTeacherDict
+    classroom: SheduleClassroomDict
+
+
+class SheduleGroupDict(TypedDict):
+    id: int
+    name: str
+
+
+class SheduleItemDict(TypedDict):
+    group: SheduleGroupDict
+    lessons: List[SheduleLessonDict]
+
+
+SHEDULE_ADAPTER = TypeAdapter(Dict[str, Optional[List[SheduleItemDict]]])
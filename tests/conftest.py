@@ -5,8 +5,11 @@ import os
 from typing import AsyncGenerator
 from httpx import AsyncClient, ASGITransport
 
+# tests keep uploaded files on disk instead of minio
+os.environ.setdefault("STORAGE_BACKEND", "local")
+
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy import select
+from sqlalchemy import event, select
 from db.database import get_async_session
 from main import app
 from db.dbbase import Base
@@ -17,6 +20,9 @@ from decouple import config
 
 from api.auth import current_super_user
 from api.lesson import MEDIA_FOLDER, HOMEWORK_FOLDER
+from utils.storage import LocalStorage, storage
+from utils.shedule_cache import shedule_cache
+from utils.access_cache import group_access_cache
 
 DATABASE_URL = config('TEST_DB_URL')
 
@@ -160,6 +166,30 @@ async def auto_override_user(request, users):
     app.dependency_overrides.pop(current_super_user, None)
 
 
+@pytest.fixture
+def query_counter():
+    '''
+    Collects statements sent to the test database,
+    clear() it right before the request that is measured
+    '''
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", on_execute)
+    yield statements
+    event.remove(test_engine.sync_engine, "before_cursor_execute", on_execute)
+
+
+@pytest.fixture(autouse=True)
+def clear_shedule_cache():
+    # fixtures write to db directly, bypassing cache invalidation
+    shedule_cache.clear()
+    group_access_cache.clear()
+    yield
+
+
 @pytest.fixture(autouse=True)
 def patch_media_folders(monkeypatch, tmp_path):
     test_media_submissions = tmp_path / "homework_submissions"
@@ -170,5 +200,8 @@ def patch_media_folders(monkeypatch, tmp_path):
 
     monkeypatch.setattr('api.lesson.MEDIA_FOLDER', str(test_media_submissions))
     monkeypatch.setattr('api.lesson.HOMEWORK_FOLDER', str(test_media_homeworks))
+    if isinstance(storage, LocalStorage):
+        monkeypatch.setattr(storage, 'root', str(tmp_path))
+        monkeypatch.setattr(storage, 'private_root', str(tmp_path / "private"))
 
     yield
@@ -1,5 +1,5 @@
 from datetime import date, time, timedelta, datetime
-from factory import Factory, Faker, lazy_attribute
+from factory import Factory, Faker, Sequence
 from factory.fuzzy import FuzzyDate, FuzzyDateTime
 
 from utils.date_time_utils import get_current_time, get_week_start_end
@@ -12,19 +12,11 @@ class LessonCreateDataFactory(Factory):
     description = Faker("paragraph", nb_sentences=2)
     link = Faker("uri")
 
-    @lazy_attribute
-    def day(self) -> str:
-        return get_current_time().date().isoformat()
-
-    @lazy_attribute
-    def lesson_start(self) -> str:
-        return get_current_time().time().isoformat()
-
-    @lazy_attribute
-    def lesson_end(self) -> str:
-        dt_start = get_current_time()
-        dt_end = dt_start + timedelta(minutes=30)
-        return dt_end.time().isoformat()
+    # every built lesson gets its own day, so lessons of the same teacher
+    # or classroom never overlap and fail the double-booking check
+    day = Sequence(lambda n: (get_current_time().date() + timedelta(days=n)).isoformat())
+    lesson_start = time(10, 0).isoformat()
+    lesson_end = time(10, 30).isoformat()
 
     teacher_id = None
     classroom_id = None
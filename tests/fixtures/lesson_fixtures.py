@@ -6,7 +6,7 @@ from models.lesson import Classroom, Lesson
 from schemas.lesson import AttendanceResponse, ClassroomRead, LessonRead
 from schemas.shedule import SheduleLesson
 
-from tests.fixtures.factories.models.lesson_factory import ClassroomFactory, LessonFactory
+from tests.fixtures.factories.models.lesson_factory import ClassroomFactory, HomeworkFactory, HomeworkSubmissionFactory, LessonFactory
 
 from db.database import get_async_session_context
 from tests.fixtures.utils import modern_factory_of_factories
@@ -38,4 +38,12 @@ async def modern_lesson_factory(session: AsyncSession) -> Callable[[Dict[str, ty
 
 @pytest.fixture
 async def modern_classroom_factory(session: AsyncSession) -> Callable[[Dict[str, type]], Awaitable[int]]:
-    return modern_factory_of_factories(ClassroomFactory, session)
\ No newline at end of file
+    return modern_factory_of_factories(ClassroomFactory, session)
+
+@pytest.fixture
+async def modern_homework_submission_factory(session: AsyncSession) -> Callable[[Dict[str, type]], Awaitable[int]]:
+    return modern_factory_of_factories(HomeworkSubmissionFactory, session)
+
+@pytest.fixture
+async def modern_homework_factory(session: AsyncSession) -> Callable[[Dict[str, type]], Awaitable[int]]:
+    return modern_factory_of_factories(HomeworkFactory, session)
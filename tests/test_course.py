@@ -254,3 +254,56 @@ async def test_destroy_course_by_non_admin_user(client):
     response = await client.delete('/courses/2')
     assert response.status_code == 403
     assert response.json()["detail"] == "You don't have enough permissions"
+
+
+@pytest.mark.anyio
+async def test_update_missing_language_with_taken_name(client):
+    await client.post("/languages/", json={"name": "Swedish"})
+    response = await client.patch("/languages/999999", json={"name": "Swedish"})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Language not found"
+
+
+@pytest.mark.anyio
+async def test_update_missing_course_with_missing_language(client):
+    response = await client.patch("/courses/999999", json={"language_id": 999999})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Course not found"
+
+
+@pytest.mark.anyio
+async def test_language_write_query_count(client, query_counter):
+    query_counter.clear()
+    response = await client.post("/languages/", json={"name": "Dutch"})
+    assert response.status_code == 201
+    # name check + INSERT ... RETURNING
+    assert len(query_counter) == 2
+
+    query_counter.clear()
+    response = await client.patch(f"/languages/{response.json()['id']}", json={"name": "Flemish"})
+    assert response.status_code == 200
+    assert response.json()["name"] == "Flemish"
+    # name check + UPDATE ... RETURNING
+    assert len(query_counter) == 2
+
+
+@pytest.mark.anyio
+async def test_course_write_query_count(client, query_counter):
+    await client.post('/languages/', json={'name': "Turkish"})
+    await client.post('/levels/', json={"code": "A2", "description": "Elementary"})
+    course_data = {"name": "Turkish A2", "price": 4000, "description": "Turkish for beginners",
+                   "language_name": "Turkish", "level_code": "A2"}
+
+    query_counter.clear()
+    response = await client.post('/courses/', json=course_data)
+    assert response.status_code == 201
+    # language + level lookups, INSERT ... RETURNING id, one joined fetch
+    assert len(query_counter) == 4
+
+    query_counter.clear()
+    response = await client.patch(f"/courses/{response.json()['id']}", json={"price": 4500})
+    assert response.status_code == 200
+    assert response.json()["price"] == 4500
+    assert response.json()["language_name"] == "Turkish"
+    # UPDATE ... RETURNING id, one joined fetch
+    assert len(query_counter) == 2
@@ -278,4 +278,24 @@ async def test_group_profile(client):
     response = await client.get(group_url+'my')
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
-    assert bool(data['pagination'])
\ No newline at end of file
+    assert bool(data['pagination'])
+
+@pytest.mark.anyio
+async def test_group_update_missing_group_with_missing_teacher(client):
+    response = await client.patch(group_url+'999999', json={'teacher_id': 999999})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json()['detail'] == {'detail': "group doesn't exist"}
+
+@pytest.mark.anyio
+async def test_group_write_query_count(client, query_counter):
+    group_resp = await create_group(client)
+    group_id = group_resp.json()['id']
+
+    query_counter.clear()
+    response = await client.patch(
+        group_url+str(group_id),
+        json=GROUP_PARTIAL_UPDATE
+        )
+    assert response.status_code == status.HTTP_200_OK
+    # UPDATE ... RETURNING id, one fetch joined with the teacher
+    assert len(query_counter) == 2
@@ -0,0 +1,16 @@
+import pytest
+
+
+@pytest.mark.anyio
+async def test_liveness(client):
+    response = await client.get('/health/live')
+    assert response.status_code == 200
+    assert response.json()["status"] == "ok"
+
+
+@pytest.mark.anyio
+async def test_readiness(client):
+    response = await client.get('/health/ready')
+    data = response.json()
+    assert data["database"] == "ok"
+    assert response.status_code == (200 if data["storage"] == "ok" else 503)
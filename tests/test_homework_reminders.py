@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+
+import aiosmtplib
+import pytest
+
+from api.homework_reminders import claim_homework_reminders
+from db.types import Role
+from utils.smtp_client import SmtpClient
+
+
+@pytest.mark.anyio
+async def test_claim_homework_reminders(session, modern_user_factory, modern_group_factory, modern_lesson_factory,
+                                        modern_homework_factory, modern_homework_submission_factory):
+    # far ahead, so homeworks made by other tests stay out of the window
+    now = datetime(2099, 6, 1, tzinfo=timezone.utc)
+    student = await modern_user_factory(validate_with_schema=False, role=Role.STUDENT)
+    group = await modern_group_factory(validate_with_schema=False, is_active=True, students=[student])
+
+    async def homework(deadline: datetime):
+        lesson = await modern_lesson_factory(validate_with_schema=False, group=group)
+        return await modern_homework_factory(validate_with_schema=False, lesson=lesson, deadline=deadline)
+
+    due = await homework(now + timedelta(hours=2))
+    submitted = await homework(now + timedelta(hours=3))
+    await homework(now + timedelta(days=3))
+    await homework(now - timedelta(hours=1))
+    await modern_homework_submission_factory(validate_with_schema=False, homework=submitted, student=student)
+
+    rows = await claim_homework_reminders(session, now, timedelta(hours=24))
+    await session.commit()
+    assert [(row.student_id, row.homework_id) for row in rows] == [(student.id, due.id)]
+    assert rows[0].email == student.email
+
+    rows = await claim_homework_reminders(session, now, timedelta(hours=24))
+    await session.commit()
+    assert rows == []
+
+
+@pytest.mark.anyio
+async def test_send_messages_returns_failed(monkeypatch):
+    client = SmtpClient()
+    sent = []
+
+    async def send(message: EmailMessage):
+        if message['To'] == 'rejected@example.com':
+            raise aiosmtplib.errors.SMTPRecipientRefused(550, 'mailbox unavailable', message['To'])
+        sent.append(message)
+
+    monkeypatch.setattr(client, '_send', send)
+    messages = []
+    for email in ('first@example.com', 'rejected@example.com', 'second@example.com'):
+        message = EmailMessage()
+        message['To'] = email
+        messages.append(message)
+
+    failed = await client.send_messages(messages, rate_limit=0)
+    assert failed == [messages[1]]
+    assert sent == [messages[0], messages[2]]
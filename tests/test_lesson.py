@@ -1,9 +1,17 @@
 import py_compile
+import zipfile
 
 import pytest
 from io import BytesIO
+from fastapi import UploadFile
 from api.auth import current_user
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, time, timezone, timedelta
+
+from api.lesson_completion import complete_lessons_batch
+from models.lesson import HomeworkReview
+from models.user import User
+from tests.fixtures.factories.schemas.lesson_schema_data_factory import LessonCreateDataFactory
+from utils.storage import LocalStorage
 
 
 @pytest.mark.anyio
@@ -149,7 +157,7 @@ async def test_create_lesson(client):
 @pytest.mark.role('teacher')
 async def test_create_lesson_by_teacher(client):
     lesson_data = {"name": "To be", "description": "How to use verb to be",
-                   "link": "https://example.com/", "day": "2025-07-06",
+                   "link": "https://example.com/", "day": "2025-07-08",
                    "lesson_start": "09:00", "lesson_end": "11:15", "teacher_id": 1, "group_id": 1,
                    "classroom_id": 4}
 
@@ -158,6 +166,49 @@ async def test_create_lesson_by_teacher(client):
     assert response.json()['teacher_id'] == lesson_data['teacher_id']
 
 
+@pytest.mark.anyio
+@pytest.mark.role('teacher')
+async def test_create_lesson_conflict(client):
+    lesson_data = {"name": "To be", "description": "How to use verb to be", "day": "2031-03-04",
+                   "lesson_start": "09:00", "lesson_end": "10:30", "teacher_id": 1, "classroom_id": 4}
+
+    response = await client.post("/lessons/group/1", json=lesson_data)
+    assert response.status_code == 201
+    lesson_id = response.json()['id']
+
+    overlapping = {**lesson_data, "lesson_start": "10:00", "lesson_end": "11:00"}
+    response = await client.post("/lessons/group/1", json=overlapping)
+    assert response.status_code == 409
+
+    response = await client.post("/lessons/check-conflicts", json=[
+        overlapping,
+        {**overlapping, "lesson_start": "10:15", "lesson_end": "12:00", "teacher_id": 2},
+        {**lesson_data, "lesson_id": lesson_id},
+    ])
+    assert response.status_code == 200
+    conflicts = response.json()
+    assert {"index": 0, "reason": "classroom", "lesson_id": lesson_id, "other_index": None} in conflicts
+    assert {"index": 1, "reason": "classroom", "lesson_id": None, "other_index": 0} in conflicts
+    assert all(conflict["index"] != 2 or conflict["other_index"] is not None for conflict in conflicts)
+
+
+@pytest.mark.anyio
+@pytest.mark.role('teacher')
+async def test_create_recurring_lessons(client):
+    recurrence = {"name": "Grammar", "description": "Weekly grammar", "weekdays": [0, 2],
+                  "lesson_start": "18:00", "duration": 90, "teacher_id": 1, "classroom_id": 4,
+                  "start_date": "2032-03-01", "end_date": "2032-03-14"}
+
+    response = await client.post("/lessons/group/1/recurrence", json=recurrence)
+    assert response.status_code == 201
+    lessons = response.json()
+    assert [lesson["day"] for lesson in lessons] == ["2032-03-01", "2032-03-03", "2032-03-08", "2032-03-10"]
+    assert all(lesson["lesson_end"] == "19:30:00" for lesson in lessons)
+
+    response = await client.post("/lessons/group/1/recurrence", json={**recurrence, "weekdays": [2]})
+    assert response.status_code == 409
+
+
 @pytest.mark.anyio
 @pytest.mark.role('student')
 async def test_create_lesson_by_student(client):
@@ -214,11 +265,34 @@ async def test_update_lesson(client):
     assert response.json()["detail"] == "You don't have enough permissions"
 
 
+@pytest.mark.anyio
+async def test_update_lesson_time_with_offset(client, modern_lesson_factory):
+    lesson = await modern_lesson_factory(validate_with_schema=False, day=date(2101, 1, 3),
+                                         lesson_start=time(9, 0), lesson_end=time(12, 0))
+
+    # only one bound is sent, the other one is the stored naive time
+    response = await client.patch(f"/lessons/{lesson.id}", json={"lesson_start": "10:00:00+06:00"})
+    assert response.status_code == 200
+
+    response = await client.patch(f"/lessons/{lesson.id}", json={"lesson_start": "13:00:00+06:00"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "lesson_start must be before lesson_end"
+
+
 @pytest.mark.anyio
 async def test_get_lessons(client):
     response = await client.get(f"/lessons/group/1/lessons")
     assert response.status_code == 200
 
+    response = await client.get(f"/lessons/group/1/lessons", params={"limit": 1, "direction": "upcoming"})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["items"]) <= 1
+    if data["next_cursor"]:
+        next_page = await client.get(f"/lessons/group/1/lessons",
+                                     params={"limit": 1, "direction": "upcoming", "cursor": data["next_cursor"]})
+        assert next_page.json()["items"][0]["id"] != data["items"][0]["id"]
+
 
 @pytest.mark.anyio
 @pytest.mark.role('student')
@@ -234,6 +308,34 @@ async def test_get_lesson(client):
     assert response.status_code == 200
 
 
+@pytest.mark.anyio
+async def test_download_homework_submissions_not_found(client):
+    response = await client.get('/submissions/homework/999999/download')
+    assert response.status_code == 404
+    assert response.json()['detail'] == "Homework not found"
+
+
+@pytest.mark.anyio
+async def test_download_homework_submissions(client, tmp_path, monkeypatch, modern_homework_submission_factory):
+    local_storage = LocalStorage(root=str(tmp_path / "media"), private_root=str(tmp_path / "private"))
+    monkeypatch.setattr('utils.zip_stream.storage', local_storage)
+    first_file = await local_storage.upload_file(UploadFile(BytesIO(b"first answer"), filename="first.txt"))
+    second_file = await local_storage.upload_file(UploadFile(BytesIO(b"second answer"), filename="second.txt"))
+
+    first = await modern_homework_submission_factory(validate_with_schema=False, file_path=first_file)
+    second = await modern_homework_submission_factory(validate_with_schema=False, file_path=second_file,
+                                                      homework=first.homework)
+
+    response = await client.get(f'/submissions/homework/{first.homework_id}/download')
+    assert response.status_code == 200
+    assert response.headers['content-type'] == "application/zip"
+    with zipfile.ZipFile(BytesIO(response.content)) as archive:
+        contents = {archive.read(name) for name in archive.namelist()}
+        assert len(archive.namelist()) == 2
+        assert f"{first.student.last_name}_{first.student.first_name}_{first.id}.txt" in archive.namelist()
+    assert contents == {b"first answer", b"second answer"}
+
+
 # @pytest.mark.anyio
 # async def test_create_homework_with_file_and_description(client):
 #     deadline = (datetime.now(timezone.utc) + timedelta(days=3)).isoformat()
@@ -443,3 +545,131 @@ async def test_get_lesson(client):
 #     response = await client.delete('/lessons/1')
 #     assert response.status_code == 200
 
+
+
+@pytest.mark.anyio
+@pytest.mark.role('student')
+async def test_my_homeworks(client, session, users, modern_group_factory, modern_lesson_factory,
+                            modern_homework_factory, modern_homework_submission_factory):
+    student = await session.get(User, users['student'].id)
+    group = await modern_group_factory(validate_with_schema=False, is_active=True, students=[student])
+    # deadlines far ahead keep homeworks made by other tests out of the window
+    base = datetime(2100, 1, 1, tzinfo=timezone.utc)
+    homeworks = []
+    for days in (1, 2, 3):
+        lesson = await modern_lesson_factory(validate_with_schema=False, group=group)
+        homeworks.append(await modern_homework_factory(validate_with_schema=False, lesson=lesson,
+                                                       deadline=base + timedelta(days=days)))
+    submitted, reviewed, pending = homeworks
+    await modern_homework_submission_factory(validate_with_schema=False, homework=submitted, student=student)
+    review_submission = await modern_homework_submission_factory(validate_with_schema=False,
+                                                                 homework=reviewed, student=student)
+    session.add(HomeworkReview(submission_id=review_submission.id, teacher_id=users['teacher'].id, comment="Good"))
+    await session.commit()
+
+    window = {"deadline_from": base.isoformat(), "deadline_to": (base + timedelta(days=10)).isoformat()}
+    response = await client.get("/homeworks/my-homeworks", params={**window, "size": 2})
+    assert response.status_code == 200
+    data = response.json()
+    assert [(item["id"], item["submitted"], item["reviewed"]) for item in data["items"]] == [
+        (submitted.id, True, False), (reviewed.id, True, True)
+    ]
+    assert data["pagination"]["total_items"] == 3
+    assert data["pagination"]["current_page_size"] == 2
+
+    response = await client.get("/homeworks/my-homeworks",
+                                params={**window, "size": 2, "cursor": data["pagination"]["next_cursor"]})
+    data = response.json()
+    assert [(item["id"], item["submitted"], item["reviewed"]) for item in data["items"]] == [(pending.id, False, False)]
+    assert data["pagination"]["total_items"] == 3
+    assert data["pagination"]["current_page_size"] == 1
+    assert data["pagination"]["next_cursor"] is None
+
+    response = await client.get("/homeworks/my-homeworks", params={**window, "submitted": False})
+    assert [item["id"] for item in response.json()["items"]] == [pending.id]
+
+    response = await client.get("/homeworks/my-homeworks", params={**window, "reviewed": True})
+    assert [item["id"] for item in response.json()["items"]] == [reviewed.id]
+
+    response = await client.get("/homeworks/my-homeworks", params={
+        "deadline_from": (base + timedelta(days=2)).isoformat(),
+        "deadline_to": (base + timedelta(days=2)).isoformat(),
+    })
+    assert [item["id"] for item in response.json()["items"]] == [reviewed.id]
+
+    response = await client.get("/homeworks/my-homeworks", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+@pytest.mark.anyio
+@pytest.mark.role('teacher')
+async def test_review_queue(client):
+    response = await client.get("/homework_review/queue", params={"size": 5})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["items"]) <= 5
+    submitted = [item["submitted_at"] for item in data["items"]]
+    assert submitted == sorted(submitted)
+
+
+@pytest.mark.anyio
+async def test_create_homework_review_once(client, modern_homework_submission_factory):
+    submission = await modern_homework_submission_factory(validate_with_schema=False)
+    data = {"comment": "Good job"}
+    response = await client.post(f"/homework_review/submission/{submission.id}", json=data)
+    assert response.status_code == 201
+    assert response.json()["submission_id"] == submission.id
+
+    response = await client.post(f"/homework_review/submission/{submission.id}", json=data)
+    assert response.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_classroom_write_query_count(client, query_counter):
+    query_counter.clear()
+    response = await client.post('/classrooms/', json={"name": "Vienna"})
+    assert response.status_code == 201
+    assert len(query_counter) == 2
+
+    query_counter.clear()
+    response = await client.patch(f"/classrooms/{response.json()['id']}", json={"name": "Prague"})
+    assert response.status_code == 200
+    assert response.json()["name"] == "Prague"
+    assert len(query_counter) == 1
+
+
+@pytest.mark.anyio
+async def test_complete_lessons_batch(session, modern_lesson_factory):
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    finished = await modern_lesson_factory(validate_with_schema=False, day=now.date() - timedelta(days=1), passed=False)
+    upcoming = await modern_lesson_factory(validate_with_schema=False, day=now.date() + timedelta(days=1), passed=False)
+
+    rows = await complete_lessons_batch(session, now, 1000)
+    await session.commit()
+    completed = {row.id for row in rows}
+    assert finished.id in completed
+    assert upcoming.id not in completed
+
+
+@pytest.mark.anyio
+async def test_lesson_write_query_count(client, session, users, query_counter,
+                                        modern_group_factory, modern_classroom_factory):
+    group = await modern_group_factory(validate_with_schema=False)
+    classroom = await modern_classroom_factory(validate_with_schema=False)
+    lesson_data = LessonCreateDataFactory.build(teacher_id=users['teacher'].id, classroom_id=classroom.id)
+    # the request starts with an empty identity map, as it does outside tests
+    session.expunge_all()
+
+    query_counter.clear()
+    response = await client.post(f"/lessons/group/{group.id}", json=lesson_data)
+    assert response.status_code == 201
+    # group, relation check, slot locks, conflict check, INSERT ... RETURNING, attendance INSERT ... SELECT
+    assert len(query_counter) == 6
+
+    session.expunge_all()
+    query_counter.clear()
+    response = await client.patch(f"/lessons/{response.json()['id']}", json={"day": "2101-02-10"})
+    assert response.status_code == 200
+    assert response.json()["day"] == "2101-02-10"
+    # lesson, slot locks, conflict check, UPDATE ... RETURNING
+    assert len(query_counter) == 4
@@ -0,0 +1,34 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from utils.media_files import MediaStaticFiles
+
+
+@pytest.fixture
+async def media_client(tmp_path):
+    (tmp_path / "notes.txt").write_text("homework notes " * 200)
+    app = Starlette(routes=[Mount("/media", MediaStaticFiles(directory=tmp_path))])
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.mark.anyio
+async def test_media_immutable_and_precompressed(media_client, tmp_path):
+    response = await media_client.get("/media/notes.txt", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert not response.headers["etag"].startswith("W/")
+    assert (tmp_path / "notes.txt.gz").exists()
+
+    response = await media_client.get("/media/notes.txt", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == "homework notes " * 200
+
+    response = await media_client.get("/media/notes.txt", headers={
+        "Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]
+    })
+    assert response.status_code == 304
+    assert "immutable" in response.headers["cache-control"]
@@ -79,4 +79,39 @@ async def test_delete_payment_detail(client):
     response_check = await client.get(
         f"/payment_details/?payment_id=3",
     )
-    assert response_check.status_code == 404
+    assert response_check.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_create_payment_missing_owner(client):
+    response = await client.post(
+        "/payment/",
+        json={"amount": 100.0, "owner_id": 999999, "group_id": 1},
+    )
+    assert response.status_code == 404
+    # payment routes keep their nested 404 detail
+    assert response.json()["detail"] == {"detail": "User not found"}
+
+
+@pytest.mark.anyio
+async def test_payment_write_query_count(client, session, users, query_counter, modern_group_factory):
+    group = await modern_group_factory(validate_with_schema=False)
+    # the request starts with an empty identity map, as it does outside tests
+    session.expunge_all()
+
+    query_counter.clear()
+    response = await client.post(
+        "/payment/",
+        json={"amount": 100.0, "owner_id": users['student'].id, "group_id": group.id},
+    )
+    assert response.status_code == 200
+    # owner check, INSERT ... RETURNING id, one fetch joined with owner and group
+    assert len(query_counter) == 3
+
+    session.expunge_all()
+    query_counter.clear()
+    response = await client.patch(f"/payment/{response.json()['id']}", json={"payment_status": "paid"})
+    assert response.status_code == 200
+    assert response.json()["payment_status"] == "paid"
+    # UPDATE ... RETURNING id, one joined fetch
+    assert len(query_counter) == 2
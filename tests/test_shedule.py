@@ -174,3 +174,61 @@ async def test_shedule_by_group(client):
 async def test_shedule_user(client):
     response = await client.get('/shedule/my')
     assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.anyio
+async def test_shedule_cache_invalidated_on_lesson_create(client):
+    response = await client.get('/shedule/')
+    assert response.status_code == status.HTTP_200_OK
+
+    lesson_data = {
+        **LESSON_DATA,
+        'day': current_date.isoformat(),
+        'lesson_start': '18:00',
+        'lesson_end': '19:00',
+    }
+    lesson_data.pop('group_id')
+    response = await client.post(f"/lessons/group/{LESSON_DATA['group_id']}", json=lesson_data)
+    assert response.status_code == status.HTTP_201_CREATED
+    lesson_id = response.json()['id']
+
+    response = await client.get('/shedule/')
+    lesson_ids = [
+        lesson['id']
+        for items in response.json().values() if items
+        for item in items
+        for lesson in item['lessons']
+    ]
+    assert lesson_id in lesson_ids
+
+
+@pytest.mark.anyio
+async def test_shedule_by_week(client):
+    year, week, _ = current_date.isocalendar()
+    response = await client.get('/shedule/', params={'week': f'{year}-W{week:02d}'})
+    assert response.status_code == status.HTTP_200_OK
+    compare_shedule_with_result(response)
+
+
+@pytest.mark.anyio
+async def test_shedule_invalid_period(client):
+    response = await client.get('/shedule/', params={'from': '2025-03-10', 'to': '2025-03-01'})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.anyio
+async def test_shedule_ics_feed(client):
+    response = await client.get(f"/shedule/ics-url/group/{LESSON_DATA['group_id']}")
+    assert response.status_code == status.HTTP_200_OK
+    url = response.json()['url']
+
+    response = await client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['content-type'].startswith('text/calendar')
+    assert 'BEGIN:VEVENT' in response.text
+
+    response = await client.get(url, headers={'If-None-Match': response.headers['etag']})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    response = await client.get(url.split('?')[0], params={'token': 'wrong'})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
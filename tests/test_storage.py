@@ -0,0 +1,37 @@
+import pytest
+from io import BytesIO
+from fastapi import UploadFile
+
+from utils.storage import LocalStorage
+
+
+@pytest.mark.anyio
+async def test_local_storage_roundtrip(tmp_path):
+    storage = LocalStorage(root=str(tmp_path / "media"), private_root=str(tmp_path / "private"))
+    await storage.bootstrap()
+    assert await storage.is_ready()
+
+    name = await storage.upload_file(UploadFile(BytesIO(b"homework" * 100), filename="hw.pdf"))
+    assert name.endswith(".pdf")
+    # private uploads never land in the tree served by the /media mount
+    assert (tmp_path / "private" / "uploads" / name).exists()
+    assert not (tmp_path / "media" / "uploads" / name).exists()
+
+    data = b"".join([chunk async for chunk in storage.iter_file(name, 64)])
+    assert data == b"homework" * 100
+
+    await storage.remove_file(name)
+    assert not (tmp_path / "private" / "uploads" / name).exists()
+
+
+@pytest.mark.anyio
+async def test_local_storage_public_upload(tmp_path):
+    storage = LocalStorage(root=str(tmp_path / "media"), private_root=str(tmp_path / "private"))
+    await storage.bootstrap()
+
+    name = await storage.upload_file(UploadFile(BytesIO(b"qr"), filename="qr.png"), public=True)
+    assert (tmp_path / "media" / "uploads" / name).exists()
+    assert storage.get_file_url(name) == f"/media/uploads/{name}"
+
+    await storage.remove_file(name)
+    assert not (tmp_path / "media" / "uploads" / name).exists()
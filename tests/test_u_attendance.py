@@ -56,3 +56,188 @@ async def test_attendance_create(
     assert len(attendance_list) == students_count
 
 
+@pytest.mark.anyio
+@pytest.mark.role("teacher")
+async def test_lesson_attendance_mark(
+    client,
+    session,
+    modern_classroom_factory,
+    modern_group_factory,
+    modern_user_factory,
+    users,
+    ):
+    classroom = await modern_classroom_factory(
+        name='405'
+    )
+    students_validated = await modern_user_factory(
+        3, 
+        role=Role.STUDENT
+        )
+    students = await get_objects_by_ids(
+        session, 
+        User, 
+        [student.id for student in students_validated]
+        )
+    group = await modern_group_factory(
+        is_active=True,
+        is_archived=False,
+        students=students
+        )
+    lesson_create_data = LessonCreateDataFactory.build(
+        teacher_id = users['teacher'].id,
+        classroom_id = classroom.id
+    )
+    response_lesson_create = await client.post(
+        f"lessons/group/{group.id}",
+        json = lesson_create_data
+        )
+    assert response_lesson_create.status_code == status.HTTP_201_CREATED
+    lesson_id = response_lesson_create.json()['id']
+
+    marks = {
+        str(students[0].id): 'attended',
+        str(students[1].id): 'attended',
+        str(students[2].id): 'absent',
+    }
+    response = await client.put(
+        f"{base_url}lesson/{lesson_id}",
+        json={'attendance': marks}
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert {
+        str(item['student']['id']): item['status'] for item in response.json()
+        } == marks
+
+    response = await client.get(f"{base_url}lesson/{lesson_id}")
+    assert len(response.json()) == 3
+
+    response = await client.get(f"lessons/{lesson_id}")
+    assert response.json()['passed'] is True
+
+    response = await client.get(f"group-students/detail/{group.id}")
+    assert response.status_code == status.HTTP_200_OK
+    assert {
+        str(item['id']): item['attendance_percent'] for item in response.json()
+        } == {student_id: 100.0 if mark == 'attended' else 0.0 for student_id, mark in marks.items()}
+
+    response = await client.get(
+        f"{base_url}student/{students[0].id}",
+        params={'size': 1}
+        )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data['pagination']['total_items'] == 1
+    assert data['pagination']['current_page_size'] == 1
+    assert data['pagination']['next_cursor'] is None
+    assert data['attendance_groups'][0]['attendance_percent'] == 100.0
+
+    response = await client.put(
+        f"{base_url}lesson/{lesson_id}",
+        json={'attendance': {str(users['teacher'].id): 'attended'}}
+        )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.anyio
+@pytest.mark.role("teacher")
+async def test_lesson_attendance_mark_recounts_unmarked_students(
+    client,
+    session,
+    modern_classroom_factory,
+    modern_group_factory,
+    modern_user_factory,
+    users,
+    ):
+    classroom = await modern_classroom_factory(
+        name='406'
+    )
+    students_validated = await modern_user_factory(
+        2,
+        role=Role.STUDENT
+        )
+    students = await get_objects_by_ids(
+        session,
+        User,
+        [student.id for student in students_validated]
+        )
+    group = await modern_group_factory(
+        is_active=True,
+        is_archived=False,
+        students=students
+        )
+    marked, unmarked = students
+
+    lesson_ids = []
+    for _ in range(2):
+        response = await client.post(
+            f"lessons/group/{group.id}",
+            json=LessonCreateDataFactory.build(
+                teacher_id=users['teacher'].id,
+                classroom_id=classroom.id
+            )
+            )
+        assert response.status_code == status.HTTP_201_CREATED
+        lesson_ids.append(response.json()['id'])
+
+    response = await client.put(
+        f"{base_url}lesson/{lesson_ids[0]}",
+        json={'attendance': {str(marked.id): 'attended', str(unmarked.id): 'attended'}}
+        )
+    assert response.status_code == status.HTTP_200_OK
+
+    # the second lesson is marked for one student only,
+    # the other one keeps the absent row made with the lesson
+    response = await client.put(
+        f"{base_url}lesson/{lesson_ids[1]}",
+        json={'attendance': {str(marked.id): 'attended'}}
+        )
+    assert response.status_code == status.HTTP_200_OK
+
+    response = await client.get(f"group-students/detail/{group.id}")
+    assert response.status_code == status.HTTP_200_OK
+    assert {
+        item['id']: item['attendance_percent'] for item in response.json()
+        } == {marked.id: 100.0, unmarked.id: 50.0}
+
+@pytest.mark.anyio
+async def test_attendance_create_missing_relates(client):
+    response = await client.post(
+        '/attendance/',
+        json={'student_id': 999999, 'lesson_id': 999999}
+        )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json()['detail'] == 'User not found; Lesson not found'
+
+
+@pytest.mark.anyio
+async def test_attendance_write_query_count(
+    client,
+    session,
+    query_counter,
+    modern_lesson_factory,
+    modern_user_factory,
+    ):
+    student = await modern_user_factory(validate_with_schema=False, role=Role.STUDENT)
+    lesson = await modern_lesson_factory(validate_with_schema=False)
+    # the request starts with an empty identity map, as it does outside tests
+    session.expunge_all()
+
+    query_counter.clear()
+    response = await client.post(
+        base_url,
+        json={'student_id': student.id, 'lesson_id': lesson.id}
+        )
+    assert response.status_code == status.HTTP_201_CREATED
+    # relation check, duplicate check, INSERT ... RETURNING id, joined fetch,
+    # lesson of the stats key, stats upsert
+    assert len(query_counter) == 6
+
+    session.expunge_all()
+    query_counter.clear()
+    response = await client.patch(
+        f"{base_url}{response.json()['id']}",
+        json={'status': 'attended'}
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['status'] == 'attended'
+    # attendance, its lesson, UPDATE ... RETURNING id, joined fetch, stats upsert
+    assert len(query_counter) == 5
@@ -0,0 +1,55 @@
+import asyncio
+import zipfile
+from io import BytesIO
+
+import pytest
+from fastapi import UploadFile
+
+import utils.zip_stream
+from utils.storage import LocalStorage
+from utils.zip_stream import stream_zip
+
+
+@pytest.fixture
+async def zip_storage(tmp_path, monkeypatch):
+    storage = LocalStorage(root=str(tmp_path / "media"), private_root=str(tmp_path / "private"))
+    await storage.bootstrap()
+    monkeypatch.setattr(utils.zip_stream, 'storage', storage)
+    return storage
+
+
+def download_tasks():
+    return [
+        task for task in asyncio.all_tasks()
+        if task.get_coro().__name__ == '_download_object' and not task.done()
+    ]
+
+
+@pytest.mark.anyio
+async def test_stream_zip_contents(zip_storage):
+    first = await zip_storage.upload_file(UploadFile(BytesIO(b"first" * 1000), filename="a.txt"))
+    second = await zip_storage.upload_file(UploadFile(BytesIO(b"second"), filename="b.txt"))
+
+    data = b"".join([
+        chunk async for chunk in
+        stream_zip([("a.txt", first), ("missing.txt", "missing.txt"), ("b.txt", second)])
+    ])
+    with zipfile.ZipFile(BytesIO(data)) as archive:
+        assert archive.namelist() == ["a.txt", "b.txt"]
+        assert archive.read("a.txt") == b"first" * 1000
+        assert archive.read("b.txt") == b"second"
+
+
+@pytest.mark.anyio
+async def test_stream_zip_disconnect_cancels_downloads(zip_storage, monkeypatch):
+    # small chunks fill the prefetch queue, so the download of the current entry blocks
+    monkeypatch.setattr(utils.zip_stream, 'ZIP_CHUNK_SIZE', 16)
+    name = await zip_storage.upload_file(UploadFile(BytesIO(b"x" * 4096), filename="big.txt"))
+
+    stream = stream_zip([("big.txt", name), ("other.txt", name)])
+    await stream.__anext__()
+    tasks = download_tasks()
+    assert tasks
+    await stream.aclose()
+    await asyncio.wait(tasks, timeout=1)
+    assert all(task.cancelled() for task in tasks)
@@ -0,0 +1,69 @@
+import time
+from typing import Iterable, Optional, Tuple
+
+from decouple import config
+
+
+GROUP_ACCESS_CACHE_TTL = config("GROUP_ACCESS_CACHE_TTL", cast=int, default=30)
+GROUP_ACCESS_CACHE_MAX_ENTRIES = config("GROUP_ACCESS_CACHE_MAX_ENTRIES", cast=int, default=10000)
+
+# (user id, group id)
+AccessKey = Tuple[int, int]
+
+
+class GroupAccessCache:
+    '''
+    Short-lived in-process cache of "user is a student or the teacher of the group" answers.\n
+    Membership and group teacher changes drop the affected entries,
+    TTL covers writes made outside of the api (admin panel, other workers)
+    '''
+
+    def __init__(self, ttl: int = GROUP_ACCESS_CACHE_TTL, max_entries: int = GROUP_ACCESS_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.generation = 0
+        self._entries: dict[AccessKey, Tuple[bool, float]] = {}
+
+    def get(self, key: AccessKey) -> Optional[bool]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        allowed, expires_at = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return allowed
+
+    def set(self, key: AccessKey, allowed: bool, generation: int):
+        '''
+        generation must be read before the membership was queried,
+        so an answer computed concurrently with a change is never stored
+        '''
+        if self.ttl <= 0 or generation != self.generation:
+            return
+        if len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (allowed, time.monotonic() + self.ttl)
+
+    def _drop(self, predicate):
+        self.generation += 1
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+
+    def invalidate_groups(self, group_ids: Iterable[int]):
+        '''
+        Group students or teacher changed, group deleted
+        '''
+        group_ids = set(group_ids)
+        self._drop(lambda key: key[1] in group_ids)
+
+    def invalidate_users(self, user_ids: Iterable[int]):
+        user_ids = set(user_ids)
+        self._drop(lambda key: key[0] in user_ids)
+
+    def clear(self):
+        self.generation += 1
+        self._entries.clear()
+
+
+group_access_cache = GroupAccessCache()
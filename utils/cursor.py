@@ -0,0 +1,39 @@
+import base64
+import json
+from datetime import date, datetime, time
+from typing import Any, Callable, List
+
+from fastapi import HTTPException, status
+
+
+def _to_json(value: Any):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(*values: Any) -> str:
+    '''
+    Opaque keyset cursor from the sort key values of the last returned row
+    '''
+    data = json.dumps([_to_json(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, *parsers: Callable[[Any], Any]) -> List[Any]:
+    '''
+    Restores sort key values, every value is converted by the parser at the same
+    position, e.g. decode_cursor(cursor, date.fromisoformat, int)\n
+    Raises 400 for malformed cursor
+    '''
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(data)
+        if not isinstance(values, list) or len(values) != len(parsers):
+            raise ValueError(cursor)
+        return [parser(value) for parser, value in zip(parsers, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid cursor'
+        )
@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from typing import List
 
 
@@ -16,4 +16,22 @@ def get_week_start_end() -> List[datetime]:
     week_end = week_start + timedelta(
         days=6
         )
-    return [week_start, week_end]
\ No newline at end of file
+    return [week_start, week_end]
+
+
+def get_iso_week(day: date) -> str:
+    """
+    Returns ISO week of the day in YYYY-Www format.
+    """
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def get_iso_week_start_end(week: str) -> List[date]:
+    """
+    Returns first and last day of ISO week in YYYY-Www format.
+    Raises ValueError for invalid week.
+    """
+    year, week_number = week.split("-W")
+    week_start = date.fromisocalendar(int(year), int(week_number), 1)
+    return [week_start, week_start + timedelta(days=6)]
@@ -1,22 +1,36 @@
 import os
+from decouple import config
 from fastapi import UploadFile, HTTPException
 
 ALLOWED_EXTENSIONS = {'.pdf', '.docx', '.jpg', '.png', 'jpeg'}
 
 MAX_FILE_SIZE_MB = 8
+# homework attachments uploaded by teachers
+TEACHER_MAX_FILE_SIZE_MB = config('TEACHER_MAX_FILE_SIZE_MB', cast=int, default=MAX_FILE_SIZE_MB)
 
 
-async def validate_file(file: UploadFile):
+def get_file_size(file: UploadFile) -> int:
+    '''
+    Size of uploaded file without reading it into memory
+    '''
+    if file.size is not None:
+        return file.size
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+
+async def validate_file(file: UploadFile, max_size_mb: int = MAX_FILE_SIZE_MB):
     ext = os.path.splitext(file.filename)[1].lower()
-    file_content = await file.read()
     if ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
             detail=f"Недопустимый формат файла: {ext}. Разрешены: {', '.join(ALLOWED_EXTENSIONS)}"
         )
 
-    if len(file_content) > MAX_FILE_SIZE_MB * 1024 * 1024:
+    if get_file_size(file) > max_size_mb * 1024 * 1024:
         raise HTTPException(
             status_code=400,
-            detail=f"Файл слишком большой. Максимальный размер: {MAX_FILE_SIZE_MB} MB"
+            detail=f"Файл слишком большой. Максимальный размер: {max_size_mb} MB"
         )
@@ -0,0 +1,91 @@
+from datetime import date, datetime, time, timezone
+from typing import Iterable, Optional, TypedDict
+
+
+ICS_PRODID = "-//Eureka//Shedule//RU"
+ICS_LINE_LIMIT = 75
+
+
+class IcsEvent(TypedDict):
+    uid: str
+    day: date
+    start: time
+    end: time
+    summary: str
+    description: Optional[str]
+    location: Optional[str]
+    url: Optional[str]
+    updated_at: Optional[datetime]
+
+
+def escape_text(value: str) -> str:
+    '''
+    TEXT value escaping from RFC 5545 3.3.11
+    '''
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold_line(line: str) -> str:
+    '''
+    Splits content line into 75 octet parts, continuation lines start with a space
+    '''
+    encoded = line.encode("utf-8")
+    if len(encoded) <= ICS_LINE_LIMIT:
+        return line
+    parts = []
+    start = 0
+    limit = ICS_LINE_LIMIT
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # never cut utf-8 sequence, continuation bytes are 10xxxxxx
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode("utf-8"))
+        start = end
+        limit = ICS_LINE_LIMIT - 1
+    return "\r\n ".join(parts)
+
+
+def format_datetime(day: date, moment: time) -> str:
+    # floating time, calendar shows it as is in the local timezone
+    return datetime.combine(day, moment).strftime("%Y%m%dT%H%M%S")
+
+
+def format_utc(moment: datetime) -> str:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime("%Y%m%dT%H%M%SZ")
+
+
+def build_calendar(name: str, events: Iterable[IcsEvent]) -> bytes:
+    now = format_utc(datetime.now(timezone.utc))
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{ICS_PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_text(name)}",
+    ]
+    for event in events:
+        lines.append("BEGIN:VEVENT")
+        lines.append(f"UID:{event['uid']}")
+        lines.append(f"DTSTAMP:{format_utc(event['updated_at']) if event['updated_at'] else now}")
+        lines.append(f"DTSTART:{format_datetime(event['day'], event['start'])}")
+        lines.append(f"DTEND:{format_datetime(event['day'], event['end'])}")
+        lines.append(f"SUMMARY:{escape_text(event['summary'])}")
+        if event['description']:
+            lines.append(f"DESCRIPTION:{escape_text(event['description'])}")
+        if event['location']:
+            lines.append(f"LOCATION:{escape_text(event['location'])}")
+        if event['url']:
+            lines.append(f"URL:{event['url']}")
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(fold_line(line) for line in lines) + "\r\n").encode("utf-8")
@@ -0,0 +1,159 @@
+import gzip
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import suppress
+from mimetypes import guess_type
+
+from starlette.background import BackgroundTask
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# uploaded files get unique names, so a url always points to the same content
+MEDIA_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MEDIA_COMPRESS_MIN_SIZE = 1024
+MEDIA_COMPRESS_MAX_SIZE = 50 * 1024 * 1024
+MEDIA_COMPRESS_CHUNK_SIZE = 256 * 1024
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/rtf",
+    "image/svg+xml",
+    "image/bmp",
+}
+# preferred encoding first
+PRECOMPRESSED = ((("br", ".br"),) if brotli is not None else ()) + (("gzip", ".gz"),)
+
+_in_progress: set[str] = set()
+_in_progress_lock = threading.Lock()
+
+
+def is_compressible(media_type: str) -> bool:
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+
+def accepted_encodings(header: str) -> set[str]:
+    encodings = set()
+    for item in header.split(","):
+        name, _, params = item.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0
+        if q > 0:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+def _compress_file(source: str, target: str, encoding: str):
+    # write next to the target and rename, so a half written file is never served
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".", suffix=".tmp")
+    try:
+        with open(source, "rb") as src, os.fdopen(fd, "wb") as dst:
+            if encoding == "gzip":
+                with gzip.GzipFile(fileobj=dst, mode="wb", compresslevel=9, mtime=0) as gz:
+                    shutil.copyfileobj(src, gz, MEDIA_COMPRESS_CHUNK_SIZE)
+            else:
+                compressor = brotli.Compressor(quality=11)
+                while chunk := src.read(MEDIA_COMPRESS_CHUNK_SIZE):
+                    dst.write(compressor.process(chunk))
+                dst.write(compressor.finish())
+        os.replace(tmp_path, target)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+
+
+def precompress(path: str):
+    '''
+    Creates missing .br/.gz siblings of the file,
+    runs in threadpool after the response is sent
+    '''
+    with _in_progress_lock:
+        if path in _in_progress:
+            return
+        _in_progress.add(path)
+    try:
+        for encoding, ext in PRECOMPRESSED:
+            if not os.path.exists(path + ext):
+                _compress_file(path, path + ext, encoding)
+    except Exception as e:
+        logging.warning(f"Failed to precompress {path}: {e}")
+    finally:
+        with _in_progress_lock:
+            _in_progress.discard(path)
+
+
+class MediaStaticFiles(StaticFiles):
+    '''
+    StaticFiles for /media.
+    Responses are cached by clients as immutable, compressible files are served
+    from precompressed siblings when the client accepts them, missing siblings
+    are generated in background. ETags stay strong and differ per encoding
+    '''
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        path = os.fspath(full_path)
+        media_type = guess_type(path)[0] or "text/plain"
+        headers = {"cache-control": MEDIA_CACHE_CONTROL}
+        compressible = (is_compressible(media_type)
+                        and MEDIA_COMPRESS_MIN_SIZE <= stat_result.st_size <= MEDIA_COMPRESS_MAX_SIZE)
+
+        response = None
+        if compressible:
+            headers["vary"] = "Accept-Encoding"
+            accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+            for encoding, ext in PRECOMPRESSED:
+                if encoding not in accepted:
+                    continue
+                try:
+                    sibling_stat = os.stat(path + ext)
+                except FileNotFoundError:
+                    continue
+                if sibling_stat.st_mtime < stat_result.st_mtime:
+                    continue
+                response = FileResponse(
+                    path + ext,
+                    status_code=status_code,
+                    headers={**headers, "content-encoding": encoding},
+                    media_type=media_type,
+                    stat_result=sibling_stat,
+                )
+                break
+
+        if response is None:
+            response = FileResponse(
+                path,
+                status_code=status_code,
+                headers=headers,
+                media_type=media_type,
+                stat_result=stat_result,
+            )
+            if compressible:
+                response.background = BackgroundTask(precompress, path)
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -1,57 +1,200 @@
-import io
+import asyncio
+import logging
 import os
+from typing import AsyncIterator
 from uuid import uuid4
 
 from decouple import config
 from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from minio import Minio
+from minio.datatypes import Part
+from minio.helpers import MIN_PART_SIZE
+
+from utils.ext_and_size_validation_file import get_file_size
+
+
+MINIO_BOOTSTRAP_RETRY = config("MINIO_BOOTSTRAP_RETRY", cast=float, default=2)
+MINIO_BOOTSTRAP_MAX_RETRY = config("MINIO_BOOTSTRAP_MAX_RETRY", cast=float, default=60)
+MINIO_READY_TIMEOUT = config("MINIO_READY_TIMEOUT", cast=float, default=3)
+# files above the threshold are sent as multipart upload with parts sent in parallel
+MINIO_MULTIPART_THRESHOLD = config("MINIO_MULTIPART_THRESHOLD", cast=int, default=16 * 1024 * 1024)
+MINIO_PART_SIZE = max(config("MINIO_PART_SIZE", cast=int, default=8 * 1024 * 1024), MIN_PART_SIZE)
+MINIO_UPLOAD_CONCURRENCY = config("MINIO_UPLOAD_CONCURRENCY", cast=int, default=4)
+MINIO_PART_RETRIES = config("MINIO_PART_RETRIES", cast=int, default=3)
+MINIO_PART_RETRY_DELAY = 0.5
 
 
 class MinioClient:
+    '''
+    Storage client, the underlying Minio connection is created on first use,
+    so importing this module never touches the network.
+    Bucket is created in background by bootstrap() started from app lifespan
+    '''
+
     def __init__(self):
-        self.client = Minio(
-            endpoint=f"{config('MINIO_ENDPOINT')}:{config('MINIO_PORT')}",
-            access_key=config("MINIO_ACCESS_KEY", default="eurekaminioadmin"),
-            secret_key=config("MINIO_SECRET_KEY", default="eurekaminioadmin"),
-            secure=config("MINIO_SECURE", cast=bool),
-        )
+        self._client: Minio | None = None
         self.bucket_name = config("MINIO_BUCKET", default="eureka-bucket")
+        self.bucket_ready = False
 
-        self.create_bucket()
+    @property
+    def client(self) -> Minio:
+        if self._client is None:
+            self._client = Minio(
+                endpoint=f"{config('MINIO_ENDPOINT')}:{config('MINIO_PORT')}",
+                access_key=config("MINIO_ACCESS_KEY", default="eurekaminioadmin"),
+                secret_key=config("MINIO_SECRET_KEY", default="eurekaminioadmin"),
+                secure=config("MINIO_SECURE", cast=bool),
+            )
+        return self._client
 
     def create_bucket(self):
         if not self.client.bucket_exists(self.bucket_name):
             self.client.make_bucket(self.bucket_name)
+        self.bucket_ready = True
 
-    async def upload_file(self, file: UploadFile) -> str:
+    def ensure_bucket(self):
+        if not self.bucket_ready:
+            self.create_bucket()
 
+    async def bootstrap(self):
+        '''
+        Creates bucket, retrying with backoff until storage is reachable
+        '''
+        delay = MINIO_BOOTSTRAP_RETRY
+        while not self.bucket_ready:
+            try:
+                await run_in_threadpool(self.create_bucket)
+                logging.info(f"Minio bucket {self.bucket_name} is ready")
+            except Exception as e:
+                logging.warning(f"Minio is not available: {e}, retry in {delay}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MINIO_BOOTSTRAP_MAX_RETRY)
+
+    async def is_ready(self) -> bool:
+        if not self.bucket_ready:
+            return False
         try:
-            exists = self.client.bucket_exists(self.bucket_name)
+            return await asyncio.wait_for(
+                run_in_threadpool(self.client.bucket_exists, self.bucket_name),
+                timeout=MINIO_READY_TIMEOUT
+            )
+        except Exception as e:
+            logging.warning(f"Minio readiness check failed: {e}")
+            return False
 
-            if not exists:
-                self.client.make_bucket(self.bucket_name)
+    async def upload_file(self, file: UploadFile, public: bool = False) -> str:
+        # the bucket is private either way, public files are shared with presigned urls
+
+        try:
+            await run_in_threadpool(self.ensure_bucket)
             ext = os.path.splitext(file.filename)[1]
             unique_filename = f"{uuid4().hex}{ext}"
-            file_content = await file.read()
-            file_size = len(file_content)
-
-            self.client.put_object(
-                bucket_name=self.bucket_name,
-                object_name=unique_filename,
-                data=io.BytesIO(file_content),
-                length=file_size,
-                content_type=file.content_type or 'application/octet-stream'
-            )
+            file_size = get_file_size(file)
+            content_type = file.content_type or 'application/octet-stream'
+
+            if file_size > MINIO_MULTIPART_THRESHOLD:
+                await self._multipart_upload(file, unique_filename, content_type)
+            else:
+                await file.seek(0)
+                await run_in_threadpool(
+                    self.client.put_object,
+                    bucket_name=self.bucket_name,
+                    object_name=unique_filename,
+                    data=file.file,
+                    length=file_size,
+                    content_type=content_type
+                )
             return unique_filename
         except Exception as e:
             self._exception(f"Error while uploading file: {e}")
 
+    async def _multipart_upload(self, file: UploadFile, object_name: str, content_type: str):
+        '''
+        Sends file in MINIO_PART_SIZE parts, up to MINIO_UPLOAD_CONCURRENCY at once,
+        so at most that many parts are held in memory.
+        A failed part is retried on its own, the already sent parts are kept
+        '''
+        upload_id = await run_in_threadpool(
+            self.client._create_multipart_upload,
+            self.bucket_name, object_name, {"Content-Type": content_type}
+        )
+        semaphore = asyncio.Semaphore(MINIO_UPLOAD_CONCURRENCY)
+        tasks = []
+        try:
+            await file.seek(0)
+            part_number = 0
+            while True:
+                await semaphore.acquire()
+                data = await file.read(MINIO_PART_SIZE)
+                if not data:
+                    semaphore.release()
+                    break
+                part_number += 1
+                tasks.append(asyncio.create_task(
+                    self._upload_part(object_name, upload_id, part_number, data, semaphore)
+                ))
+            parts = await asyncio.gather(*tasks)
+            await run_in_threadpool(
+                self.client._complete_multipart_upload,
+                self.bucket_name, object_name, upload_id, parts
+            )
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            try:
+                await run_in_threadpool(
+                    self.client._abort_multipart_upload, self.bucket_name, object_name, upload_id
+                )
+            except Exception as e:
+                logging.warning(f"Failed to abort multipart upload of {object_name}: {e}")
+            raise
+
+    async def _upload_part(self, object_name: str, upload_id: str, part_number: int,
+                           data: bytes, semaphore: asyncio.Semaphore) -> Part:
+        try:
+            for attempt in range(1, MINIO_PART_RETRIES + 1):
+                try:
+                    etag = await run_in_threadpool(
+                        self.client._upload_part,
+                        self.bucket_name, object_name, data, None, upload_id, part_number
+                    )
+                    return Part(part_number, etag)
+                except Exception as e:
+                    if attempt == MINIO_PART_RETRIES:
+                        raise
+                    logging.warning(f"Part {part_number} of {object_name} failed: {e}, retrying")
+                    await asyncio.sleep(MINIO_PART_RETRY_DELAY * 2 ** (attempt - 1))
+        finally:
+            semaphore.release()
+
     def download_file(self, object_name: str):
         try:
             return self.client.get_object(self.bucket_name, object_name)
         except Exception as e:
             self._exception(f"Error while downloading file: {e}")
 
+    def download_response(self, object_name: str) -> StreamingResponse:
+        return StreamingResponse(
+            self.download_file(object_name),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f"attachment; filename={os.path.basename(object_name)}"},
+        )
+
+    async def iter_file(self, object_name: str, chunk_size: int) -> AsyncIterator[bytes]:
+        response = await run_in_threadpool(self.download_file, object_name)
+        try:
+            chunks = response.stream(chunk_size)
+            while (chunk := await run_in_threadpool(next, chunks, None)) is not None:
+                yield chunk
+        finally:
+            response.close()
+            response.release_conn()
+
+    async def remove_file(self, object_name: str):
+        await run_in_threadpool(self.client.remove_object, self.bucket_name, object_name)
+
     def get_file_url(self, object_name: str):
         return self.client.presigned_get_object(
             self.bucket_name, object_name=object_name
@@ -0,0 +1,123 @@
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Tuple
+
+from decouple import config
+
+
+SHEDULE_CACHE_TTL = config("SHEDULE_CACHE_TTL", cast=int, default=300)
+SHEDULE_CACHE_MAX_ENTRIES = config("SHEDULE_CACHE_MAX_ENTRIES", cast=int, default=2048)
+
+# (variant, subject id, iso week), subject id is None for global shedule
+CacheKey = Tuple[str, Optional[int], str]
+
+
+@dataclass
+class SheduleCacheEntry:
+    body: bytes
+    expires_at: float
+    groups: frozenset = field(default_factory=frozenset)
+    teachers: frozenset = field(default_factory=frozenset)
+    classrooms: frozenset = field(default_factory=frozenset)
+
+
+class SheduleCache:
+    '''
+    In-process cache of serialized shedule responses.\n
+    Every entry keeps ids of groups, teachers and classrooms it was built from,
+    writes drop only the entries that contain the changed objects
+    for the changed weeks. TTL is a safety net for writes made
+    outside of the api (admin panel, other workers)
+    '''
+
+    def __init__(self, ttl: int = SHEDULE_CACHE_TTL, max_entries: int = SHEDULE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.generation = 0
+        self._entries: dict[CacheKey, SheduleCacheEntry] = {}
+
+    def get(self, key: CacheKey) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return entry.body
+
+    def set(
+        self,
+        key: CacheKey,
+        body: bytes,
+        generation: int,
+        groups: Iterable[int] = (),
+        teachers: Iterable[int] = (),
+        classrooms: Iterable[int] = (),
+    ):
+        '''
+        generation must be read before the shedule was queried,
+        so a response built concurrently with a write is never stored
+        '''
+        if self.ttl <= 0 or generation != self.generation:
+            return
+        if len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = SheduleCacheEntry(
+            body=body,
+            expires_at=time.monotonic() + self.ttl,
+            groups=frozenset(groups),
+            teachers=frozenset(teachers),
+            classrooms=frozenset(classrooms),
+        )
+
+    def _drop(self, predicate):
+        self.generation += 1
+        for key in [key for key, entry in self._entries.items() if predicate(key, entry)]:
+            del self._entries[key]
+
+    def invalidate_lessons(self, weeks: Iterable[str], groups: Iterable[int], teachers: Iterable[int]):
+        '''
+        Lesson created, changed or deleted in the given weeks
+        '''
+        weeks, groups, teachers = set(weeks), set(groups), set(teachers)
+        self._drop(lambda key, entry: key[2] in weeks and (
+            key[0] == 'global'
+            or (key[0] == 'group' and key[1] in groups)
+            or (key[0] == 'teacher' and key[1] in teachers)
+            or not entry.groups.isdisjoint(groups)
+            or not entry.teachers.isdisjoint(teachers)
+        ))
+
+    def invalidate_groups(self, groups: Iterable[int]):
+        '''
+        Group renamed, archived or deleted, affects every week
+        '''
+        groups = set(groups)
+        self._drop(lambda key, entry: key[0] in ('global', 'teacher')
+                   or (key[0] == 'group' and key[1] in groups)
+                   or not entry.groups.isdisjoint(groups))
+
+    def invalidate_classrooms(self, classrooms: Iterable[int]):
+        classrooms = set(classrooms)
+        self._drop(lambda key, entry: not entry.classrooms.isdisjoint(classrooms))
+
+    def invalidate_students(self, students: Iterable[int]):
+        '''
+        Student joined or left a group
+        '''
+        students = set(students)
+        self._drop(lambda key, entry: key[0] == 'student' and key[1] in students)
+
+    def invalidate_users(self, users: Iterable[int]):
+        '''
+        User profile changed, lessons show teacher data
+        '''
+        users = set(users)
+        self._drop(lambda key, entry: not entry.teachers.isdisjoint(users)
+                   or (key[0] == 'student' and key[1] in users))
+
+    def clear(self):
+        self._drop(lambda key, entry: True)
+
+
+shedule_cache = SheduleCache()
@@ -1,5 +1,7 @@
+import asyncio
 import aiosmtplib
 from email.message import EmailMessage
+from typing import Iterable, List
 import decouple
 import logging
 from conf import DEBUG
@@ -8,20 +10,93 @@ from conf import DEBUG
 APP_PASSWORD = decouple.config('APP_PASSWORD', default=None)
 APP_EMAIL = decouple.config('APP_EMAIL', default=None)
 SMTP_HOSTNAME = decouple.config('SMTP_HOSTNAME', default=None)
+# messages per second for bulk sends, providers throttle or block faster senders
+SMTP_RATE_LIMIT = decouple.config('SMTP_RATE_LIMIT', default=5, cast=float)
 
-async def init_smtp():
-    smtp_client = aiosmtplib.SMTP(
-        hostname=SMTP_HOSTNAME,
-        port=465,
-        use_tls=True,
-        start_tls=False
+
+class SmtpClient:
+    '''
+    Shared SMTP connection, opened on first send and reused afterwards.
+    Dropped connections are reopened once, close() is called from app lifespan
+    '''
+
+    def __init__(self):
+        self._client: aiosmtplib.SMTP | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_connected(self) -> bool:
+        return self._client is not None and self._client.is_connected
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(
+            hostname=SMTP_HOSTNAME,
+            port=465,
+            use_tls=True,
+            start_tls=False
+            )
+        await client.connect()
+        await client.login(
+            APP_EMAIL,
+            APP_PASSWORD
         )
-    await smtp_client.connect()
-    await smtp_client.login(
-        APP_EMAIL,
-        APP_PASSWORD
-    )
-    return smtp_client
+        self._client = client
+        return client
+
+    async def _send(self, message: EmailMessage):
+        client = self._client if self.is_connected else await self._connect()
+        try:
+            await client.send_message(message)
+        except (
+            aiosmtplib.errors.SMTPConnectError,
+            aiosmtplib.errors.SMTPServerDisconnected,
+            OSError) as e:
+            logging.warning(f"SMTP connection lost: {e}, reconnecting...")
+            client = await self._connect()
+            await client.send_message(message)
+
+    async def send_message(self, message: EmailMessage):
+        async with self._lock:
+            await self._send(message)
+
+    async def send_messages(self, messages: Iterable[EmailMessage],
+                            rate_limit: float = SMTP_RATE_LIMIT) -> List[EmailMessage]:
+        '''
+        Sends messages over the shared connection paced to rate_limit per second.
+        The lock is taken per message, so single sends (registration, password reset)
+        are not stuck behind a long batch\n
+        Returns messages that couldn't be sent
+        '''
+        loop = asyncio.get_running_loop()
+        interval = 1 / rate_limit if rate_limit > 0 else 0
+        failed = []
+        for message in messages:
+            started = loop.time()
+            try:
+                async with self._lock:
+                    await self._send(message)
+            except (aiosmtplib.errors.SMTPException, OSError) as e:
+                logging.error(f"Failed to send email to {message['To']}: {e}")
+                failed.append(message)
+            delay = interval - (loop.time() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        return failed
+
+    async def close(self):
+        async with self._lock:
+            if self._client is None:
+                return
+            try:
+                if self._client.is_connected:
+                    await self._client.quit()
+            except Exception as e:
+                logging.warning(f"Error closing SMTP client: {e}")
+            self._client = None
+
+
+smtp_client = SmtpClient()
+
 
 async def send_email(
     To_email: str,
@@ -29,18 +104,12 @@ async def send_email(
     Content: str,
 ):
     if not DEBUG:
-        from main import app
-        # smtp_client: aiosmtplib.SMTP | None = getattr(app.state, "smtp_client", None)
-        smtp_client: aiosmtplib.SMTP = await init_smtp()
         message = EmailMessage()
         message["From"] = APP_EMAIL
         message["To"] = To_email
         message["Subject"] = Subject
         message.set_content(Content)
-        
-        # if smtp_client is None:
-        #     smtp_client = await init_smtp()
-        #     app.state.smtp_client = smtp_client
+
         logging.info(f"send email from {APP_EMAIL} To {To_email} \n Subject {Subject}")
 
         try:
@@ -49,18 +118,3 @@ async def send_email(
         except aiosmtplib.errors.SMTPException as e:
             logging.error(f"SMTP error: {e}")
             raise
-        except (
-            aiosmtplib.errors.SMTPConnectError,
-            aiosmtplib.errors.SMTPServerDisconnected,
-            OSError) as e:
-            logging.warning(f"SMTP connection lost: {e}, restarting client...")
-            try:
-                if smtp_client is not None:
-                    await smtp_client.quit()
-                    return
-            except Exception:
-                pass
-            # app.state.smtp_client = await init_smtp()
-        await smtp_client.quit()
-
-    
\ No newline at end of file
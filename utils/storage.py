@@ -0,0 +1,141 @@
+import logging
+import os
+from contextlib import suppress
+from typing import AsyncIterator, Protocol
+from uuid import uuid4
+
+import aiofiles
+import aiofiles.os
+from decouple import config
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import FileResponse, Response
+
+from utils.media_files import PRECOMPRESSED
+from utils.minio_client import minio_client
+
+
+STORAGE_BACKEND = config("STORAGE_BACKEND", default="minio")
+MEDIA_ROOT = config("MEDIA_ROOT", default="media")
+MEDIA_URL = config("MEDIA_URL", default="/media")
+# homework files and payment checks, never mounted, served only by the permission-checked routes
+MEDIA_PRIVATE_ROOT = config("MEDIA_PRIVATE_ROOT", default="private_media")
+UPLOADS_FOLDER = "uploads"
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class Storage(Protocol):
+    '''
+    File storage used by api, object names returned by upload_file are
+    stored in the db and passed back to the other methods
+    '''
+
+    async def bootstrap(self): ...
+
+    async def is_ready(self) -> bool: ...
+
+    async def upload_file(self, file: UploadFile, public: bool = False) -> str: ...
+
+    def download_response(self, object_name: str) -> Response: ...
+
+    def iter_file(self, object_name: str, chunk_size: int) -> AsyncIterator[bytes]: ...
+
+    async def remove_file(self, object_name: str): ...
+
+    def get_file_url(self, object_name: str) -> str: ...
+
+
+class LocalStorage:
+    '''
+    Filesystem storage for single node deployments and tests.
+    Files are written with aiofiles and served with FileResponse,
+    which handles Range requests and uses sendfile when the server supports it.\n
+    Uploads are private by default and kept under private_root, outside the
+    /media mount; only public ones (payment requisite QR codes) get a url
+    '''
+
+    def __init__(self, root: str = MEDIA_ROOT, url: str = MEDIA_URL, private_root: str = MEDIA_PRIVATE_ROOT):
+        self.root = root
+        self.url = url
+        self.private_root = private_root
+
+    @property
+    def folder(self) -> str:
+        return os.path.join(self.root, UPLOADS_FOLDER)
+
+    @property
+    def private_folder(self) -> str:
+        return os.path.join(self.private_root, UPLOADS_FOLDER)
+
+    def _path(self, object_name: str) -> str:
+        # object names are generated by upload_file, never trust them as paths
+        name = os.path.basename(object_name)
+        private_path = os.path.join(self.private_folder, name)
+        if os.path.exists(private_path):
+            return private_path
+        return os.path.join(self.folder, name)
+
+    async def bootstrap(self):
+        await aiofiles.os.makedirs(self.folder, exist_ok=True)
+        await aiofiles.os.makedirs(self.private_folder, exist_ok=True)
+
+    async def is_ready(self) -> bool:
+        return all(
+            os.path.isdir(folder) and os.access(folder, os.W_OK)
+            for folder in (self.folder, self.private_folder)
+        )
+
+    async def upload_file(self, file: UploadFile, public: bool = False) -> str:
+        ext = os.path.splitext(file.filename)[1]
+        unique_filename = f"{uuid4().hex}{ext}"
+        folder = self.folder if public else self.private_folder
+        try:
+            await aiofiles.os.makedirs(folder, exist_ok=True)
+            async with aiofiles.open(os.path.join(folder, unique_filename), 'wb') as out:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    await out.write(chunk)
+            return unique_filename
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error while uploading file: {e}",
+            )
+
+    def download_response(self, object_name: str) -> FileResponse:
+        path = self._path(object_name)
+        if not os.path.isfile(path):
+            raise HTTPException(status_code=404, detail="File not found")
+        return FileResponse(
+            path,
+            media_type="application/octet-stream",
+            filename=os.path.basename(object_name),
+        )
+
+    async def iter_file(self, object_name: str, chunk_size: int) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self._path(object_name), 'rb') as f:
+            while chunk := await f.read(chunk_size):
+                yield chunk
+
+    async def remove_file(self, object_name: str):
+        path = self._path(object_name)
+        try:
+            await aiofiles.os.remove(path)
+        except FileNotFoundError:
+            logging.warning(f"File {object_name} is already removed")
+        # precompressed copies made by MediaStaticFiles
+        for encoding, ext in PRECOMPRESSED:
+            with suppress(FileNotFoundError):
+                await aiofiles.os.remove(path + ext)
+
+    def get_file_url(self, object_name: str) -> str:
+        return f"{self.url}/{UPLOADS_FOLDER}/{os.path.basename(object_name)}"
+
+
+def get_storage() -> Storage:
+    if STORAGE_BACKEND == "local":
+        return LocalStorage()
+    if STORAGE_BACKEND == "minio":
+        return minio_client
+    raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+
+
+storage: Storage = get_storage()
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+import zipfile
+from collections import deque
+from typing import AsyncIterator, Iterable, Tuple
+
+from utils.storage import storage
+
+
+ZIP_CHUNK_SIZE = 64 * 1024
+ZIP_MAX_PARALLEL_DOWNLOADS = 4
+ZIP_PREFETCH_CHUNKS = 16
+
+
+class _ZipSink:
+    '''
+    Write-only buffer for ZipFile.
+    It has no tell/seek, so zipfile writes entries in streaming mode
+    (with data descriptors) and never goes back to patch headers
+    '''
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _download_object(object_name: str, queue: asyncio.Queue):
+    '''
+    Reads object from storage chunk by chunk into the bounded queue\n
+    None marks the end of object, an exception is passed to the consumer
+    '''
+    try:
+        async for chunk in storage.iter_file(object_name, ZIP_CHUNK_SIZE):
+            await queue.put(chunk)
+    except Exception as e:
+        await queue.put(e)
+        return
+    await queue.put(None)
+
+
+async def stream_zip(entries: Iterable[Tuple[str, str]]) -> AsyncIterator[bytes]:
+    '''
+    Builds zip archive on the fly from (archive_name, object_name) pairs\n
+    Up to ZIP_MAX_PARALLEL_DOWNLOADS objects are fetched concurrently, each into
+    a bounded queue, so memory usage doesn't depend on the archive size.
+    Objects that can't be fetched are skipped
+    '''
+    entries = iter(entries)
+    pending = deque()
+    current = None
+
+    def schedule():
+        while len(pending) < ZIP_MAX_PARALLEL_DOWNLOADS:
+            entry = next(entries, None)
+            if entry is None:
+                return
+            archive_name, object_name = entry
+            queue = asyncio.Queue(maxsize=ZIP_PREFETCH_CHUNKS)
+            task = asyncio.create_task(_download_object(object_name, queue))
+            pending.append((archive_name, queue, task))
+
+    sink = _ZipSink()
+    try:
+        with zipfile.ZipFile(sink, mode='w') as archive:
+            schedule()
+            while pending:
+                archive_name, queue, current = pending.popleft()
+                schedule()
+
+                chunk = await queue.get()
+                if isinstance(chunk, Exception):
+                    logging.warning(f"Skipping {archive_name} in zip archive: {chunk}")
+                    continue
+
+                info = zipfile.ZipInfo(archive_name, date_time=time.localtime()[:6])
+                # uploads are mostly pdf/docx/images, fast deflate is enough
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.compress_level = 1
+                with archive.open(info, mode='w') as archive_entry:
+                    while chunk is not None:
+                        if isinstance(chunk, Exception):
+                            raise chunk
+                        archive_entry.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+                        chunk = await queue.get()
+                data = sink.drain()
+                if data:
+                    yield data
+        yield sink.drain()
+    finally:
+        # on client disconnect the entry being read is no longer in pending,
+        # its download would block on the full queue forever
+        if current is not None:
+            current.cancel()
+        for _, _, task in pending:
+            task.cancel()